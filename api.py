@@ -0,0 +1,265 @@
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from flask import request, jsonify, url_for, current_app
+from validate import (checkFlight, parse_price, checkCapacity, regCheck, checkUserUpdate,
+                      validate_booking_data, existing_ids)
+from createdb import get_db_connection, get_table_versions, DEFAULT_CAPACITY
+from cache import invalidate_bootstrap_user, dashboard_cache
+from importer import FLIGHT_FIELDS
+from controllers import (get_flights_page, get_users_page, get_bookings_page, bulk_delete,
+                         create_booking, insert_flight, BOOKINGS_QUERY, SOLD_OUT_MESSAGE,
+                         CAPACITY_MESSAGE)
+from writer import run_write
+
+# ===== JSON API v1 =====
+
+API_PER_PAGE = 20
+API_MAX_PER_PAGE = 100
+
+def api_error(message, status=400):
+    return jsonify({'error': message}), status
+
+def to_dict(row):
+    """Строка в JSON-объект; хэш пароля наружу не отдаётся"""
+    item = dict(row)
+    item.pop('password', None)
+    return item
+
+def field(data, name):
+    value = data.get(name)
+    return '' if value is None else str(value)
+
+def data_version(tables):
+    """Версия данных для ETag и время последнего изменения таблиц из row_counts"""
+    conn = get_db_connection()
+    versions = get_table_versions(conn, tables)
+    conn.close()
+    version = '.'.join(str(versions[table][0]) for table in tables)
+    modified = max(versions[table][1] for table in tables)
+    return version, datetime.strptime(modified, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+def conditional_json(tables, key, load):
+    """JSON-ответ с ETag и Last-Modified.
+
+    Версия таблиц читается до данных: если у клиента она актуальна,
+    load() не вызывается и возвращается 304.
+    """
+    version, last_modified = data_version(tables)
+    etag = hashlib.sha1(f'{key}:{version}'.encode()).hexdigest()
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and last_modified <= since
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        payload = load()
+        if payload is None:
+            return api_error('Не найдено', 404)
+        response = jsonify(payload)
+
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+def load_item(entity, item_id):
+    spec = API_ENTITIES[entity]
+    conn = get_db_connection()
+    row = conn.execute(f"{spec['query']} WHERE {spec['id_column']} = ?", (item_id,)).fetchone()
+    conn.close()
+    return to_dict(row) if row else None
+
+# ----- Запись: (id, ошибка, HTTP-статус ошибки) -----
+
+def write_flight(data, flight_id=None):
+    values = [field(data, name) for name in FLIGHT_FIELDS]
+    is_valid, error_message = checkFlight(*values)
+    capacity = field(data, 'capacity')
+    if is_valid and capacity:
+        is_valid, error_message = checkCapacity(capacity)
+    if not is_valid:
+        return None, error_message, 400
+    values[5] = parse_price(values[5])
+    capacity = int(capacity) if capacity else None
+
+    if flight_id is None:
+        flight_id = run_write(lambda conn: insert_flight(conn, values, capacity or DEFAULT_CAPACITY))
+        return flight_id, None, None
+
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            '''UPDATE flights SET
+               departure_city=?, arrival_city=?, departure_date=?,
+               arrival_date=?, company=?, price=?, capacity=COALESCE(?, capacity)
+               WHERE id=?''',
+            (*values, capacity, flight_id)
+        )
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return None, CAPACITY_MESSAGE, 409
+    finally:
+        conn.close()
+    return flight_id, None, None
+
+def write_user(data, user_id=None):
+    fio = field(data, 'fio')
+    email = field(data, 'email')
+    password = field(data, 'password')
+    if user_id is None:
+        is_valid, error_message = regCheck(fio, email, password, password)
+    else:
+        is_valid, error_message = checkUserUpdate(fio, email, password)
+    if not is_valid:
+        return None, error_message, 400
+    fio = fio.strip()
+    email = email.strip()
+
+    conn = get_db_connection()
+    try:
+        if user_id is None:
+            cursor = conn.execute(
+                'INSERT INTO users (fio, email, password) VALUES (?, ?, ?)',
+                (fio, email, hashlib.sha256(password.encode()).hexdigest())
+            )
+            user_id = cursor.lastrowid
+        elif password:
+            conn.execute(
+                'UPDATE users SET fio=?, email=?, password=? WHERE id=?',
+                (fio, email, hashlib.sha256(password.encode()).hexdigest(), user_id)
+            )
+        else:
+            conn.execute('UPDATE users SET fio=?, email=? WHERE id=?', (fio, email, user_id))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return None, 'Пользователь с таким email уже существует', 409
+    finally:
+        conn.close()
+    invalidate_bootstrap_user([user_id], email)
+    return user_id, None, None
+
+def write_booking(data, booking_id=None):
+    passenger_fio = field(data, 'passenger_fio')
+    user_id = field(data, 'user_id')
+    flight_id = field(data, 'flight_id')
+    is_valid, error_message = validate_booking_data(passenger_fio, user_id, flight_id)
+    if not is_valid:
+        return None, error_message, 400
+
+    if booking_id is None:
+        booking_id, error_message = create_booking(user_id, flight_id, passenger_fio)
+        if error_message:
+            return None, error_message, 409
+        return booking_id, None, None
+
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            'UPDATE booking SET user_id=?, flight_id=?, passenger_fio=? WHERE id=?',
+            (user_id, flight_id, passenger_fio, booking_id)
+        )
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        return None, SOLD_OUT_MESSAGE, 409
+    finally:
+        conn.close()
+    return booking_id, None, None
+
+# Описание сущностей API: таблица, таблицы, от которых зависит ответ, страница списка,
+# запрос одной записи, запись и зависимая таблица для удаления
+API_ENTITIES = {
+    'flights': {
+        'table': 'flights',
+        'tables': ('flights',),
+        'page': get_flights_page,
+        'query': 'SELECT * FROM flights',
+        'id_column': 'id',
+        'write': write_flight,
+        'dependent': ('booking', 'flight_id')
+    },
+    'users': {
+        'table': 'users',
+        'tables': ('users',),
+        'page': get_users_page,
+        'query': 'SELECT id, fio, email FROM users',
+        'id_column': 'id',
+        'write': write_user,
+        'dependent': ('booking', 'user_id')
+    },
+    'bookings': {
+        'table': 'booking',
+        'tables': ('booking', 'users', 'flights'),
+        'page': get_bookings_page,
+        'query': BOOKINGS_QUERY,
+        'id_column': 'b.id',
+        'write': write_booking,
+        'dependent': None
+    }
+}
+
+# ----- Контроллеры -----
+
+def controller_api_collection(entity):
+    """GET — страница списка по курсору, POST — создание, DELETE — удаление по списку id"""
+    spec = API_ENTITIES[entity]
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return api_error('Ожидается объект JSON')
+        item_id, error_message, status = spec['write'](data)
+        if error_message:
+            return api_error(error_message, status)
+        dashboard_cache.invalidate()
+        response = jsonify(load_item(entity, item_id))
+        response.status_code = 201
+        response.headers['Location'] = url_for('api_v1_item', entity=entity, item_id=item_id)
+        return response
+
+    if request.method == 'DELETE':
+        data = request.get_json(silent=True)
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            return api_error('Ожидается непустой список ids')
+        results = bulk_delete(spec['table'], [str(item_id) for item_id in ids], dependent=spec['dependent'])
+        if entity == 'users':
+            invalidate_bootstrap_user([item_id for item_id, status in results.items() if status == 'deleted'])
+        return jsonify({'results': results})
+
+    per_page = min(max(request.args.get('per_page', API_PER_PAGE, type=int), 1), API_MAX_PER_PAGE)
+    after = request.args.get('after')
+    before = request.args.get('before')
+
+    def load():
+        rows, total_pages, next_cursor, prev_cursor = spec['page'](0, per_page, after, before)
+        return {'items': [to_dict(row) for row in rows],
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor}
+
+    return conditional_json(spec['tables'], request.full_path, load)
+
+def controller_api_item(entity, item_id):
+    """GET — запись по id, PUT — изменение записи"""
+    spec = API_ENTITIES[entity]
+
+    if request.method == 'PUT':
+        if not existing_ids(**{spec['table']: [item_id]})[spec['table']]:
+            return api_error('Не найдено', 404)
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return api_error('Ожидается объект JSON')
+        _, error_message, status = spec['write'](data, item_id)
+        if error_message:
+            return api_error(error_message, status)
+        dashboard_cache.invalidate()
+        return jsonify(load_item(entity, item_id))
+
+    return conditional_json(spec['tables'], request.path, lambda: load_item(entity, item_id))
@@ -1,10 +1,17 @@
-from flask import Flask, render_template, session
+from flask import Flask, render_template, session, request
 import logging
 import os
 import json
 from validate import *
-from createdb import create_database, get_db_connection
+from createdb import create_database, get_db_connection, get_row_counts, init_app, DB_PROFILE
 from controllers import *
+from cache import get_bootstrap_user, dashboard_cache
+from api import controller_api_collection, controller_api_item
+from writer import write_queue
+from logsetup import setup_logging
+from fragments import init_templates
+from sqltrace import init_sql_trace, controller_debug_sql
+from metrics import init_metrics, controller_metrics
 
 def load_config():
     config_path = 'config.json'
@@ -18,7 +25,38 @@ def load_config():
         "LOG_LEVEL": "INFO",
         "LOG_FILE": "logs/app.log",
         "LOG_ENCODING": "utf-8",
-        "ITEMS_PER_PAGE": 10
+        "LOG_FORMAT": "json",
+        "LOG_QUEUE": True,
+        "LOG_ROTATION": "size",
+        "LOG_MAX_BYTES": 10485760,
+        "LOG_BACKUP_COUNT": 5,
+        "LOG_ROTATE_WHEN": "midnight",
+        "LOG_DEBUG_PER_SECOND": 10,
+        "ITEMS_PER_PAGE": 10,
+        "DB_POOL_SIZE": 5,
+        "DB_PROFILE": dict(DB_PROFILE),
+        "DASHBOARD_TTL": 5,
+        "BOOTSTRAP_USER_TTL": 5,
+        "IMPORT_CHUNK_SIZE": 5000,
+        "EXPORT_BATCH_SIZE": 1000,
+        "WRITE_BATCHING": False,
+        "WRITE_BATCH_SIZE": 64,
+        "WRITE_BATCH_WAIT_MS": 2,
+        "ASYNC_READ_WORKERS": 16,
+        "ASYNC_WRITE_WORKERS": 2,
+        "SERVER_WORKERS": 0,
+        "SERVER_MAX_REQUESTS": 10000,
+        "SERVER_MAX_REQUESTS_JITTER": 1000,
+        "SERVER_GRACEFUL_TIMEOUT": 30,
+        "SQL_TRACE": False,
+        "SQL_TRACE_SLOW_MS": 200,
+        "SQL_TRACE_REPEAT_LIMIT": 5,
+        "SQL_TRACE_HISTORY": 50,
+        "METRICS": True,
+        "METRICS_DIR": "cache/metrics",
+        "METRICS_FLUSH_SECONDS": 5,
+        "TEMPLATE_CACHE_DIR": "cache/templates",
+        "FRAGMENT_CACHE_SIZE": 5000
     }
     
     if os.path.exists(config_path):
@@ -27,7 +65,10 @@ def load_config():
                 loaded_config = json.load(f)
                 for key, value in loaded_config.items():
                     if key in default_config:
-                        default_config[key] = value
+                        if isinstance(default_config[key], dict) and isinstance(value, dict):
+                            default_config[key].update(value)
+                        else:
+                            default_config[key] = value
                 print(f"✓ Конфигурация загружена из {config_path}")
         except Exception as e:
             print(f"✗ Ошибка загрузки конфигурации: {e}")
@@ -50,16 +91,34 @@ app.config['DATABASE_FILE'] = config['DATABASE_FILE']
 app.config['HOST'] = config['HOST']
 app.config['PORT'] = config['PORT']
 app.config['DEBUG'] = config['DEBUG']
+app.config['DB_POOL_SIZE'] = config['DB_POOL_SIZE']
+app.config['DB_PROFILE'] = config['DB_PROFILE']
+app.config['DASHBOARD_TTL'] = config['DASHBOARD_TTL']
+app.config['BOOTSTRAP_USER_TTL'] = config['BOOTSTRAP_USER_TTL']
+app.config['IMPORT_CHUNK_SIZE'] = config['IMPORT_CHUNK_SIZE']
+app.config['EXPORT_BATCH_SIZE'] = config['EXPORT_BATCH_SIZE']
+app.config['WRITE_BATCHING'] = config['WRITE_BATCHING']
+app.config['WRITE_BATCH_SIZE'] = config['WRITE_BATCH_SIZE']
+app.config['WRITE_BATCH_WAIT_MS'] = config['WRITE_BATCH_WAIT_MS']
+app.config['ASYNC_READ_WORKERS'] = config['ASYNC_READ_WORKERS']
+app.config['ASYNC_WRITE_WORKERS'] = config['ASYNC_WRITE_WORKERS']
+app.config['SERVER_WORKERS'] = config['SERVER_WORKERS']
+app.config['SERVER_MAX_REQUESTS'] = config['SERVER_MAX_REQUESTS']
+app.config['SERVER_MAX_REQUESTS_JITTER'] = config['SERVER_MAX_REQUESTS_JITTER']
+app.config['SERVER_GRACEFUL_TIMEOUT'] = config['SERVER_GRACEFUL_TIMEOUT']
+app.config['SQL_TRACE'] = config['SQL_TRACE']
+app.config['SQL_TRACE_SLOW_MS'] = config['SQL_TRACE_SLOW_MS']
+app.config['SQL_TRACE_REPEAT_LIMIT'] = config['SQL_TRACE_REPEAT_LIMIT']
+app.config['SQL_TRACE_HISTORY'] = config['SQL_TRACE_HISTORY']
+app.config['METRICS'] = config['METRICS']
+app.config['METRICS_DIR'] = config['METRICS_DIR']
+app.config['METRICS_FLUSH_SECONDS'] = config['METRICS_FLUSH_SECONDS']
+app.config['TEMPLATE_CACHE_DIR'] = config['TEMPLATE_CACHE_DIR']
+app.config['FRAGMENT_CACHE_SIZE'] = config['FRAGMENT_CACHE_SIZE']
+init_app(app)
 
-os.makedirs('logs', exist_ok=True)
-logging.basicConfig(
-    level=getattr(logging, config['LOG_LEVEL']),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(config['LOG_FILE'], encoding=config['LOG_ENCODING']),
-        logging.StreamHandler()
-    ]
-)
+# Запись логов на диск — в фоновом потоке, отладочные сообщения ограничены по частоте
+setup_logging(config)
 
 logger = logging.getLogger(__name__)
 
@@ -69,49 +128,68 @@ try:
 except Exception as e:
     logger.error(f"Database initialization error: {e}")
 
+try:
+    get_bootstrap_user(app.config['BOOTSTRAP_USER_TTL'])
+except Exception as e:
+    logger.error(f"Auto login user lookup error: {e}")
+
+# Групповой коммит вставок бронирований и рейсов одним потоком-писателем
+if app.config['WRITE_BATCHING']:
+    write_queue.start(app.config['WRITE_BATCH_SIZE'], app.config['WRITE_BATCH_WAIT_MS'])
+    logger.info("Group commit writer started")
+
+# Трассировка SQL: сводка по каждому запросу, поиск N+1 и /debug/sql
+init_sql_trace(app)
+
+# Метрики Prometheus на /metrics: маршруты, задержки, время в БД, соединения, кеши
+init_metrics(app)
+
+# Байткод шаблонов на диске и тег {% cache %} для фрагментов страниц
+init_templates(app)
+
 @app.before_request
 def auto_login():
+    # Пробы и статика не требуют входа
+    if request.endpoint in ('health', 'metrics', 'static'):
+        return
     if 'user_id' not in session:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, fio FROM users WHERE email = 'admin@mail.ru'")
-        admin = cursor.fetchone()
-        conn.close()
+        admin = get_bootstrap_user(app.config['BOOTSTRAP_USER_TTL'])
         if admin:
             session['user_id'] = admin['id']
             session['fio'] = admin['fio']
             logger.debug(f"Auto login for user {admin['fio']}")
 
-@app.route('/')
-def index():
+def load_dashboard():
+    """Счётчики и последние бронирования для главной страницы"""
     conn = get_db_connection()
-    
     try:
-        flights_count = conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0]
-        users_count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-        bookings_count = conn.execute("SELECT COUNT(*) FROM booking").fetchone()[0]
+        counts = get_row_counts(conn)
         
         cursor = conn.cursor()
         cursor.execute('''
             SELECT b.id, b.passenger_fio, f.departure_city, f.arrival_city, 
                    f.departure_date, b.booking_date
             FROM booking b
-            JOIN flights f ON b.flight_id = f.id
+            CROSS JOIN flights f ON b.flight_id = f.id
             ORDER BY b.booking_date DESC
             LIMIT 5
         ''')
-        recent_bookings = cursor.fetchall()
+        recent_bookings = [dict(row) for row in cursor.fetchall()]
         
+        return {'flights_count': counts['flights'],
+                'users_count': counts['users'],
+                'bookings_count': counts['booking'],
+                'recent_bookings': recent_bookings}
+    finally:
         conn.close()
-        
-        return render_template('admin_panel.html',
-                             flights_count=flights_count,
-                             users_count=users_count,
-                             bookings_count=bookings_count,
-                             recent_bookings=recent_bookings)
+
+@app.route('/')
+def index():
+    try:
+        snapshot = dashboard_cache.get(load_dashboard, app.config['DASHBOARD_TTL'])
+        return render_template('admin_panel.html', **snapshot)
     except Exception as e:
         logger.error(f"Error loading main page data: {e}")
-        conn.close()
         return render_template('admin_panel.html',
                              flights_count=0,
                              users_count=0,
@@ -122,6 +200,10 @@ def index():
 def add_flight_page():
     return controller_add_flight()
 
+@app.route('/import_flights', methods=['GET', 'POST'])
+def import_flights_page():
+    return controller_import_flights()
+
 @app.route('/edit_flights', methods=['GET'])
 def edit_flights_page():
     return controller_edit_flights()
@@ -184,6 +266,50 @@ def delete_bookings_page():
 def delete_bookings_process():
     return controller_process_delete_bookings()
 
+# Flight search routes
+@app.route('/search_flights', methods=['GET'])
+def search_flights_page():
+    return controller_search_flights_page()
+
+@app.route('/api/flights/filter', methods=['GET'])
+def api_filter_flights():
+    return controller_filter_flights()
+
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    return controller_search_text()
+
+# Typeahead routes
+@app.route('/api/users/search')
+def api_search_users():
+    return controller_search_users()
+
+@app.route('/api/flights/search')
+def api_search_flights():
+    return controller_search_flights()
+
+# Export routes
+@app.route('/export/<any(bookings, flights, users):entity>', methods=['GET'])
+def export(entity):
+    return controller_export(entity)
+
+# JSON API v1
+@app.route('/api/v1/<any(flights, users, bookings):entity>', methods=['GET', 'POST', 'DELETE'])
+def api_v1_collection(entity):
+    return controller_api_collection(entity)
+
+@app.route('/api/v1/<any(flights, users, bookings):entity>/<int:item_id>', methods=['GET', 'PUT'])
+def api_v1_item(entity, item_id):
+    return controller_api_item(entity, item_id)
+
+@app.route('/debug/sql')
+def debug_sql():
+    return controller_debug_sql()
+
+@app.route('/metrics')
+def metrics():
+    return controller_metrics()
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -193,11 +319,12 @@ def health():
         
         tables = ['users', 'flights', 'booking']
         status = {'database': 'OK', 'tables': {}}
+        counts = get_row_counts(conn)
         
         for table in tables:
             try:
-                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-                status['tables'][table] = f'OK ({count} records)'
+                conn.execute(f"SELECT 1 FROM {table} LIMIT 1")
+                status['tables'][table] = f'OK ({counts[table]} records)'
             except Exception as e:
                 status['tables'][table] = f'ERROR: {str(e)}'
                 status['database'] = 'PARTIAL'
@@ -0,0 +1,152 @@
+import sys
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from app import app
+from createdb import close_db_pool
+from writer import write_queue
+
+logger = logging.getLogger(__name__)
+
+# ===== АСИНХРОННЫЙ РЕЖИМ (ASGI) =====
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Тело запроса больше этого размера сбрасывается во временный файл (загрузка расписаний)
+SPOOL_MAX_SIZE = 1024 * 1024
+
+class AsgiApp:
+    """ASGI-приложение поверх Flask-приложения.
+
+    Соединения с клиентами обслуживает цикл событий сервера (uvicorn), поэтому
+    медленный клиент не занимает поток. Обработчики Flask, то есть запросы к SQLite
+    и рендеринг шаблонов, выполняются в ограниченных пулах потоков: отдельно для
+    чтения и для записи, так как писатель в SQLite всё равно один. Потоковые ответы
+    (выгрузка) читаются из пула по одному фрагменту и отправляются клиенту в цикле.
+    """
+
+    def __init__(self, wsgi_app, read_workers=16, write_workers=2):
+        self.wsgi_app = wsgi_app
+        self.read_executor = ThreadPoolExecutor(read_workers, thread_name_prefix='asgi-read')
+        self.write_executor = ThreadPoolExecutor(write_workers, thread_name_prefix='asgi-write')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self.read_executor.shutdown(wait=True)
+        self.write_executor.shutdown(wait=True)
+        write_queue.stop()
+        close_db_pool()
+
+    async def read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+        return body
+
+    async def handle(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        method = scope['method']
+        executor = self.read_executor if method in READ_METHODS else self.write_executor
+        body = await self.read_body(receive)
+        environ = build_environ(scope, body)
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+
+        def call_app():
+            # Первый фрагмент тела читается в том же потоке, чтобы статус и заголовки были известны
+            result = self.wsgi_app(environ, start_response)
+            iterator = iter(result)
+            return result, iterator, next(iterator, None)
+
+        try:
+            result, iterator, chunk = await loop.run_in_executor(executor, call_app)
+        finally:
+            body.close()
+
+        try:
+            await send({'type': 'http.response.start',
+                        'status': started['status'],
+                        'headers': started['headers']})
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(executor, next, iterator, None)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(executor, result.close)
+
+def build_environ(scope, body):
+    """WSGI environ (PEP 3333) для HTTP-запроса ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+# Простаивающих соединений в пуле должно хватать на все потоки обработчиков
+app.config['DB_POOL_SIZE'] = max(app.config['DB_POOL_SIZE'],
+                                 app.config['ASYNC_READ_WORKERS'] + app.config['ASYNC_WRITE_WORKERS'])
+
+application = AsgiApp(app.wsgi_app, app.config['ASYNC_READ_WORKERS'], app.config['ASYNC_WRITE_WORKERS'])
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("✗ Для асинхронного режима установите uvicorn: pip install uvicorn")
+        sys.exit(1)
+    uvicorn.run(application, host=app.config['HOST'], port=app.config['PORT'], lifespan='on')
@@ -0,0 +1,518 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import logging
+import sqlite3
+import argparse
+import platform
+import itertools
+import tempfile
+import threading
+import statistics
+import http.client
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlencode
+from app import app
+from createdb import (create_database, close_db_pool, open_db_connection, get_row_counts,
+                      add_connect_hook, remove_connect_hook, generate_data,
+                      GEN_CITIES, GEN_COMPANIES, GEN_LAST_NAMES, GEN_MALE_NAMES)
+from controllers import encode_cursor, FLIGHT_KEYS, USER_KEYS, BOOKING_KEYS
+from server import PreforkServer, create_listener
+
+# ===== НАГРУЗОЧНЫЙ ТЕСТ =====
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+SEED = 2024
+PASSWORD = 'password123'
+
+# Слова для форм и поиска берутся из генератора данных, чтобы запросы находили строки
+CITIES = [city for city, _ in GEN_CITIES]
+COMPANIES = [company for company, _ in GEN_COMPANIES]
+LAST_NAMES = GEN_LAST_NAMES
+FIRST_NAMES = GEN_MALE_NAMES
+
+# ----- Подготовка данных -----
+
+def random_fio(rng):
+    return f'{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}'
+
+def random_flight(rng):
+    departure_city, arrival_city = rng.sample(CITIES, 2)
+    departure = date(2030, 1, 1) + timedelta(days=rng.randrange(365))
+    return (departure_city, arrival_city, departure.isoformat(), departure.isoformat(),
+            rng.choice(COMPANIES), rng.randrange(3000, 30000, 100))
+
+def seed_database(path, rows, seed=SEED):
+    """Новая БД с rows бронированиями, rows // 10 пользователями и rows // 20 рейсами"""
+    app.config['DATABASE_FILE'] = path
+    create_database()
+    close_db_pool()
+
+    conn = open_db_connection()
+    try:
+        generate_data(conn, users=max(rows // 10, 1), flights=max(rows // 20, 1), bookings=rows, seed=seed)
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        conn.close()
+
+def prepare_database(data_dir, rows, reseed=False):
+    """Рабочая копия БД заданного размера; заполненная БД сохраняется в data_dir для следующих запусков"""
+    template = os.path.join(data_dir, f'bench_{rows}.db')
+    seed_seconds = None
+    if reseed or not os.path.exists(template):
+        partial = template + '.partial'
+        remove_database(partial)
+        started = time.perf_counter()
+        seed_database(partial, rows)
+        seed_seconds = round(time.perf_counter() - started, 2)
+        os.replace(partial, template)
+    work = template + '.work'
+    remove_database(work)
+    shutil.copyfile(template, work)
+    return work, seed_seconds
+
+def remove_database(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+# ----- Подсчёт запросов -----
+
+_counter = threading.local()
+
+def is_internal(statement):
+    """Служебные операторы SQLite: вложенные ('-- ...') и запросы FTS5 к теневым таблицам"""
+    return statement.startswith('--') or "'main'." in statement
+
+def _count_statement(statement):
+    # Шаги триггеров sqlite3 передаёт как повтор текста родительского оператора
+    # (с подставленными параметрами), поэтому подряд идущие повторы не считаются
+    if is_internal(statement):
+        return
+    if statement != getattr(_counter, 'last', None):
+        _counter.queries = getattr(_counter, 'queries', 0) + 1
+    _counter.last = statement
+
+def trace_queries(conn):
+    conn.set_trace_callback(_count_statement)
+
+class QueryCounter:
+    """WSGI-обёртка: число SQL-запросов обработчика в заголовке X-Query-Count.
+
+    У потоковых ответов (без Content-Length) запросы выполняются после отправки
+    заголовков, поэтому для них заголовок не ставится.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        _counter.queries = 0
+        _counter.last = None
+
+        def counting_start_response(status, headers, exc_info=None):
+            if any(name.lower() == 'content-length' for name, _ in headers):
+                headers = headers + [('X-Query-Count', str(_counter.queries))]
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, counting_start_response)
+
+# ----- Сценарии -----
+# Сценарий строит список запросов (метод, путь, тело, Content-Type) до замера;
+# записи, которые сценарий удаляет, создаются здесь же
+
+def get(path, **params):
+    return ('GET', path + ('?' + urlencode(params) if params else ''), None, None)
+
+def post(path, form):
+    return ('POST', path, urlencode(form, doseq=True).encode(), 'application/x-www-form-urlencoded')
+
+def post_json(path, data):
+    return ('POST', path, json.dumps(data, ensure_ascii=False).encode(), 'application/json')
+
+def repeat(path, **params):
+    return lambda conn, rng, n: [get(path, **params)] * n
+
+def total(conn, table):
+    return get_row_counts(conn)[table]
+
+def middle_cursor(conn, table, keys, descending=False):
+    """Курсор страницы из середины таблицы — глубокая страница без OFFSET"""
+    direction = ' DESC' if descending else ''
+    columns = ', '.join(field for _, field in keys)
+    order = ', '.join(field + direction for _, field in keys)
+    row = conn.execute(f'SELECT {columns} FROM {table} ORDER BY {order} LIMIT 1 OFFSET ?',
+                       (total(conn, table) // 2,)).fetchone()
+    return encode_cursor(row)
+
+def random_ids(conn, table, rng, n):
+    low, high = conn.execute(f'SELECT MIN(id), MAX(id) FROM {table}').fetchone()
+    return [rng.randint(low, high) for _ in range(n)]
+
+def deep_page(path, table):
+    return lambda conn, rng, n: [get(path, page=total(conn, table) // 10 // 2)] * n
+
+def cursor_page(path, table, keys, descending=False):
+    return lambda conn, rng, n: [get(path, after=middle_cursor(conn, table, keys, descending))] * n
+
+def flight_form(flight):
+    names = ('departure_city', 'arrival_city', 'departure_date', 'arrival_date', 'company', 'price')
+    return dict(zip(names, flight))
+
+def add_flights(conn, rng, n):
+    return [post('/add_flight', dict(flight_form(random_flight(rng)), capacity=180)) for _ in range(n)]
+
+def edit_flights(conn, rng, n):
+    return [post('/edit_flights/process', dict(flight_form(random_flight(rng)), flight_id=flight_id))
+            for flight_id in random_ids(conn, 'flights', rng, n)]
+
+def delete_flights(conn, rng, n):
+    ids = [conn.execute(
+        '''INSERT INTO flights (departure_city, arrival_city, departure_date, arrival_date, company, price)
+           VALUES (?, ?, ?, ?, ?, ?)''', random_flight(rng)).lastrowid for _ in range(n)]
+    conn.commit()
+    return [post('/delete_flight/process', {'flight_id': flight_id}) for flight_id in ids]
+
+def add_users(conn, rng, n):
+    base = conn.execute('SELECT MAX(id) FROM users').fetchone()[0]
+    return [post('/add_user', {'fio': random_fio(rng), 'email': f'new{base + i}@bench.ru',
+                               'password': PASSWORD, 'confirm_password': PASSWORD})
+            for i in range(n)]
+
+def edit_users(conn, rng, n):
+    requests = []
+    for user_id in random_ids(conn, 'users', rng, n):
+        row = conn.execute('SELECT email FROM users WHERE id = ?', (user_id,)).fetchone()
+        email = row['email'] if row else f'missing{user_id}@bench.ru'
+        requests.append(post('/edit_users/process',
+                             {'user_id': user_id, 'fio': random_fio(rng), 'email': email, 'password': ''}))
+    return requests
+
+def delete_users(conn, rng, n):
+    base = conn.execute('SELECT MAX(id) FROM users').fetchone()[0]
+    ids = [conn.execute('INSERT INTO users (fio, email, password) VALUES (?, ?, ?)',
+                        (random_fio(rng), f'delete{base + i}@bench.ru', '0' * 64)).lastrowid
+           for i in range(n)]
+    conn.commit()
+    return [post('/delete_user/process', {'user_ids': [user_id]}) for user_id in ids]
+
+def booking_form(conn, rng, n):
+    return [{'user_id': user_id, 'flight_id': flight_id, 'passenger_fio': random_fio(rng)}
+            for user_id, flight_id in zip(random_ids(conn, 'users', rng, n),
+                                          random_ids(conn, 'flights', rng, n))]
+
+def add_bookings(conn, rng, n):
+    return [post('/add_booking', form) for form in booking_form(conn, rng, n)]
+
+class SoldOutRush:
+    """Все клиенты бронируют один рейс на n // 2 мест, пока он не распродан.
+
+    Кроме задержек отчёт содержит успешные бронирования в секунду под конкуренцией
+    за места, долю отказов «мест нет» и признак перепродажи.
+    """
+
+    def __init__(self):
+        self.flight_id = None
+        self.capacity = 0
+
+    def __call__(self, conn, rng, n):
+        self.capacity = max(n // 2, 1)
+        self.flight_id = conn.execute('''
+            INSERT INTO flights (departure_city, arrival_city, departure_date, arrival_date, company, price, capacity)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (*random_flight(rng), self.capacity)).lastrowid
+        conn.commit()
+        return [post('/add_booking', {'user_id': user_id, 'flight_id': self.flight_id,
+                                      'passenger_fio': random_fio(rng)})
+                for user_id in random_ids(conn, 'users', rng, n)]
+
+    def report(self, conn, stats, elapsed):
+        sold = conn.execute('SELECT seats_sold FROM flights WHERE id = ?', (self.flight_id,)).fetchone()[0]
+        booked = conn.execute('SELECT COUNT(*) FROM booking WHERE flight_id = ?', (self.flight_id,)).fetchone()[0]
+        return {
+            'bookings': booked,
+            'bookings_per_second': round(booked / elapsed, 1) if elapsed else 0,
+            'sold_out_rejection_rate': round(1 - booked / stats['requests'], 3) if stats['requests'] else 0,
+            'oversold': booked > self.capacity or sold != booked
+        }
+
+def edit_bookings(conn, rng, n):
+    return [post('/edit_bookings/process', dict(form, booking_id=booking_id))
+            for form, booking_id in zip(booking_form(conn, rng, n), random_ids(conn, 'booking', rng, n))]
+
+def delete_bookings(conn, rng, n):
+    low, high = conn.execute('SELECT MIN(id), MAX(id) FROM booking').fetchone()
+    ids = rng.sample(range(low, high + 1), min(n, high - low + 1))
+    return [post('/delete_booking/process', {'booking_ids': [booking_id]}) for booking_id in ids]
+
+def api_items(entity, table):
+    return lambda conn, rng, n: [get(f'/api/v1/{entity}/{item_id}')
+                                 for item_id in random_ids(conn, table, rng, n)]
+
+def api_add_flights(conn, rng, n):
+    return [post_json('/api/v1/flights', flight_form(random_flight(rng))) for _ in range(n)]
+
+def typeahead(path, words):
+    return lambda conn, rng, n: [get(path, q=rng.choice(words)[:3]) for _ in range(n)]
+
+def flight_filters(path):
+    return lambda conn, rng, n: [get(path, departure_city=rng.choice(CITIES), sort='price') for _ in range(n)]
+
+# Чтения идут первыми, удаления — последними, чтобы записи не меняли объём данных для чтений
+SCENARIOS = [
+    ('index', repeat('/')),
+    ('health', repeat('/health')),
+    ('edit_flights_first', repeat('/edit_flights')),
+    ('edit_flights_deep_offset', deep_page('/edit_flights', 'flights')),
+    ('edit_flights_deep_cursor', cursor_page('/edit_flights', 'flights', FLIGHT_KEYS)),
+    ('delete_flight_first', repeat('/delete_flight')),
+    ('edit_users_first', repeat('/edit_users')),
+    ('edit_users_deep_offset', deep_page('/edit_users', 'users')),
+    ('edit_users_deep_cursor', cursor_page('/edit_users', 'users', USER_KEYS)),
+    ('delete_user_first', repeat('/delete_user')),
+    ('view_bookings_first', repeat('/view_bookings')),
+    ('view_bookings_deep_offset', deep_page('/view_bookings', 'booking')),
+    ('view_bookings_deep_cursor', cursor_page('/view_bookings', 'booking', BOOKING_KEYS, descending=True)),
+    ('edit_bookings_first', repeat('/edit_bookings')),
+    ('delete_booking_first', repeat('/delete_booking')),
+    ('add_flight_form', repeat('/add_flight')),
+    ('add_user_form', repeat('/add_user')),
+    ('add_booking_form', repeat('/add_booking')),
+    ('import_flights_form', repeat('/import_flights')),
+    ('search_flights', flight_filters('/search_flights')),
+    ('api_flights_filter', flight_filters('/api/flights/filter')),
+    ('api_search', typeahead('/api/search', CITIES + LAST_NAMES)),
+    ('api_users_search', typeahead('/api/users/search', LAST_NAMES)),
+    ('api_flights_search', typeahead('/api/flights/search', CITIES)),
+    ('export_flights_filtered', lambda conn, rng, n: [
+        get('/export/flights', departure_city=rng.choice(CITIES), company=rng.choice(COMPANIES),
+            date_from='2030-06-01', date_to='2030-06-07') for _ in range(n)]),
+    ('api_v1_flights', repeat('/api/v1/flights')),
+    ('api_v1_users', repeat('/api/v1/users')),
+    ('api_v1_bookings', repeat('/api/v1/bookings')),
+    ('api_v1_flight_item', api_items('flights', 'flights')),
+    ('api_v1_booking_item', api_items('bookings', 'booking')),
+    ('add_flight', add_flights),
+    ('edit_flight', edit_flights),
+    ('add_user', add_users),
+    ('edit_user', edit_users),
+    ('add_booking', add_bookings),
+    ('add_booking_sold_out', SoldOutRush()),
+    ('edit_booking', edit_bookings),
+    ('api_v1_add_flight', api_add_flights),
+    ('delete_flight', delete_flights),
+    ('delete_user', delete_users),
+    ('delete_booking', delete_bookings),
+]
+
+# ----- Клиенты и статистика -----
+
+def run_requests(port, requests, concurrency):
+    """Выполнить запросы concurrency клиентами с keep-alive; (задержки, число запросов SQL, ошибки, время)"""
+    latencies = [None] * len(requests)
+    queries = [None] * len(requests)
+    errors = []
+    indexes = itertools.count()
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        cookie = None
+        while True:
+            i = next(indexes)
+            if i >= len(requests):
+                break
+            method, path, body, content_type = requests[i]
+            headers = {}
+            if content_type:
+                headers['Content-Type'] = content_type
+            if cookie:
+                headers['Cookie'] = cookie
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                errors.append(f'{method} {path}: {e}')
+                continue
+            latencies[i] = time.perf_counter() - started
+            if response.status >= 500:
+                errors.append(f'{method} {path}: HTTP {response.status}')
+            if response.getheader('X-Query-Count') is not None:
+                queries[i] = int(response.getheader('X-Query-Count'))
+            # Сессия автовхода сохраняется, как в браузере
+            set_cookie = response.getheader('Set-Cookie')
+            if set_cookie:
+                cookie = set_cookie.split(';', 1)[0]
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(min(concurrency, len(requests)))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, queries, errors, time.perf_counter() - started
+
+def summarize(latencies, queries, errors, elapsed):
+    done = sorted(latency for latency in latencies if latency is not None)
+    counted = [count for count in queries if count is not None]
+    if len(done) > 1:
+        cuts = statistics.quantiles(done, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = done[0] if done else 0
+    return {
+        'requests': len(done),
+        'errors': len(errors),
+        'throughput_rps': round(len(done) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(p50 * 1000, 2),
+        'p95_ms': round(p95 * 1000, 2),
+        'p99_ms': round(p99 * 1000, 2),
+        'queries_per_request': round(statistics.mean(counted), 2) if counted else None
+    }
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+        time.sleep(0.1)
+
+# ----- Запуск -----
+
+def run_size(rows, data_dir, requests, concurrency, workers, only=None, reseed=False):
+    """Прогнать все сценарии на БД с rows бронированиями; сервер — PreforkServer из server.py"""
+    work, seed_seconds = prepare_database(data_dir, rows, reseed)
+    app.config['DATABASE_FILE'] = work
+    close_db_pool()
+    conn = open_db_connection()
+    original_app = app.wsgi_app
+    app.wsgi_app = QueryCounter(original_app)
+    add_connect_hook(trace_queries)
+    sock = create_listener('127.0.0.1', 0)
+    port = sock.getsockname()[1]
+    server = PreforkServer(app, sock, workers)
+    master = threading.Thread(target=server.run, daemon=True)
+    master.start()
+
+    result = {'seed_seconds': seed_seconds, 'scenarios': {}}
+    try:
+        wait_ready(port)
+        run_requests(port, [get('/')] * 50 + [get('/health')] * 50, concurrency)
+        rng = random.Random(SEED)
+        for name, build in SCENARIOS:
+            if only and not any(part in name for part in only):
+                continue
+            batch = build(conn, rng, requests)
+            latencies, queries, errors, elapsed = run_requests(port, batch, concurrency)
+            stats = summarize(latencies, queries, errors, elapsed)
+            # Сценарии с собственными показателями дополняют отчёт по состоянию БД после замера
+            if hasattr(build, 'report'):
+                stats.update(build.report(conn, stats, elapsed))
+            method, path = batch[0][:2]
+            result['scenarios'][name] = dict(method=method, path=path.split('?', 1)[0], **stats)
+            print(f"  {name:28} {stats['throughput_rps']:8.1f} req/s  p50 {stats['p50_ms']:8.2f} ms  "
+                  f"p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+                  f"SQL/запрос {stats['queries_per_request']}  ошибок {stats['errors']}")
+            if 'bookings_per_second' in stats:
+                print(f"  {'':28} {stats['bookings_per_second']:8.1f} бронирований/с  "
+                      f"отказов {stats['sold_out_rejection_rate']:.1%}  перепродажа: {stats['oversold']}")
+    finally:
+        server.stop()
+        master.join()
+        sock.close()
+        conn.close()
+        remove_connect_hook(trace_queries)
+        app.wsgi_app = original_app
+        close_db_pool()
+        remove_database(work)
+    return result
+
+def run_benchmark(sizes=DEFAULT_SIZES, data_dir=None, requests=200, concurrency=16, workers=None,
+                  only=None, reseed=False):
+    data_dir = data_dir or tempfile.gettempdir()
+    workers = workers or app.config['SERVER_WORKERS'] or os.cpu_count() or 1
+    report = {
+        'started': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'cpu_count': os.cpu_count(),
+        'workers': workers,
+        'concurrency': concurrency,
+        'requests_per_scenario': requests,
+        'sizes': {}
+    }
+    database_file = app.config['DATABASE_FILE']
+    try:
+        for rows in sizes:
+            print(f"✓ {rows} строк: {workers} воркеров, {concurrency} клиентов")
+            report['sizes'][str(rows)] = run_size(rows, data_dir, requests, concurrency, workers, only, reseed)
+    finally:
+        app.config['DATABASE_FILE'] = database_file
+    return report
+
+def compare(report, baseline, threshold=0.2):
+    """Регрессии относительно прошлого отчёта: p95 выросла или пропускная способность упала больше threshold"""
+    regressions = []
+    for rows, size in report['sizes'].items():
+        base_size = baseline.get('sizes', {}).get(rows)
+        if not base_size:
+            continue
+        for name, stats in size['scenarios'].items():
+            base = base_size['scenarios'].get(name)
+            if not base:
+                continue
+            if base['p95_ms'] and stats['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                regressions.append(f"{rows}/{name}: p95 {base['p95_ms']} -> {stats['p95_ms']} ms")
+            if base['throughput_rps'] and stats['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+                regressions.append(f"{rows}/{name}: {base['throughput_rps']} -> {stats['throughput_rps']} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест всех маршрутов приложения')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='размеры БД (число бронирований)')
+    parser.add_argument('--requests', type=int, default=200, help='запросов на сценарий')
+    parser.add_argument('--concurrency', type=int, default=16, help='одновременных клиентов')
+    parser.add_argument('--workers', type=int, default=None, help='процессов сервера')
+    parser.add_argument('--only', nargs='+', help='только сценарии, содержащие эти подстроки')
+    parser.add_argument('--data-dir', help='каталог для заполненных БД (по умолчанию временный)')
+    parser.add_argument('--reseed', action='store_true', help='заполнить БД заново')
+    parser.add_argument('--output', default='benchmark.json', help='файл отчёта JSON')
+    parser.add_argument('--baseline', help='отчёт прошлого запуска для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2, help='допустимое ухудшение (доля)')
+    args = parser.parse_args()
+
+    # Журнал доступа каждого запроса исказил бы замеры выводом в консоль
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    report = run_benchmark(args.sizes, args.data_dir, args.requests, args.concurrency, args.workers,
+                           args.only, args.reseed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"✓ Отчёт сохранён в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"✗ Регрессия: {regression}")
+        if regressions:
+            return 1
+        print("✓ Регрессий нет")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
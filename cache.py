@@ -0,0 +1,91 @@
+import threading
+import time
+from createdb import get_db_connection, get_database_file
+from metrics import cache_hit, cache_miss
+
+# ===== ПОЛЬЗОВАТЕЛЬ ДЛЯ АВТОВХОДА =====
+
+BOOTSTRAP_EMAIL = 'admin@mail.ru'
+
+_bootstrap_lock = threading.Lock()
+# Файл БД -> (пользователь, момент чтения из БД)
+_bootstrap = {}
+
+def get_bootstrap_user(ttl=5):
+    """Пользователь для автовхода {'id', 'fio'} или None.
+
+    БД читается после сброса кеша или по истечении ttl секунд: сброс видит только
+    свой процесс, а TTL ограничивает время, пока другие воркеры отдают устаревшую запись.
+    """
+    path = get_database_file()
+    cached = _bootstrap.get(path)
+    if cached is not None and time.monotonic() - cached[1] < ttl:
+        cache_hit('bootstrap_user')
+        return cached[0]
+    
+    with _bootstrap_lock:
+        cached = _bootstrap.get(path)
+        if cached is not None and time.monotonic() - cached[1] < ttl:
+            cache_hit('bootstrap_user')
+            return cached[0]
+        cache_miss('bootstrap_user')
+        conn = get_db_connection()
+        row = conn.execute("SELECT id, fio FROM users WHERE email = ?", (BOOTSTRAP_EMAIL,)).fetchone()
+        conn.close()
+        user = {'id': row['id'], 'fio': row['fio']} if row else None
+        _bootstrap[path] = (user, time.monotonic())
+        return user
+
+def invalidate_bootstrap_user(user_ids=None, email=None):
+    """Сбросить кеш автовхода, если затронут его пользователь или email; без аргументов — всегда"""
+    path = get_database_file()
+    user = _bootstrap.get(path, (None,))[0]
+    if user is not None and user_ids is not None and email != BOOTSTRAP_EMAIL:
+        if str(user['id']) not in {str(user_id) for user_id in user_ids}:
+            return
+    _bootstrap.pop(path, None)
+
+# ===== СНИМКИ ДАННЫХ С TTL =====
+
+class SnapshotCache:
+    """Значение с TTL для текущего файла БД.
+
+    Перестройку выполняет один поток, остальные ждут его результат.
+    invalidate() во время перестройки не даёт сохранить устаревший снимок.
+    """
+
+    def __init__(self, name='snapshot'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._path = None
+        self._value = None
+        self._expires = 0.0
+        self._generation = 0
+
+    def _fresh(self, path):
+        return self._path == path and time.monotonic() < self._expires
+
+    def get(self, build, ttl):
+        path = get_database_file()
+        if self._fresh(path):
+            cache_hit(self.name)
+            return self._value
+        
+        with self._lock:
+            if self._fresh(path):
+                cache_hit(self.name)
+                return self._value
+            cache_miss(self.name)
+            generation = self._generation
+            value = build()
+            if generation == self._generation:
+                self._path = path
+                self._value = value
+                self._expires = time.monotonic() + ttl
+            return value
+
+    def invalidate(self):
+        self._generation += 1
+        self._expires = 0.0
+
+dashboard_cache = SnapshotCache('dashboard')
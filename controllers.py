@@ -1,79 +1,584 @@
-from flask import request, render_template, redirect, url_for, flash, session
+from flask import request, render_template, redirect, url_for, flash, session, jsonify, current_app, Response
 import sqlite3
 import hashlib
+import re
+import json
+import base64
+import logging
+from datetime import datetime
 from validate import *
-from createdb import get_db_connection
+from createdb import get_db_connection, get_database_file, get_row_counts, get_table_versions, DEFAULT_CAPACITY
+from cache import invalidate_bootstrap_user, dashboard_cache
+from importer import import_flights, detect_format
+from exporter import export_rows, EXPORT_FORMATS
+from writer import run_write
+
+logger = logging.getLogger(__name__)
 
 # ===== ОБЩИЕ ФУНКЦИИ ПАГИНАЦИИ =====
 
-def get_flights_page(page=0, per_page=10):
-    """Получить рейсы с пагинацией"""
+# Ключи сортировки: (выражение SQL, поле строки); последний ключ уникален
+FLIGHT_KEYS = [('departure_date', 'departure_date'), ('departure_city', 'departure_city'), ('id', 'id')]
+USER_KEYS = [('fio', 'fio'), ('id', 'id')]
+BOOKING_KEYS = [('b.booking_date', 'booking_date'), ('b.id', 'id')]
+
+def encode_cursor(values):
+    """Закодировать значения ключей сортировки в курсор для URL"""
+    data = json.dumps(list(values), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Раскодировать курсор; None, если он повреждён"""
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    # В курсоре только скаляры, которые SQLite примет как параметры
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))):
+            return None
+        if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+            return None
+    return values
+
+def build_page_query(query, keys, per_page=10, after=None, before=None, page=0, descending=False,
+                     where=(), params=()):
+    """SQL страницы по ключам сортировки (keyset) с дополнительными условиями where.
+
+    Возвращает (sql, params, backward, has_cursor, offset).
+    """
+    after = decode_cursor(after, len(keys))
+    before = decode_cursor(before, len(keys)) if after is None else None
+    backward = before is not None
+    cursor = before if backward else after
+    
+    reverse = descending != backward
+    direction = ' DESC' if reverse else ''
+    columns = ', '.join(expr for expr, _ in keys)
+    
+    conditions = list(where)
+    sql_params = list(params)
+    if cursor is not None:
+        placeholders = ', '.join('?' for _ in keys)
+        conditions.append(f"({columns}) {'<' if reverse else '>'} ({placeholders})")
+        sql_params.extend(cursor)
+    
+    sql = query
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY ' + ', '.join(expr + direction for expr, _ in keys)
+    sql += ' LIMIT ? OFFSET ?'
+    offset = page * per_page if cursor is None else 0
+    sql_params.extend([per_page + 1, offset])
+    return sql, sql_params, backward, cursor is not None, offset
+
+def fetch_page(query, keys, per_page=10, after=None, before=None, page=0, descending=False,
+               where=(), params=()):
+    """Страница по ключам сортировки (keyset): стоимость не зависит от номера страницы.
+
+    after/before — курсоры соседних страниц; без курсора используется OFFSET по page,
+    чтобы старые ссылки вида ?page=N продолжали работать.
+    Возвращает (rows, next_cursor, prev_cursor).
+    """
+    sql, sql_params, backward, has_cursor, offset = build_page_query(
+        query, keys, per_page, after, before, page, descending, where, params
+    )
+    
     conn = get_db_connection()
-    cursor = conn.cursor()
-    offset = page * per_page
+    rows = conn.execute(sql, sql_params).fetchall()
+    conn.close()
     
-    cursor.execute('SELECT * FROM flights ORDER BY departure_date, departure_city LIMIT ? OFFSET ?', 
-                   (per_page, offset))
-    flights = cursor.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+    if not rows:
+        return rows, None, None
     
-    cursor.execute('SELECT COUNT(*) as total FROM flights')
-    total_flights = cursor.fetchone()['total']
-    total_pages = (total_flights + per_page - 1) // per_page
+    def key_of(row):
+        return encode_cursor(row[field] for _, field in keys)
     
+    has_next = has_more if not backward else True
+    has_prev = has_more if backward else (has_cursor or offset > 0)
+    next_cursor = key_of(rows[-1]) if has_next else None
+    prev_cursor = key_of(rows[0]) if has_prev else None
+    return rows, next_cursor, prev_cursor
+
+def query_plan(sql, params):
+    """Строки EXPLAIN QUERY PLAN для запроса"""
+    conn = get_db_connection()
+    plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
     conn.close()
-    return flights, total_pages
+    return plan
+
+def count_pages(table, per_page=10):
+    conn = get_db_connection()
+    total = get_row_counts(conn)[table]
+    conn.close()
+    return (total + per_page - 1) // per_page
+
+def get_flights_page(page=0, per_page=10, after=None, before=None):
+    """Получить рейсы с пагинацией"""
+    flights, next_cursor, prev_cursor = fetch_page(
+        'SELECT * FROM flights', FLIGHT_KEYS, per_page, after, before, page
+    )
+    return flights, count_pages('flights', per_page), next_cursor, prev_cursor
 
-def get_users_page(page=0, per_page=10):
+def get_users_page(page=0, per_page=10, after=None, before=None):
     """Получить пользователей с пагинацией"""
+    users, next_cursor, prev_cursor = fetch_page(
+        'SELECT * FROM users', USER_KEYS, per_page, after, before, page
+    )
+    return users, count_pages('users', per_page), next_cursor, prev_cursor
+
+# Бронирования вместе с пользователем и рейсом
+BOOKINGS_QUERY = '''
+    SELECT 
+        b.id, 
+        b.user_id,
+        b.flight_id,
+        b.passenger_fio, 
+        b.booking_date,
+        u.fio as user_fio, 
+        u.email as user_email,
+        f.departure_city, 
+        f.arrival_city, 
+        f.departure_date, 
+        f.arrival_date, 
+        f.company, 
+        f.price
+    FROM booking b
+    CROSS JOIN users u ON b.user_id = u.id
+    CROSS JOIN flights f ON b.flight_id = f.id
+'''
+
+def get_bookings_page(page=0, per_page=10, after=None, before=None):
+    """Получить бронирования с пагинацией"""
+    # CROSS JOIN фиксирует порядок соединения: обход booking по idx_booking_date без сортировки
+    bookings, next_cursor, prev_cursor = fetch_page(
+        BOOKINGS_QUERY, BOOKING_KEYS, per_page, after, before, page, descending=True
+    )
+    return bookings, count_pages('booking', per_page), next_cursor, prev_cursor
+
+def page_args():
+    """Параметры пагинации из строки запроса"""
+    return (request.args.get('page', 0, type=int),
+            request.args.get('after'),
+            request.args.get('before'))
+
+def table_version(table):
+    """Версия таблицы для ключей кеша фрагментов.
+
+    Читается до выборки страницы: изменение между ними оставит в кеше
+    свежие строки под старой версией, но не старые под новой.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    offset = page * per_page
+    version = get_table_versions(conn, [table])[table][0]
+    conn.close()
+    return version
+
+# ===== МЕСТА НА РЕЙСАХ =====
+
+SOLD_OUT_MESSAGE = 'Нет свободных мест на рейсе'
+CAPACITY_MESSAGE = 'Вместимость не может быть меньше числа проданных мест'
+
+def insert_booking(conn, user_id, flight_id, passenger_fio):
+    """Условный INSERT ... SELECT: id бронирования или None, если свободных мест нет"""
+    cursor = conn.execute('''
+        INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+        SELECT ?, id, ?, datetime('now') FROM flights
+        WHERE id = ? AND seats_sold < capacity
+    ''', (user_id, passenger_fio, flight_id))
+    return cursor.lastrowid if cursor.rowcount else None
+
+def insert_flight(conn, values, capacity=DEFAULT_CAPACITY):
+    """Добавить рейс: values — поля FLIGHT_FIELDS с ценой в виде числа"""
+    cursor = conn.execute(
+        '''INSERT INTO flights 
+           (departure_city, arrival_city, departure_date, arrival_date, company, price, capacity) 
+           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        (*values, capacity)
+    )
+    return cursor.lastrowid
+
+def create_booking(user_id, flight_id, passenger_fio):
+    """Забронировать место на рейсе: (id бронирования, ошибка).
+
+    Распроданный рейс отклоняется чтением одной строки flights, без блокировки на запись.
+    Иначе выполняется один условный INSERT ... SELECT (insert_booking) в транзакции
+    BEGIN IMMEDIATE или в группе очереди записи: бронирование добавляется, только если
+    seats_sold < capacity, а триггер booking_seats_insert в том же операторе увеличивает
+    seats_sold. CHECK на flights не даёт продать место сверх вместимости и при обходе этой функции.
+    """
+    conn = get_db_connection()
+    flight = conn.execute(
+        'SELECT seats_sold >= capacity AS sold_out FROM flights WHERE id = ?', (flight_id,)
+    ).fetchone()
+    conn.close()
+    if flight is None:
+        return None, 'Рейс не найден'
+    if flight['sold_out']:
+        return None, SOLD_OUT_MESSAGE
     
-    cursor.execute('SELECT * FROM users ORDER BY fio LIMIT ? OFFSET ?', 
-                   (per_page, offset))
-    users = cursor.fetchall()
+    booking_id = run_write(lambda conn: insert_booking(conn, user_id, flight_id, passenger_fio))
+    if booking_id is None:
+        return None, SOLD_OUT_MESSAGE
     
-    cursor.execute('SELECT COUNT(*) as total FROM users')
-    total_users = cursor.fetchone()['total']
-    total_pages = (total_users + per_page - 1) // per_page
+    dashboard_cache.invalidate()
+    return booking_id, None
+
+# ===== МАССОВОЕ УДАЛЕНИЕ =====
+
+def bulk_delete(table, raw_ids, dependent=None):
+    """Удалить строки таблицы по списку id набором запросов в одной транзакции.
+
+    dependent — (таблица, столбец): строки, на которые есть ссылки, не удаляются.
+    Возвращает {id: 'deleted' | 'missing' | 'referenced'} с id в виде строк из формы.
+    """
+    results = {str(raw_id): 'missing' for raw_id in raw_ids}
+    # isdigit() пропускает '²' и '٣', поэтому id — только ASCII-цифры; остальные считаются отсутствующими
+    parsed = {raw_id: int(raw_id) for raw_id in results if raw_id.isascii() and raw_id.isdigit()}
+    ids = sorted(set(parsed.values()))
+    if not ids:
+        return results
     
-    conn.close()
-    return users, total_pages
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        found = existing_ids(**{table: ids})[table]
+        
+        referenced = set()
+        if dependent and found:
+            dep_table, column = dependent
+            referenced = {row[0] for row in conn.execute(
+                f'SELECT DISTINCT {column} FROM {dep_table} '
+                f'WHERE {column} IN (SELECT value FROM json_each(?))',
+                (json.dumps(sorted(found)),)
+            )}
+        
+        to_delete = sorted(found - referenced)
+        if to_delete:
+            conn.execute(
+                f'DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps(to_delete),)
+            )
+        conn.commit()
+        dashboard_cache.invalidate()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    for raw_id, item_id in parsed.items():
+        if item_id in found:
+            results[raw_id] = 'referenced' if item_id in referenced else 'deleted'
+    return results
 
-def get_bookings_page(page=0, per_page=10):
-    """Получить бронирования с пагинацией"""
+def format_ids(ids, limit=20):
+    """Список id для flash-сообщения, усечённый до limit элементов"""
+    ids = list(ids)
+    text = ', '.join(ids[:limit])
+    if len(ids) > limit:
+        text += f' и ещё {len(ids) - limit}'
+    return text
+
+# ===== ПОДСКАЗКИ ДЛЯ ФОРМ =====
+
+TYPEAHEAD_LIMIT = 20
+
+def prefix_search(query, ranges, limit):
+    """Объединить результаты поиска по нескольким префиксам, не более limit строк.
+
+    query — SELECT с плейсхолдером {where}; ranges — список (условие, параметры).
+    Каждый префикс ищется диапазоном по индексу: column >= p AND column < p + U+10FFFF.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    offset = page * per_page
+    rows = {}
+    for condition, params in ranges:
+        if len(rows) >= limit:
+            break
+        for row in conn.execute(query.format(where=condition), (*params, limit)):
+            rows.setdefault(row['id'], row)
+    conn.close()
+    return list(rows.values())[:limit]
+
+def prefix_range(column, prefix):
+    return f'{column} >= ? AND {column} < ?', (prefix, prefix + '\U0010ffff')
+
+def user_label(user):
+    return f"{user['fio']} ({user['email']})"
+
+def flight_label(flight):
+    return (f"{flight['departure_city']} → {flight['arrival_city']} "
+            f"({flight['departure_date']} - {flight['company']})")
+
+def typeahead_args():
+    query = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', TYPEAHEAD_LIMIT, type=int), 1), TYPEAHEAD_LIMIT)
+    return query, limit
+
+def controller_search_users():
+    """Подсказки пользователей по началу ФИО или email"""
+    query, limit = typeahead_args()
+    if not query:
+        return jsonify([])
     
-    cursor.execute('''
-        SELECT 
-            b.id, 
-            b.passenger_fio, 
-            b.booking_date,
-            u.fio as user_fio, 
-            u.email as user_email,
-            f.departure_city, 
-            f.arrival_city, 
-            f.departure_date, 
-            f.arrival_date, 
-            f.company, 
-            f.price
-        FROM booking b
-        JOIN users u ON b.user_id = u.id
-        JOIN flights f ON b.flight_id = f.id
-        ORDER BY b.booking_date DESC 
-        LIMIT ? OFFSET ?
-    ''', (per_page, offset))
+    ranges = [prefix_range('fio', query)]
+    if query[:1].upper() + query[1:] != query:
+        ranges.append(prefix_range('fio', query[:1].upper() + query[1:]))
+    ranges.append(prefix_range('email', query.lower()))
     
-    bookings = cursor.fetchall()
+    users = prefix_search('SELECT id, fio, email FROM users WHERE {where} LIMIT ?', ranges, limit)
+    return jsonify([{'id': user['id'], 'label': user_label(user)} for user in users])
+
+def controller_search_flights():
+    """Подсказки рейсов по маршруту («Москва → Со»), дате или авиакомпании"""
+    query, limit = typeahead_args()
+    if not query:
+        return jsonify([])
     
-    cursor.execute('SELECT COUNT(*) as total FROM booking')
-    total_bookings = cursor.fetchone()['total']
-    total_pages = (total_bookings + per_page - 1) // per_page
+    if query[0].isdigit():
+        ranges = [prefix_range('departure_date', query)]
+    elif '→' in query or '>' in query:
+        departure, arrival = [part.strip(' -') for part in query.replace('>', '→').split('→', 1)]
+        condition, params = prefix_range('arrival_city', arrival)
+        ranges = [(f'departure_city = ? AND {condition}', (departure, *params))]
+    else:
+        ranges = [prefix_range(column, query[:1].upper() + query[1:])
+                  for column in ('departure_city', 'arrival_city', 'company')]
     
+    flights = prefix_search('SELECT * FROM flights WHERE {where} LIMIT ?', ranges, limit)
+    return jsonify([{'id': flight['id'], 'label': flight_label(flight)} for flight in flights])
+
+# ===== ПОИСК РЕЙСОВ =====
+
+FLIGHT_SORTS = {
+    'date': (FLIGHT_KEYS, False),
+    'price': ([('price', 'price'), ('id', 'id')], False),
+    'price_desc': ([('price', 'price'), ('id', 'id')], True)
+}
+
+def parse_flight_filters(args):
+    """Условия поиска рейсов из строки запроса: (filters, where, params, error)"""
+    filters = {name: args.get(name, '').strip() for name in
+               ('departure_city', 'arrival_city', 'date_from', 'date_to', 'company',
+                'price_min', 'price_max', 'sort')}
+    filters = {name: value for name, value in filters.items() if value}
+    where = []
+    params = []
+    
+    for name in ('departure_city', 'arrival_city', 'company'):
+        if name in filters:
+            where.append(f'{name} = ?')
+            params.append(filters[name])
+    
+    for name, condition in (('date_from', 'departure_date >= ?'), ('date_to', 'departure_date <= ?')):
+        if name in filters:
+            try:
+                datetime.strptime(filters[name], '%Y-%m-%d')
+            except ValueError:
+                return filters, where, params, 'Неверный формат даты'
+            where.append(condition)
+            params.append(filters[name])
+    
+    for name, condition in (('price_min', 'price >= ?'), ('price_max', 'price <= ?')):
+        if name in filters:
+            if not filters[name].isdigit():
+                return filters, where, params, 'Цена должна быть целым неотрицательным числом'
+            where.append(condition)
+            params.append(int(filters[name]))
+    
+    if filters.get('sort', 'date') not in FLIGHT_SORTS:
+        return filters, where, params, 'Неизвестный порядок сортировки'
+    
+    return filters, where, params, None
+
+# (файл БД, SQL) -> план; набор фильтров и сортировок конечен, поэтому кеш ограничен
+_search_plans = {}
+
+def is_full_scan(plan):
+    """Есть ли в плане обход таблицы без условия поиска, в том числе SCAN ... USING INDEX"""
+    return any(line.startswith('SCAN') for line in plan)
+
+def search_plan(sql, params, filters):
+    """План поискового запроса; EXPLAIN выполняется один раз на форму запроса"""
+    key = (get_database_file(), sql)
+    plan = _search_plans.get(key)
+    if plan is None:
+        plan = _search_plans[key] = query_plan(sql, params)
+        # Без фильтров обход индекса сортировки с LIMIT — ожидаемый план
+        if filters.keys() - {'sort'} and is_full_scan(plan):
+            logger.warning(f"Flight search fell back to a full scan: {sorted(filters)} {plan}")
+    return plan
+
+def search_flights(args, per_page=20):
+    """Поиск рейсов по фильтрам; возвращает (flights, next_cursor, prev_cursor, plan, filters, error)"""
+    filters, where, params, error = parse_flight_filters(args)
+    if error:
+        return [], None, None, [], filters, error
+    
+    keys, descending = FLIGHT_SORTS[filters.get('sort', 'date')]
+    after = args.get('after')
+    before = args.get('before')
+    sql, sql_params, _, _, _ = build_page_query(
+        'SELECT * FROM flights', keys, per_page, after, before, 0, descending, where, params
+    )
+    plan = search_plan(sql, sql_params, filters)
+    
+    flights, next_cursor, prev_cursor = fetch_page(
+        'SELECT * FROM flights', keys, per_page, after, before, 0, descending, where, params
+    )
+    return flights, next_cursor, prev_cursor, plan, filters, None
+
+def controller_search_flights_page():
+    """Страница поиска рейсов"""
+    flights, next_cursor, prev_cursor, plan, filters, error = search_flights(request.args)
+    return render_template('search_flights.html',
+                         flights=flights,
+                         filters=filters,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         plan=plan,
+                         error=error)
+
+def controller_filter_flights():
+    """Поиск рейсов в JSON"""
+    flights, next_cursor, prev_cursor, plan, filters, error = search_flights(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({'flights': [dict(flight) for flight in flights],
+                    'next_cursor': next_cursor,
+                    'prev_cursor': prev_cursor,
+                    'plan': plan})
+
+# ===== ПОЛНОТЕКСТОВЫЙ ПОИСК =====
+
+SEARCH_LIMIT = 50
+
+def fts_query(text):
+    """Запрос FTS5 из пользовательского ввода: каждое слово ищется как префикс"""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search_text(text, limit=SEARCH_LIMIT):
+    """Бронирования и пользователи, найденные по ФИО пассажира, ФИО или email, по релевантности"""
+    query = fts_query(text)
+    if not query:
+        return [], []
+    
+    conn = get_db_connection()
+    # Ранжирование (bm25) выполняется внутри FTS5, соединения — только для первых limit строк
+    bookings = conn.execute('''
+        SELECT b.id, b.passenger_fio, b.booking_date,
+               u.fio as user_fio, u.email as user_email,
+               f.departure_city, f.arrival_city, f.departure_date,
+               m.rank
+        FROM (SELECT rowid, rank FROM booking_fts WHERE booking_fts MATCH ? ORDER BY rank LIMIT ?) m
+        CROSS JOIN booking b ON b.id = m.rowid
+        CROSS JOIN users u ON b.user_id = u.id
+        CROSS JOIN flights f ON b.flight_id = f.id
+        ORDER BY m.rank
+    ''', (query, limit)).fetchall()
+    users = conn.execute('''
+        SELECT u.id, u.fio, u.email, m.rank
+        FROM (SELECT rowid, rank FROM users_fts WHERE users_fts MATCH ? ORDER BY rank LIMIT ?) m
+        CROSS JOIN users u ON u.id = m.rowid
+        ORDER BY m.rank
+    ''', (query, limit)).fetchall()
     conn.close()
-    return bookings, total_pages
+    return bookings, users
+
+def controller_search_text():
+    """Полнотекстовый поиск бронирований и пользователей в JSON"""
+    text = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', SEARCH_LIMIT, type=int), 1), SEARCH_LIMIT)
+    bookings, users = search_text(text, limit)
+    return jsonify({'bookings': [dict(booking) for booking in bookings],
+                    'users': [dict(user) for user in users]})
+
+# ===== ВЫГРУЗКА =====
+
+def parse_booking_filters(args):
+    """Условия выгрузки бронирований: (where, params, error)"""
+    where = []
+    params = []
+    for name in ('user_id', 'flight_id'):
+        value = args.get(name, '').strip()
+        if value:
+            if not value.isdigit():
+                return where, params, 'ID должен быть числом'
+            where.append(f'b.{name} = ?')
+            params.append(int(value))
+
+    # booking_date хранится как 'YYYY-MM-DD HH:MM:SS', date_to включает весь день
+    for name, condition in (('date_from', 'b.booking_date >= ?'),
+                            ('date_to', "b.booking_date < date(?, '+1 day')")):
+        value = args.get(name, '').strip()
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return where, params, 'Неверный формат даты'
+            where.append(condition)
+            params.append(value)
+    return where, params, None
+
+def parse_user_filters(args):
+    """Условия выгрузки пользователей по префиксу ФИО или email: (where, params, error)"""
+    where = []
+    params = []
+    for name in ('fio', 'email'):
+        value = args.get(name, '').strip()
+        if value:
+            condition, range_params = prefix_range(name, value)
+            where.append(condition)
+            params.extend(range_params)
+    return where, params, None
+
+def parse_export_flight_filters(args):
+    filters, where, params, error = parse_flight_filters(args)
+    return where, params, error
+
+# Запрос, порядок выгрузки и разбор фильтров для каждой сущности
+EXPORTS = {
+    'bookings': (BOOKINGS_QUERY, 'b.id', parse_booking_filters),
+    'flights': ('''
+        SELECT id, departure_city, arrival_city, departure_date, arrival_date, company, price,
+               capacity, seats_sold
+        FROM flights
+    ''', 'id', parse_export_flight_filters),
+    'users': ('SELECT id, fio, email FROM users', 'id', parse_user_filters)
+}
+
+def controller_export(entity):
+    """Потоковая выгрузка таблицы в CSV или NDJSON, при gzip=1 — со сжатием"""
+    query, order, parse_filters = EXPORTS[entity]
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Поддерживаются форматы csv и ndjson'}), 400
+
+    where, params, error = parse_filters(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    sql = query
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY {order}'
+
+    compress = request.args.get('gzip') == '1'
+    filename = f'{entity}.{fmt}' + ('.gz' if compress else '')
+    body = export_rows(sql, params, fmt, current_app.config['EXPORT_BATCH_SIZE'], compress)
+
+    return Response(body,
+                    mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 # ===== КОНТРОЛЛЕРЫ ДЛЯ РЕЙСОВ =====
 
@@ -86,41 +591,59 @@ def controller_add_flight():
         arrival_date = request.form.get('arrival_date', '')
         company = request.form.get('company', '')
         price = request.form.get('price', '')
+        capacity = request.form.get('capacity') or DEFAULT_CAPACITY
         
         is_valid, error_message = checkFlight(
             departure_city, arrival_city, departure_date, arrival_date, company, price
         )
+        if is_valid:
+            is_valid, error_message = checkCapacity(capacity)
         
         if not is_valid:
             return render_template('add_flight.html', error=error_message)
         
-        conn = get_db_connection()
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''INSERT INTO flights 
-                   (departure_city, arrival_city, departure_date, arrival_date, company, price) 
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (departure_city, arrival_city, departure_date, arrival_date, company, int(price))
-            )
-            conn.commit()
+            values = (departure_city, arrival_city, departure_date, arrival_date, company, parse_price(price))
+            run_write(lambda conn: insert_flight(conn, values, int(capacity)))
+            dashboard_cache.invalidate()
             flash('Рейс успешно добавлен', 'success')
             return redirect('/')
         except Exception as e:
             return render_template('add_flight.html', error=f'Ошибка при сохранении: {str(e)}')
-        finally:
-            conn.close()
     
     return render_template('add_flight.html')
 
+def controller_import_flights():
+    """Массовый импорт рейсов из файла CSV или JSONL"""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return render_template('import_flights.html', error='Выберите файл для импорта')
+        
+        fmt = request.form.get('format') or detect_format(upload.filename)
+        if fmt not in ('csv', 'jsonl'):
+            return render_template('import_flights.html', error='Поддерживаются файлы .csv, .jsonl и .ndjson')
+        
+        try:
+            result = import_flights(upload.stream, fmt, current_app.config['IMPORT_CHUNK_SIZE'])
+        except Exception as e:
+            return render_template('import_flights.html', error=f'Ошибка при импорте: {str(e)}')
+        return render_template('import_flights.html', result=result)
+    
+    return render_template('import_flights.html')
+
 def controller_edit_flights():
     """Редактирование рейсов с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    flights, total_pages = get_flights_page(page)
+    page, after, before = page_args()
+    version = table_version('flights')
+    flights, total_pages, next_cursor, prev_cursor = get_flights_page(page, after=after, before=before)
     return render_template('edit_flights.html', 
                          flights=flights, 
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         version=version)
 
 def controller_process_edit_flights():
     """Обработка редактирования рейсов"""
@@ -132,6 +655,7 @@ def controller_process_edit_flights():
         arrival_date = request.form.get('arrival_date')
         company = request.form.get('company')
         price = request.form.get('price')
+        capacity = request.form.get('capacity')
         
         # Валидация входных данных
         if not flight_id:
@@ -146,6 +670,9 @@ def controller_process_edit_flights():
             departure_city, arrival_city, departure_date, arrival_date, company, price
         )
         
+        if is_valid and capacity:
+            is_valid, error_message = checkCapacity(capacity)
+        
         if not is_valid:
             flash(f'Ошибка валидации: {error_message}', 'error')
             return redirect(url_for('edit_flights_page'))
@@ -154,16 +681,21 @@ def controller_process_edit_flights():
         try:
             cursor = conn.cursor()
             
+            # Без capacity в форме вместимость не меняется
             cursor.execute(
                 '''UPDATE flights SET 
                    departure_city=?, arrival_city=?, departure_date=?, 
-                   arrival_date=?, company=?, price=?
+                   arrival_date=?, company=?, price=?, capacity=COALESCE(?, capacity)
                    WHERE id=?''',
-                (departure_city, arrival_city, departure_date, arrival_date, company, int(price), flight_id)
+                (departure_city, arrival_city, departure_date, arrival_date, company, parse_price(price),
+                 int(capacity) if capacity else None, flight_id)
             )
             conn.commit()
+            dashboard_cache.invalidate()
             
             flash('Рейс успешно обновлен', 'success')
+        except sqlite3.IntegrityError:
+            flash(f'Ошибка валидации: {CAPACITY_MESSAGE}', 'error')
         except Exception as e:
             flash(f'Ошибка при обновлении: {str(e)}', 'error')
         finally:
@@ -173,12 +705,16 @@ def controller_process_edit_flights():
 
 def controller_delete_flights():
     """Удаление рейсов с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    flights, total_pages = get_flights_page(page)
+    page, after, before = page_args()
+    version = table_version('flights')
+    flights, total_pages, next_cursor, prev_cursor = get_flights_page(page, after=after, before=before)
     return render_template('delete_flights.html', 
                          flights=flights, 
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         version=version)
 
 def controller_process_delete_flights():
     """Обработка удаления рейса"""
@@ -210,6 +746,7 @@ def controller_process_delete_flights():
         # Удаляем рейс
         conn.execute("DELETE FROM flights WHERE id = ?", (flight_id,))
         conn.commit()
+        dashboard_cache.invalidate()
         conn.close()
         
         flash('Рейс успешно удален', 'success')
@@ -242,6 +779,8 @@ def controller_add_user():
                 (fio, email, hashed_password)
             )
             conn.commit()
+            dashboard_cache.invalidate()
+            invalidate_bootstrap_user([], email)
             flash('Пользователь успешно добавлен', 'success')
             return redirect('/')
         except sqlite3.IntegrityError:
@@ -255,12 +794,14 @@ def controller_add_user():
 
 def controller_edit_users():
     """Редактирование пользователей с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    users, total_pages = get_users_page(page)
+    page, after, before = page_args()
+    users, total_pages, next_cursor, prev_cursor = get_users_page(page, after=after, before=before)
     return render_template('edit_users.html', 
                          users=users, 
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor)
 
 def controller_process_edit_users():
     """Обработка редактирования пользователей"""
@@ -280,28 +821,18 @@ def controller_process_edit_users():
             return redirect(url_for('edit_users_page'))
         
         # Базовая валидация полей
-        if not fio or not email:
-            flash('ФИО и email обязательны для заполнения', 'error')
+        is_valid, error_message = checkUserUpdate(fio, email, password)
+        if not is_valid:
+            flash(error_message, 'error')
             return redirect(url_for('edit_users_page'))
-        
+
         fio = fio.strip()
-        if len(fio) < 2:
-            flash('ФИО должно содержать минимум 2 символа', 'error')
-            return redirect(url_for('edit_users_page'))
-        
         email = email.strip()
-        if '@' not in email or '.' not in email:
-            flash('Неверный формат email', 'error')
-            return redirect(url_for('edit_users_page'))
-        
+
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
             if password:
-                if len(password) < 6:
-                    flash('Пароль должен быть не менее 6 символов', 'error')
-                    return redirect(url_for('edit_users_page'))
-                
                 hashed_password = hashlib.sha256(password.encode()).hexdigest()
                 cursor.execute(
                     'UPDATE users SET fio=?, email=?, password=? WHERE id=?',
@@ -313,6 +844,8 @@ def controller_process_edit_users():
                     (fio, email, user_id)
                 )
             conn.commit()
+            dashboard_cache.invalidate()
+            invalidate_bootstrap_user([user_id], email)
             flash('Пользователь успешно обновлен', 'success')
         except sqlite3.IntegrityError:
             flash('Пользователь с таким email уже существует', 'error')
@@ -325,12 +858,14 @@ def controller_process_edit_users():
 
 def controller_delete_users():
     """Удаление пользователей с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    users, total_pages = get_users_page(page)
+    page, after, before = page_args()
+    users, total_pages, next_cursor, prev_cursor = get_users_page(page, after=after, before=before)
     return render_template('delete_users.html', 
                          users=users, 
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor)
 
 def controller_process_delete_users():
     """Обработка удаления пользователей"""
@@ -341,29 +876,17 @@ def controller_process_delete_users():
             flash('Не выбрано ни одного пользователя для удаления', 'error')
             return redirect(url_for('delete_users_page'))
         
-        conn = get_db_connection()
         try:
-            cursor = conn.cursor()
-            deleted_count = 0
+            results = bulk_delete('users', user_ids, dependent=('booking', 'user_id'))
+            missing = [user_id for user_id, status in results.items() if status == 'missing']
+            referenced = [user_id for user_id, status in results.items() if status == 'referenced']
+            deleted_count = sum(1 for status in results.values() if status == 'deleted')
+            invalidate_bootstrap_user([user_id for user_id, status in results.items() if status == 'deleted'])
             
-            for user_id in user_ids:
-                # Проверяем существование пользователя
-                if not validate_user_exists(user_id):
-                    flash(f'Пользователь с ID {user_id} не существует', 'error')
-                    continue
-                
-                # Проверяем, есть ли бронирования у пользователя
-                cursor.execute("SELECT COUNT(*) as count FROM booking WHERE user_id=?", (user_id,))
-                booking_count = cursor.fetchone()['count']
-                
-                if booking_count > 0:
-                    flash(f'Невозможно удалить пользователя ID {user_id} - есть связанные бронирования', 'error')
-                    continue
-                
-                cursor.execute("DELETE FROM users WHERE id=?", (user_id,))
-                deleted_count += 1
-            
-            conn.commit()
+            if missing:
+                flash(f'Не найдены пользователи с ID: {format_ids(missing)}', 'error')
+            if referenced:
+                flash(f'Невозможно удалить пользователей с ID: {format_ids(referenced)} - есть связанные бронирования', 'error')
             
             if deleted_count > 0:
                 flash(f'Успешно удалено пользователей: {deleted_count}', 'success')
@@ -372,8 +895,6 @@ def controller_process_delete_users():
                 
         except Exception as e:
             flash(f'Ошибка при удалении: {str(e)}', 'error')
-        finally:
-            conn.close()
         
         return redirect(url_for('delete_users_page'))
 
@@ -381,12 +902,14 @@ def controller_process_delete_users():
 
 def controller_view_bookings():
     """Просмотр бронирований с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    bookings, total_pages = get_bookings_page(page)
+    page, after, before = page_args()
+    bookings, total_pages, next_cursor, prev_cursor = get_bookings_page(page, after=after, before=before)
     return render_template('view_bookings.html', 
                          bookings=bookings, 
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor)
 
 def controller_add_booking():
     """Добавление нового бронирования"""
@@ -395,65 +918,35 @@ def controller_add_booking():
         flight_id = request.form.get('flight_id')
         passenger_fio = request.form.get('passenger_fio')
         
-        # Валидация данных
+        # Валидация данных и существования пользователя и рейса
         is_valid, error_message = validate_booking_data(passenger_fio, user_id, flight_id)
         if not is_valid:
             return render_template('add_booking.html', error=error_message)
         
-        # Проверяем существование пользователя и рейса
-        if not validate_user_exists(user_id):
-            return render_template('add_booking.html', error='Пользователь не найден')
-        if not validate_flight_exists(flight_id):
-            return render_template('add_booking.html', error='Рейс не найден')
-        
-        conn = get_db_connection()
         try:
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                '''INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date) 
-                   VALUES (?, ?, ?, datetime('now'))''',
-                (user_id, flight_id, passenger_fio)
-            )
-            conn.commit()
-            flash('Бронирование успешно добавлено', 'success')
-            return redirect('/')
+            booking_id, error_message = create_booking(user_id, flight_id, passenger_fio)
         except Exception as e:
             return render_template('add_booking.html', error=f'Ошибка при сохранении: {str(e)}')
-        finally:
-            conn.close()
-    
-    # Получаем списки пользователей и рейсов для формы
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users")
-    users = cursor.fetchall()
-    cursor.execute("SELECT * FROM flights")
-    flights = cursor.fetchall()
-    conn.close()
+        if error_message:
+            return render_template('add_booking.html', error=error_message)
+        
+        flash('Бронирование успешно добавлено', 'success')
+        return redirect('/')
     
-    return render_template('add_booking.html', users=users, flights=flights)
+    # Пользователь и рейс выбираются через подсказки /api/*/search
+    return render_template('add_booking.html')
 
 def controller_edit_bookings():
     """Редактирование бронирований с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    bookings, total_pages = get_bookings_page(page)
-    
-    # Получаем списки пользователей и рейсов для выпадающих списков
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users")
-    users = cursor.fetchall()
-    cursor.execute("SELECT * FROM flights")
-    flights = cursor.fetchall()
-    conn.close()
+    page, after, before = page_args()
+    bookings, total_pages, next_cursor, prev_cursor = get_bookings_page(page, after=after, before=before)
     
     return render_template('edit_bookings.html', 
                          bookings=bookings, 
-                         users=users,
-                         flights=flights,
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor)
 
 def controller_process_edit_bookings():
     """Обработка редактирования бронирований"""
@@ -468,23 +961,12 @@ def controller_process_edit_bookings():
             flash('Ошибка: ID бронирования не указан', 'error')
             return redirect(url_for('edit_bookings_page'))
         
-        if not validate_booking_exists(booking_id):
-            flash('Ошибка: бронирование не существует', 'error')
-            return redirect(url_for('edit_bookings_page'))
-        
-        is_valid, error_message = validate_booking_data(passenger_fio, user_id, flight_id)
+        # Бронирование, пользователь и рейс проверяются одним запросом
+        is_valid, error_message = validate_booking_data(passenger_fio, user_id, flight_id, booking_id)
         if not is_valid:
             flash(f'Ошибка валидации: {error_message}', 'error')
             return redirect(url_for('edit_bookings_page'))
         
-        # Проверяем существование пользователя и рейса
-        if not validate_user_exists(user_id):
-            flash('Пользователь не найден', 'error')
-            return redirect(url_for('edit_bookings_page'))
-        if not validate_flight_exists(flight_id):
-            flash('Рейс не найден', 'error')
-            return redirect(url_for('edit_bookings_page'))
-        
         conn = get_db_connection()
         try:
             cursor = conn.cursor()
@@ -493,7 +975,10 @@ def controller_process_edit_bookings():
                 (user_id, flight_id, passenger_fio, booking_id)
             )
             conn.commit()
+            dashboard_cache.invalidate()
             flash('Бронирование успешно обновлено', 'success')
+        except sqlite3.IntegrityError:
+            flash(f'Ошибка валидации: {SOLD_OUT_MESSAGE}', 'error')
         except Exception as e:
             flash(f'Ошибка при обновлении: {str(e)}', 'error')
         finally:
@@ -503,12 +988,14 @@ def controller_process_edit_bookings():
 
 def controller_delete_bookings():
     """Удаление бронирований с пагинацией"""
-    page = request.args.get('page', 0, type=int)
-    bookings, total_pages = get_bookings_page(page)
+    page, after, before = page_args()
+    bookings, total_pages, next_cursor, prev_cursor = get_bookings_page(page, after=after, before=before)
     return render_template('delete_bookings.html', 
                          bookings=bookings, 
                          current_page=page,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor)
 
 def controller_process_delete_bookings():
     """Обработка удаления бронирований"""
@@ -519,21 +1006,13 @@ def controller_process_delete_bookings():
             flash('Не выбрано ни одного бронирования для удаления', 'error')
             return redirect(url_for('delete_bookings_page'))
         
-        conn = get_db_connection()
         try:
-            cursor = conn.cursor()
-            deleted_count = 0
+            results = bulk_delete('booking', booking_ids)
+            missing = [booking_id for booking_id, status in results.items() if status == 'missing']
+            deleted_count = sum(1 for status in results.values() if status == 'deleted')
             
-            for booking_id in booking_ids:
-                # Проверяем существование бронирования
-                if not validate_booking_exists(booking_id):
-                    flash(f'Бронирование с ID {booking_id} не существует', 'error')
-                    continue
-                
-                cursor.execute("DELETE FROM booking WHERE id=?", (booking_id,))
-                deleted_count += 1
-            
-            conn.commit()
+            if missing:
+                flash(f'Не найдены бронирования с ID: {format_ids(missing)}', 'error')
             
             if deleted_count > 0:
                 flash(f'Успешно удалено бронирований: {deleted_count}', 'success')
@@ -542,7 +1021,5 @@ def controller_process_delete_bookings():
                 
         except Exception as e:
             flash(f'Ошибка при удалении: {str(e)}', 'error')
-        finally:
-            conn.close()
         
         return redirect(url_for('delete_bookings_page'))
\ No newline at end of file
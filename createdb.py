@@ -1,59 +1,453 @@
+import os
+import sys
+import math
+import time
+import random
+import logging
 import sqlite3
 import hashlib
-def get_db_connection():
-    conn = sqlite3.connect("database.db")
+import argparse
+import itertools
+import threading
+from datetime import date, timedelta
+from flask import g, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# Профиль производительности SQLite: PRAGMA, применяемые к каждому соединению
+DB_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000
+}
+
+# Вместимость рейса по умолчанию
+DEFAULT_CAPACITY = 180
+
+# Настройки БД; init_app() подменяет их на app.config
+_settings = {
+    'DATABASE_FILE': 'database.db',
+    'DB_POOL_SIZE': 5,
+    'DB_PROFILE': DB_PROFILE
+}
+
+class DbConnection(sqlite3.Connection):
+    """Соединение, которое не закрывается через close(), пока принадлежит запросу"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_request = False
+        self.path = None
+        self.file_id = None
+
+    def close(self):
+        if self.in_request:
+            return
+        super().close()
+
+def _file_id(path):
+    """Идентификатор файла БД, чтобы не переиспользовать соединения к удалённому файлу"""
+    try:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino)
+    except OSError:
+        return None
+
+def apply_profile(conn, profile):
+    """Применить профиль производительности к соединению"""
+    for name in DB_PROFILE:
+        if name not in profile:
+            continue
+        value = str(profile[name])
+        if not value.lstrip('-').isalnum():
+            raise ValueError(f'Недопустимое значение {name}: {value}')
+        conn.execute(f'PRAGMA {name} = {value}')
+
+# Функции hook(conn), вызываемые для каждого нового соединения (например, подсчёт запросов)
+_connect_hooks = []
+
+def add_connect_hook(hook):
+    if hook not in _connect_hooks:
+        _connect_hooks.append(hook)
+
+def remove_connect_hook(hook):
+    if hook in _connect_hooks:
+        _connect_hooks.remove(hook)
+
+# Класс новых соединений; трассировка SQL подменяет его на подкласс DbConnection
+_connection_class = DbConnection
+
+def set_connection_class(cls):
+    global _connection_class
+    _connection_class = cls
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, factory=_connection_class)
+    apply_profile(conn, _settings.get('DB_PROFILE', DB_PROFILE))
     conn.row_factory = sqlite3.Row
+    conn.path = path
+    conn.file_id = _file_id(path)
+    for hook in _connect_hooks:
+        hook(conn)
     return conn
 
+class ConnectionPool:
+    """Пул простаивающих соединений, общий для всех потоков"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def acquire(self, path):
+        file_id = _file_id(path)
+        conn = None
+        stale = []
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.path == path and candidate.file_id == file_id:
+                    conn = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+        if conn is None:
+            conn = _connect(path)
+        conn.in_request = True
+        return conn
+
+    def release(self, conn):
+        conn.in_request = False
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < _settings.get('DB_POOL_SIZE', 5):
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pool = ConnectionPool()
+
+def get_database_file():
+    return _settings['DATABASE_FILE']
+
+def get_db_connection():
+    """Соединение текущего запроса из пула; вне контекста приложения — новое соединение"""
+    if has_app_context():
+        conn = g.get('db_conn')
+        if conn is None:
+            conn = g.db_conn = _pool.acquire(_settings['DATABASE_FILE'])
+        return conn
+    return _connect(_settings['DATABASE_FILE'])
+
+def open_db_connection():
+    """Отдельное соединение вне пула для долгих операций, например потоковой выгрузки"""
+    return _connect(_settings['DATABASE_FILE'])
+
+def close_db_connection(exception=None):
+    """Вернуть соединение запроса в пул"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        _pool.release(conn)
+
+def close_db_pool():
+    """Закрыть все простаивающие соединения пула"""
+    _pool.close_all()
+
+def init_app(app):
+    """Привязать настройки БД к конфигурации приложения и зарегистрировать teardown"""
+    global _settings
+    _settings = app.config
+    app.teardown_appcontext(close_db_connection)
+
+def _fts_triggers(table, columns):
+    """Триггеры, синхронизирующие внешний FTS5-индекс {table}_fts с таблицей"""
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {table}_fts (rowid, {names}) VALUES (new.id, {new_values});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {names} ON {table}
+        BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {table}_fts (rowid, {names}) VALUES (new.id, {new_values});
+        END
+        '''
+    ]
+
+def _version_triggers(table):
+    """Триггеры, которые вместе со счётчиком строк увеличивают версию таблицы и время её изменения"""
+    bump = "version = version + 1, modified = datetime('now')"
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_count_insert',
+        f'DROP TRIGGER IF EXISTS {table}_count_delete',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table}
+        BEGIN
+            UPDATE row_counts SET total = total + 1, {bump} WHERE table_name = '{table}';
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE row_counts SET total = total - 1, {bump} WHERE table_name = '{table}';
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_version_update AFTER UPDATE ON {table}
+        BEGIN
+            UPDATE row_counts SET {bump} WHERE table_name = '{table}';
+        END
+        '''
+    ]
+
+def _log_duplicate_emails(conn):
+    """Записать в лог пользователей, которых миграция 2 объединит по email"""
+    groups = conn.execute('''
+        SELECT email, GROUP_CONCAT(id) FROM (SELECT id, email FROM users ORDER BY id)
+        WHERE email IS NOT NULL
+        GROUP BY email HAVING COUNT(*) > 1
+    ''').fetchall()
+    for email, ids in groups:
+        kept, *dropped = [int(i) for i in ids.split(',')]
+        logger.warning(f"Merging duplicate users with email {email}: keeping id {kept}, "
+                       f"dropping ids {', '.join(map(str, dropped))}")
+
+# Миграции схемы: номер миграции = индекс в списке + 1, текущая версия хранится в PRAGMA user_version.
+# Шаг миграции — SQL-оператор или функция, которая получает соединение
+MIGRATIONS = [
+    # 1. Базовая схема
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fio TEXT,
+            password TEXT,
+            email TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS flights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            departure_city TEXT,
+            arrival_city TEXT,
+            departure_date TEXT,
+            arrival_date TEXT,
+            company TEXT,
+            price INTEGER
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS booking (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            flight_id INTEGER,
+            passenger_fio TEXT,
+            booking_date TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (flight_id) REFERENCES flights(id)
+        )
+        '''
+    ],
+    # 2. Уникальный email (дубликаты объединяются в пользователя с наименьшим id) и индексы для сортировок и проверок
+    [
+        _log_duplicate_emails,
+        '''
+        UPDATE booking SET user_id = (
+            SELECT MIN(u2.id) FROM users u1 JOIN users u2 ON u2.email = u1.email
+            WHERE u1.id = booking.user_id
+        )
+        WHERE user_id IN (
+            SELECT id FROM users
+            WHERE email IS NOT NULL
+              AND id NOT IN (SELECT MIN(id) FROM users WHERE email IS NOT NULL GROUP BY email)
+        )
+        ''',
+        '''
+        DELETE FROM users
+        WHERE email IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM users WHERE email IS NOT NULL GROUP BY email)
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email)',
+        'CREATE INDEX IF NOT EXISTS idx_users_fio ON users (fio)',
+        'CREATE INDEX IF NOT EXISTS idx_flights_departure ON flights (departure_date, departure_city)',
+        'CREATE INDEX IF NOT EXISTS idx_booking_user ON booking (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_booking_flight ON booking (flight_id)',
+        'CREATE INDEX IF NOT EXISTS idx_booking_date ON booking (booking_date)',
+        'ANALYZE'
+    ],
+    # 3. Счётчики строк, которые триггеры поддерживают точными
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS row_counts (
+            table_name TEXT PRIMARY KEY,
+            total INTEGER NOT NULL
+        ) WITHOUT ROWID
+        '''
+    ] + [
+        statement
+        for table in ('users', 'flights', 'booking')
+        for statement in (
+            f"INSERT OR REPLACE INTO row_counts SELECT '{table}', COUNT(*) FROM {table}",
+            f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE row_counts SET total = total + 1 WHERE table_name = '{table}';
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE row_counts SET total = total - 1 WHERE table_name = '{table}';
+            END
+            '''
+        )
+    ],
+    # 4. Индексы для префиксного поиска рейсов (подсказки в формах бронирования)
+    [
+        'CREATE INDEX IF NOT EXISTS idx_flights_route ON flights (departure_city, arrival_city, departure_date)',
+        'CREATE INDEX IF NOT EXISTS idx_flights_arrival ON flights (arrival_city, departure_date)',
+        'CREATE INDEX IF NOT EXISTS idx_flights_company ON flights (company, departure_date)'
+    ],
+    # 5. Индексы для поиска рейсов с сортировкой по цене
+    [
+        'CREATE INDEX IF NOT EXISTS idx_flights_route_price ON flights (departure_city, arrival_city, price)',
+        'CREATE INDEX IF NOT EXISTS idx_flights_company_price ON flights (company, price)',
+        'CREATE INDEX IF NOT EXISTS idx_flights_price ON flights (price)'
+    ],
+    # 6. Полнотекстовый индекс FTS5 по пассажирам и пользователям, синхронизируемый триггерами
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS booking_fts USING fts5(
+            passenger_fio,
+            content='booking', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            fio, email,
+            content='users', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        "INSERT INTO booking_fts (booking_fts) VALUES ('rebuild')",
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')"
+    ] + _fts_triggers('booking', ('passenger_fio',)) + _fts_triggers('users', ('fio', 'email')),
+    # 7. Версия и время последнего изменения таблиц для условных запросов API (ETag/Last-Modified)
+    [
+        'ALTER TABLE row_counts ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+        "ALTER TABLE row_counts ADD COLUMN modified TEXT NOT NULL DEFAULT '1970-01-01 00:00:00'",
+        "UPDATE row_counts SET modified = datetime('now')"
+    ] + _version_triggers('users') + _version_triggers('flights') + _version_triggers('booking'),
+    # 8. Вместимость и проданные места рейса; CHECK не допускает продажу сверх вместимости,
+    #    а триггеры на booking держат seats_sold точным при любых изменениях бронирований
+    [
+        f'ALTER TABLE flights ADD COLUMN capacity INTEGER NOT NULL DEFAULT {DEFAULT_CAPACITY}',
+        '''
+        ALTER TABLE flights ADD COLUMN seats_sold INTEGER NOT NULL DEFAULT 0
+            CHECK (seats_sold >= 0 AND seats_sold <= capacity)
+        ''',
+        '''
+        UPDATE flights SET capacity = MAX(capacity, sold.total), seats_sold = sold.total
+        FROM (SELECT flight_id, COUNT(*) AS total FROM booking GROUP BY flight_id) AS sold
+        WHERE sold.flight_id = flights.id
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS booking_seats_insert AFTER INSERT ON booking
+        BEGIN
+            UPDATE flights SET seats_sold = seats_sold + 1 WHERE id = new.flight_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS booking_seats_delete AFTER DELETE ON booking
+        BEGIN
+            UPDATE flights SET seats_sold = seats_sold - 1 WHERE id = old.flight_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS booking_seats_update AFTER UPDATE OF flight_id ON booking
+        WHEN old.flight_id IS NOT new.flight_id
+        BEGIN
+            UPDATE flights SET seats_sold = seats_sold - 1 WHERE id = old.flight_id;
+            UPDATE flights SET seats_sold = seats_sold + 1 WHERE id = new.flight_id;
+        END
+        '''
+    ]
+]
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def get_row_counts(conn):
+    """Количество строк в таблицах без COUNT(*): {'users': ..., 'flights': ..., 'booking': ...}"""
+    return {row['table_name']: row['total'] for row in conn.execute('SELECT table_name, total FROM row_counts')}
+
+def get_table_versions(conn, tables):
+    """Версия и время изменения (UTC, 'YYYY-MM-DD HH:MM:SS') таблиц: {table: (version, modified)}"""
+    placeholders = ', '.join('?' for _ in tables)
+    rows = conn.execute(
+        f'SELECT table_name, version, modified FROM row_counts WHERE table_name IN ({placeholders})',
+        list(tables)
+    )
+    return {row['table_name']: (row['version'], row['modified']) for row in rows}
+
+def migrate(conn):
+    """Применить недостающие миграции; каждая выполняется в своей транзакции"""
+    version = get_schema_version(conn)
+    for number, statements in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✓ Применена миграция схемы {number}")
+    return get_schema_version(conn)
+
 def create_database():
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fio TEXT,
-                password TEXT,
-                email TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS flights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                departure_city TEXT,    
-                arrival_city TEXT,       
-                departure_date TEXT,
-                arrival_date TEXT,    
-                company TEXT,
-                price INTEGER
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS booking (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,        
-                flight_id INTEGER,     
-                passenger_fio TEXT,     
-                booking_date TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (flight_id) REFERENCES flights(id)
-            )
-        ''')
+        migrate(conn)
         
-        cursor.execute("SELECT COUNT(*) as count FROM users")
-        user_count = cursor.fetchone()['count']
+        counts = get_row_counts(conn)
         
-        if user_count == 0:
+        if counts['users'] == 0:
             add_sample_users(cursor)
             print("✓ Добавлены тестовые пользователи")
 
-        cursor.execute("SELECT COUNT(*) as count FROM flights")
-        flight_count = cursor.fetchone()['count']
-
-        if flight_count == 0:
+        if counts['flights'] == 0:
             add_sample_flights(cursor)
             print("✓ Добавлены тестовые рейсы")
         
@@ -89,5 +483,314 @@ def add_sample_flights(cursor):
         flights
     )
 
+# ===== СИНТЕТИЧЕСКИЕ ДАННЫЕ ДЛЯ НАГРУЗОЧНОГО ТЕСТИРОВАНИЯ =====
+
+# Города с весами популярности: большая часть рейсов и бронирований приходится на несколько направлений
+GEN_CITIES = [
+    ('Москва', 40), ('Санкт-Петербург', 20), ('Сочи', 10), ('Казань', 6), ('Екатеринбург', 6),
+    ('Новосибирск', 5), ('Краснодар', 5), ('Калининград', 4), ('Самара', 3), ('Владивосток', 3),
+    ('Уфа', 3), ('Минеральные Воды', 3), ('Красноярск', 2), ('Иркутск', 2), ('Мурманск', 1),
+    ('Архангельск', 1)
+]
+GEN_COMPANIES = [
+    ('Аэрофлот', 30), ('S7 Airlines', 20), ('Победа', 20), ('Россия', 10),
+    ('Уральские авиалинии', 10), ('ЮТэйр', 6), ('Азимут', 4)
+]
+# Вместимость типовых самолётов и доля рейсов на них
+GEN_AIRCRAFT = [(100, 2), (150, 3), (180, 4), (220, 1)]
+GEN_EMAIL_DOMAINS = [('mail.ru', 40), ('yandex.ru', 30), ('gmail.com', 20), ('bk.ru', 10)]
+# Фамилии на -ов/-ев/-ин: женская форма получается добавлением «а»
+GEN_LAST_NAMES = [
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+    'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов', 'Егоров',
+    'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин',
+    'Захаров', 'Зайцев', 'Соловьёв', 'Борисов', 'Яковлев', 'Григорьев', 'Романов', 'Воробьёв'
+]
+GEN_MALE_NAMES = [
+    'Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Артём', 'Илья',
+    'Кирилл', 'Михаил', 'Никита', 'Матвей', 'Роман', 'Егор', 'Иван', 'Павел'
+]
+GEN_FEMALE_NAMES = [
+    'Анастасия', 'Мария', 'Анна', 'Виктория', 'Екатерина', 'Наталья', 'Марина', 'Полина',
+    'Елена', 'Дарья', 'Ольга', 'Татьяна', 'Ирина', 'Юлия', 'Светлана', 'Ксения'
+]
+# Отчества: (мужское, женское)
+GEN_PATRONYMICS = [
+    ('Александрович', 'Александровна'), ('Сергеевич', 'Сергеевна'), ('Владимирович', 'Владимировна'),
+    ('Андреевич', 'Андреевна'), ('Алексеевич', 'Алексеевна'), ('Дмитриевич', 'Дмитриевна'),
+    ('Николаевич', 'Николаевна'), ('Игоревич', 'Игоревна'), ('Михайлович', 'Михайловна'),
+    ('Викторович', 'Викторовна'), ('Юрьевич', 'Юрьевна'), ('Евгеньевич', 'Евгеньевна')
+]
+GEN_PASSWORD = hashlib.sha256('password123'.encode()).hexdigest()
+GEN_CHUNK = 50000
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+def _zipf(count):
+    """Веса 1, 1/2, 1/3, ...: первые значения списка встречаются чаще"""
+    return [1 / (rank + 1) for rank in range(count)]
+
+def _name_pool():
+    """Все сочетания ФИО (мужские и женские) с весами популярности"""
+    names = []
+    weights = []
+    last_weights = _zipf(len(GEN_LAST_NAMES))
+    patronymic_weights = _zipf(len(GEN_PATRONYMICS))
+    for female, first_names in ((False, GEN_MALE_NAMES), (True, GEN_FEMALE_NAMES)):
+        first_weights = _zipf(len(first_names))
+        for last, last_weight in zip(GEN_LAST_NAMES, last_weights):
+            last = last + 'а' if female else last
+            for first, first_weight in zip(first_names, first_weights):
+                for patronymic, patronymic_weight in zip(GEN_PATRONYMICS, patronymic_weights):
+                    names.append(f'{last} {first} {patronymic[female]}')
+                    weights.append(last_weight * first_weight * patronymic_weight)
+    return names, _cumulative(weights)
+
+def _day_weights(days, start):
+    """Летний пик и больше рейсов по пятницам и воскресеньям"""
+    weights = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        summer = math.exp(-((day.timetuple().tm_yday - 200) / 45) ** 2)
+        weekend = 0.3 if day.weekday() in (4, 6) else 0
+        weights.append(1 + 0.8 * summer + weekend)
+    return _cumulative(weights)
+
+def _bulk_schema(conn, added):
+    """Триггеры и индексы, которые на время массовой загрузки удаляются.
+
+    Индексы таблицы перестраиваются, только если добавляется больше строк, чем в ней уже есть.
+    """
+    placeholders = ', '.join('?' for _ in added)
+    triggers = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ({placeholders})",
+        list(added)
+    ).fetchall()
+    counts = get_row_counts(conn)
+    rebuilt = [table for table in added if added[table] > counts[table]]
+    indexes = []
+    if rebuilt:
+        placeholders = ', '.join('?' for _ in rebuilt)
+        indexes = conn.execute(
+            f"SELECT name, sql FROM sqlite_master "
+            f"WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+            rebuilt
+        ).fetchall()
+    return [(row[0], row[1]) for row in triggers], [(row[0], row[1]) for row in indexes]
+
+def _next_id(conn, table):
+    row = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    max_id = conn.execute(f'SELECT MAX(id) FROM {table}').fetchone()[0]
+    return max(row[0] if row else 0, max_id or 0) + 1
+
+def _generate_users(rng, first_id, users, names, name_weights, fios):
+    domains = [domain for domain, _ in GEN_EMAIL_DOMAINS]
+    domain_weights = _cumulative(weight for _, weight in GEN_EMAIL_DOMAINS)
+    for chunk_start in range(0, users, GEN_CHUNK):
+        size = min(GEN_CHUNK, users - chunk_start)
+        chunk_names = rng.choices(names, cum_weights=name_weights, k=size)
+        chunk_domains = rng.choices(domains, cum_weights=domain_weights, k=size)
+        fios.extend(chunk_names)
+        for offset in range(size):
+            user_id = first_id + chunk_start + offset
+            yield (user_id, chunk_names[offset], GEN_PASSWORD, f'user{user_id}@{chunk_domains[offset]}')
+
+def _generate_flights(rng, flights, start, days):
+    """Рейсы: (строка для INSERT без id, вес популярности для распределения бронирований)"""
+    cities = [city for city, _ in GEN_CITIES]
+    city_weights = _cumulative(weight for _, weight in GEN_CITIES)
+    popularity = dict(GEN_CITIES)
+    companies = [company for company, _ in GEN_COMPANIES]
+    company_weights = _cumulative(weight for _, weight in GEN_COMPANIES)
+    capacities = [capacity for capacity, _ in GEN_AIRCRAFT]
+    capacity_weights = _cumulative(weight for _, weight in GEN_AIRCRAFT)
+    day_weights = _day_weights(days, start)
+    dates = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+    rows = []
+    weights = []
+    for _ in range(flights):
+        departure_city, arrival_city = rng.choices(cities, cum_weights=city_weights, k=2)
+        while arrival_city == departure_city:
+            arrival_city = rng.choices(cities, cum_weights=city_weights)[0]
+        day = rng.choices(range(days), cum_weights=day_weights)[0]
+        arrival_day = min(day + (rng.random() < 0.1), days - 1)
+        price = int(round(rng.lognormvariate(math.log(6000), 0.4), -1))
+        capacity = rng.choices(capacities, cum_weights=capacity_weights)[0]
+        rows.append([departure_city, arrival_city, dates[day], dates[arrival_day],
+                     rng.choices(companies, cum_weights=company_weights)[0], price, capacity, day])
+        weights.append(popularity[departure_city] * popularity[arrival_city] * (0.5 + rng.random()))
+    return rows, weights
+
+def _distribute(bookings, capacities, weights):
+    """Проданные места по рейсам: пропорционально популярности, но не больше вместимости"""
+    total_weight = sum(weights)
+    sold = [min(capacity, int(bookings * weight / total_weight)) for capacity, weight in zip(capacities, weights)]
+    remaining = bookings - sum(sold)
+    for index in sorted(range(len(sold)), key=weights.__getitem__, reverse=True):
+        if remaining <= 0:
+            break
+        extra = min(capacities[index] - sold[index], remaining)
+        sold[index] += extra
+        remaining -= extra
+    return sold
+
+def _generate_bookings(rng, first_id, first_flight_id, flight_rows, sold, first_user_id, fios,
+                       names, name_weights, start, days):
+    """Бронирования: треть приходится на постоянных клиентов (первые 5% пользователей),
+    срок покупки до вылета распределён экспоненциально (в среднем три недели)"""
+    users = len(fios)
+    frequent = max(users // 20, 1)
+    random_ = rng.random
+    log = math.log
+    mean_lead = 21 * 86400
+    max_lead = 180 * 86400
+    # Строки дат от самой ранней возможной даты покупки и время суток с ведущим пробелом
+    first_day = -max_lead // 86400 - 1
+    day_strings = [(start + timedelta(days=day)).isoformat() for day in range(first_day, days)]
+    times = [f' {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}' for second in range(86400)]
+    booking_id = first_id
+    passengers = []
+    for index, (row, seats) in enumerate(zip(flight_rows, sold)):
+        flight_id = first_flight_id + index
+        departure = row[7] * 86400
+        if len(passengers) < seats:
+            passengers = rng.choices(names, cum_weights=name_weights, k=max(GEN_CHUNK, seats))
+        for _ in range(seats):
+            r = random_()
+            user_index = int(frequent * r / 0.3) if r < 0.3 else int(users * random_())
+            lead = -mean_lead * log(1.0 - random_())
+            day, second = divmod(departure - int(lead if lead < max_lead else max_lead), 86400)
+            passenger = fios[user_index] if random_() < 0.6 else passengers.pop()
+            yield (booking_id, first_user_id + user_index, flight_id, passenger,
+                   day_strings[day - first_day] + times[second])
+            booking_id += 1
+
+def generate_data(conn, users=1000, flights=100, bookings=10000, seed=42, start=date(2030, 1, 1), days=365):
+    """Добавить в БД синтетических пользователей, рейсы и бронирования.
+
+    Данные детерминированы seed: популярные направления, кириллические ФИО,
+    даты бронирований, смещённые к дате вылета, и постоянные клиенты.
+    На время загрузки включаются PRAGMA массовой загрузки, а триггеры и (для
+    растущих в разы таблиц) индексы удаляются; затем индексы перестраиваются, а
+    счётчики row_counts, seats_sold и FTS-индексы дополняются для новых строк.
+    Возвращает {'users': ..., 'flights': ..., 'booking': ...} — число добавленных строк.
+    """
+    if bookings and not (users and flights):
+        raise ValueError('Для бронирований нужны пользователи и рейсы')
+
+    rng = random.Random(seed)
+    names, name_weights = _name_pool()
+    flight_rows, weights = _generate_flights(rng, flights, start, days)
+    capacities = [row[6] for row in flight_rows]
+    if bookings > sum(capacities):
+        raise ValueError(f'Недостаточно мест: {bookings} бронирований на {sum(capacities)} мест')
+    sold = _distribute(bookings, capacities, weights)
+
+    added = {'users': users, 'flights': flights, 'booking': bookings}
+    triggers, indexes = _bulk_schema(conn, added)
+    first_ids = {table: _next_id(conn, table) for table in added}
+    saved = {name: conn.execute(f'PRAGMA {name}').fetchone()[0]
+             for name in ('journal_mode', 'synchronous', 'cache_size', 'threads')}
+    conn.commit()
+
+    # Журнал в памяти вместо WAL: страницы пишутся в файл БД один раз;
+    # threads — параллельная сортировка при построении индексов
+    try:
+        conn.execute('PRAGMA journal_mode = MEMORY')
+    except sqlite3.OperationalError:
+        pass
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -524288')
+    conn.execute(f'PRAGMA threads = {min(os.cpu_count() or 1, 8)}')
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+        for name, _ in indexes:
+            conn.execute(f'DROP INDEX {name}')
+
+        fios = []
+        conn.executemany(
+            'INSERT INTO users (id, fio, password, email) VALUES (?, ?, ?, ?)',
+            _generate_users(rng, first_ids['users'], users, names, name_weights, fios)
+        )
+        conn.executemany(
+            '''INSERT INTO flights (id, departure_city, arrival_city, departure_date, arrival_date,
+                                    company, price, capacity, seats_sold)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            ((first_ids['flights'] + index, *row[:7], seats)
+             for index, (row, seats) in enumerate(zip(flight_rows, sold)))
+        )
+        conn.executemany(
+            'INSERT INTO booking (id, user_id, flight_id, passenger_fio, booking_date) VALUES (?, ?, ?, ?, ?)',
+            _generate_bookings(rng, first_ids['booking'], first_ids['flights'], flight_rows, sold,
+                               first_ids['users'], fios, names, name_weights, start, days)
+        )
+
+        for _, sql in indexes:
+            conn.execute(sql)
+        for _, sql in triggers:
+            conn.execute(sql)
+        for table, count in added.items():
+            conn.execute(
+                "UPDATE row_counts SET total = total + ?, version = version + 1, modified = datetime('now') "
+                "WHERE table_name = ?",
+                (count, table)
+            )
+        conn.execute("INSERT INTO users_fts (rowid, fio, email) SELECT id, fio, email FROM users WHERE id >= ?",
+                     (first_ids['users'],))
+        conn.execute(
+            'INSERT INTO booking_fts (rowid, passenger_fio) SELECT id, passenger_fio FROM booking WHERE id >= ?',
+            (first_ids['booking'],)
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        for name, value in saved.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+
+    # Статистика планировщика после загрузки; analysis_limit ограничивает время на больших таблицах
+    conn.execute('PRAGMA analysis_limit = 1000')
+    conn.execute('ANALYZE')
+    conn.commit()
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description='Создание БД и генерация синтетических данных')
+    parser.add_argument('--bookings', type=int, default=0, help='сгенерировать столько бронирований')
+    parser.add_argument('--users', type=int, help='пользователей (по умолчанию bookings / 10)')
+    parser.add_argument('--flights', type=int, help='рейсов (по умолчанию bookings / 100)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2030, 1, 1),
+                        help='первый день вылетов, YYYY-MM-DD')
+    parser.add_argument('--database', help='файл БД (по умолчанию DATABASE_FILE)')
+    args = parser.parse_args()
+
+    if args.database:
+        _settings['DATABASE_FILE'] = args.database
+    if not create_database():
+        return 1
+    if not args.bookings:
+        return 0
+
+    users = args.users if args.users is not None else max(args.bookings // 10, 1)
+    flights = args.flights if args.flights is not None else max(args.bookings // 100, 1)
+    conn = open_db_connection()
+    started = time.perf_counter()
+    try:
+        generate_data(conn, users, flights, args.bookings, args.seed, args.start)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        conn.close()
+    print(f"✓ Сгенерировано: пользователей {users}, рейсов {flights}, бронирований {args.bookings} "
+          f"за {time.perf_counter() - started:.1f} с")
+    return 0
+
 if __name__ == "__main__":
-    create_database()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import io
+import csv
+import json
+import zlib
+from createdb import open_db_connection
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+
+def iter_batches(sql, params, batch_size):
+    """Строки запроса порциями по batch_size: первым элементом — имена столбцов.
+
+    Используется отдельное соединение вне пула, чтобы долгая выгрузка
+    не занимала соединение запроса; закрывается при завершении генератора.
+    """
+    conn = open_db_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        yield [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def encode_rows(batches, fmt):
+    """Закодировать порции строк в CSV (с заголовком) или NDJSON"""
+    columns = next(batches)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode('utf-8-sig')
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+    else:
+        for rows in batches:
+            yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                          for row in rows).encode()
+
+def gzip_chunks(chunks, level=6):
+    """Сжимать поток на лету в формате gzip"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_rows(sql, params, fmt, batch_size=1000, compress=False):
+    """Генератор тела ответа для выгрузки результата запроса без его материализации"""
+    chunks = encode_rows(iter_batches(sql, params, batch_size), fmt)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
@@ -0,0 +1,106 @@
+import os
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from jinja2 import nodes, FileSystemBytecodeCache
+from jinja2.ext import Extension
+from createdb import get_database_file
+from metrics import cache_hit, cache_miss
+
+logger = logging.getLogger(__name__)
+
+# ===== КЕШ ШАБЛОНОВ И ФРАГМЕНТОВ =====
+
+class FragmentCache:
+    """LRU-кеш отрендеренных фрагментов в памяти процесса.
+
+    Ключ задаёт шаблон: имя блока и данные, от которых зависит фрагмент, —
+    версия таблицы или сама строка БД. Устаревшие записи не удаляются явно —
+    их вытесняют новые.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+fragment_cache = FragmentCache()
+
+class FragmentCacheExtension(Extension):
+    """Тег {% cache 'имя', значение, ... %}...{% endcache %}.
+
+    Тело рендерится один раз на ключ; к ключу добавляется файл БД, чтобы
+    версии разных баз не пересекались. Строка sqlite3.Row в ключе заменяется
+    кортежем своих значений: фрагмент строки меняется только вместе с ней,
+    а не при любой записи в таблицу. При FRAGMENT_CACHE_SIZE = 0 тело
+    рендерится всегда.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.Tuple(args, 'load')]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        if not fragment_cache.max_entries:
+            return caller()
+        key = (get_database_file(),) + tuple(tuple(part) if isinstance(part, sqlite3.Row) else part
+                                             for part in key)
+        value = fragment_cache.get(key)
+        if value is not None:
+            cache_hit('fragments')
+            return value
+        cache_miss('fragments')
+        value = caller()
+        fragment_cache.set(key, value)
+        return value
+
+def init_templates(app):
+    """Подключить тег {% cache %} и байткод-кеш шаблонов на диске.
+
+    Байткод хранится в TEMPLATE_CACHE_DIR и переживает перезапуск воркеров;
+    Jinja проверяет контрольную сумму исходника, поэтому изменённый шаблон
+    перекомпилируется сам. Пустой TEMPLATE_CACHE_DIR отключает байткод-кеш.
+    """
+    fragment_cache.max_entries = app.config['FRAGMENT_CACHE_SIZE']
+    directory = app.config['TEMPLATE_CACHE_DIR']
+    if directory:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(directory)}
+        except OSError as e:
+            logger.error(f"Template bytecode cache disabled: {e}")
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+def warm_templates(app):
+    """Загрузить все шаблоны заранее, чтобы воркеры после fork() получили их скомпилированными"""
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
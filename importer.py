@@ -0,0 +1,125 @@
+import io
+import csv
+import json
+import sys
+import argparse
+from validate import checkFlight, parse_price
+from createdb import get_db_connection
+from cache import dashboard_cache
+
+FLIGHT_FIELDS = ('departure_city', 'arrival_city', 'departure_date', 'arrival_date', 'company', 'price')
+MAX_REPORTED_ERRORS = 100
+
+def read_rows(stream, fmt):
+    """Построчно читать CSV или JSONL из бинарного потока: (номер строки, dict или None, ошибка)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None, 'Неверный JSON'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, 'Ожидается объект JSON'
+                continue
+            yield line_number, row, None
+    else:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+def _insert_chunk(conn, chunk):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(
+            '''INSERT INTO flights 
+               (departure_city, arrival_city, departure_date, arrival_date, company, price) 
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            chunk
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def import_flights(stream, fmt, chunk_size=5000):
+    """Потоковый импорт рейсов: каждая строка проверяется checkFlight,
+    корректные вставляются executemany порциями по chunk_size в отдельных транзакциях.
+
+    Возвращает {'inserted': int, 'failed': int, 'errors': [(строка, сообщение), ...]}.
+    """
+    result = {'inserted': 0, 'failed': 0, 'errors': []}
+    conn = get_db_connection()
+    chunk = []
+    
+    def fail(line_number, message):
+        result['failed'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append((line_number, message))
+    
+    try:
+        for line_number, row, error in read_rows(stream, fmt):
+            if error:
+                fail(line_number, error)
+                continue
+            values = [str(row.get(field) or '').strip() for field in FLIGHT_FIELDS]
+            is_valid, message = checkFlight(*values)
+            if not is_valid:
+                fail(line_number, message)
+                continue
+            try:
+                values[5] = parse_price(values[5])
+            except (ValueError, OverflowError):
+                fail(line_number, 'Цена должна быть конечным числом')
+                continue
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                _insert_chunk(conn, chunk)
+                result['inserted'] += len(chunk)
+                chunk = []
+        if chunk:
+            _insert_chunk(conn, chunk)
+            result['inserted'] += len(chunk)
+    finally:
+        conn.close()
+        if result['inserted']:
+            dashboard_cache.invalidate()
+    
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Импорт рейсов из CSV или JSONL')
+    parser.add_argument('file', help='путь к файлу .csv, .jsonl или .ndjson')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='формат файла (по умолчанию по расширению)')
+    parser.add_argument('--chunk-size', type=int, help='строк в одной транзакции')
+    args = parser.parse_args(argv)
+    
+    fmt = args.format or detect_format(args.file)
+    if not fmt:
+        parser.error('Не удалось определить формат файла, укажите --format')
+    
+    from app import app
+    chunk_size = args.chunk_size or app.config['IMPORT_CHUNK_SIZE']
+    with app.app_context(), open(args.file, 'rb') as f:
+        result = import_flights(f, fmt, chunk_size)
+    
+    for line_number, message in result['errors']:
+        print(f"✗ Строка {line_number}: {message}")
+    print(f"✓ Импортировано рейсов: {result['inserted']}, ошибок: {result['failed']}")
+    return 0 if not result['failed'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+# ===== НЕБЛОКИРУЮЩЕЕ ЛОГИРОВАНИЕ =====
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """Не больше limit записей в секунду с одного места вызова для уровней до level включительно.
+
+    Лишние записи отбрасываются, их число попадает в поле suppressed
+    первой записи следующей секунды. limit = 0 отключает ограничение.
+    """
+
+    def __init__(self, limit, level=logging.DEBUG):
+        super().__init__()
+        self.limit = limit
+        self.level = level
+        # (файл, строка) -> [секунда, пропущено, отброшено]
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno > self.level or not self.limit:
+            return True
+        key = (record.pathname, record.lineno)
+        second = int(record.created)
+        window = self._windows.get(key)
+        if window is None or window[0] != second:
+            self._windows[key] = [second, 1, 0]
+            if window is not None and window[2]:
+                record.suppressed = window[2]
+            return True
+        if window[1] < self.limit:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который оставляет трассировку исключения отдельным полем для JSON"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class LogPipeline:
+    """Очередь записей и фоновый поток, который пишет их в обработчики.
+
+    Поток запроса только кладёт запись в неограниченную очередь, запись на диск
+    и ротация выполняются в потоке QueueListener. После fork() поток в дочернем
+    процессе не существует, поэтому там он запускается заново с новой очередью.
+    """
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.handler = LogQueueHandler(queue.SimpleQueue())
+        self.listener = None
+
+    def start(self):
+        self.handler.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *self.handlers,
+                                                       respect_handler_level=True)
+        self.listener.start()
+        _pipelines.add(self)
+
+    def stop(self):
+        """Дописать накопленные записи и остановить поток"""
+        _pipelines.discard(self)
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+_pipelines = set()
+
+def _restart_after_fork():
+    for pipeline in list(_pipelines):
+        pipeline.start()
+
+def stop_logging():
+    """Дописать очереди всех конвейеров; вызывается перед выходом процесса"""
+    for pipeline in list(_pipelines):
+        pipeline.stop()
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(stop_logging)
+
+def build_file_handler(config):
+    path = config['LOG_FILE']
+    encoding = config['LOG_ENCODING']
+    rotation = config['LOG_ROTATION']
+    if rotation == 'size':
+        return logging.handlers.RotatingFileHandler(path, maxBytes=config['LOG_MAX_BYTES'],
+                                                    backupCount=config['LOG_BACKUP_COUNT'],
+                                                    encoding=encoding)
+    if rotation == 'time':
+        return logging.handlers.TimedRotatingFileHandler(path, when=config['LOG_ROTATE_WHEN'],
+                                                         backupCount=config['LOG_BACKUP_COUNT'],
+                                                         encoding=encoding)
+    if rotation == 'none':
+        return logging.FileHandler(path, encoding=encoding)
+    raise ValueError(f'Неизвестный режим ротации логов: {rotation}')
+
+def setup_logging(config, logger=None):
+    """Настроить логирование по ключам LOG_* конфигурации.
+
+    Файл пишется строками JSON (LOG_FORMAT = "json") или текстом, консоль — всегда текстом.
+    При LOG_QUEUE запись идёт через очередь и фоновый поток; возвращается LogPipeline.
+    """
+    logger = logger or logging.getLogger()
+    logger.setLevel(getattr(logging, config['LOG_LEVEL']))
+    directory = os.path.dirname(config['LOG_FILE'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    file_handler = build_file_handler(config)
+    if config['LOG_FORMAT'] == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [file_handler, stream_handler]
+    rate_limit = RateLimitFilter(config['LOG_DEBUG_PER_SECOND'])
+
+    if not config['LOG_QUEUE']:
+        for handler in handlers:
+            handler.addFilter(rate_limit)
+            logger.addHandler(handler)
+        return None
+
+    pipeline = LogPipeline(handlers)
+    pipeline.handler.addFilter(rate_limit)
+    pipeline.start()
+    logger.addHandler(pipeline.handler)
+    return pipeline
@@ -0,0 +1,370 @@
+import os
+import json
+import bisect
+import logging
+import weakref
+import threading
+from flask import current_app, abort
+from createdb import add_connect_hook
+from sqltrace import install_tracing, add_trace_hook
+from validate import parse_date
+
+try:
+    import fcntl
+except ImportError:
+    # Без fork() (Windows) сервер работает одним процессом и общий каталог не нужен
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ===== МЕТРИКИ В ФОРМАТЕ PROMETHEUS =====
+
+# Границы корзин гистограмм длительности, секунды
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Имя метрики: (тип, описание)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP-запросы по маршруту, методу и коду ответа'),
+    'http_request_duration_seconds': ('histogram', 'Длительность HTTP-запроса, включая отдачу тела'),
+    'http_request_db_seconds': ('histogram', 'Время в SQLite за HTTP-запрос'),
+    'http_request_queries_total': ('counter', 'SQL-операторы, выполненные в HTTP-запросах'),
+    'db_connections_opened_total': ('counter', 'Открытые соединения SQLite'),
+    'cache_requests_total': ('counter', 'Обращения к кешам по результату hit/miss'),
+    'cache_hit_ratio': ('gauge', 'Доля попаданий в кеш с запуска процесса')
+}
+
+def _add(shard, key, value):
+    shard[key] = shard.get(key, 0) + value
+
+def _observe(shard, key, value):
+    """Добавить значение в гистограмму: счётчики корзин (последняя — +Inf) и сумма"""
+    histogram = shard.get(key)
+    if histogram is None:
+        histogram = shard[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+    histogram[bisect.bisect_left(BUCKETS, value)] += 1
+    histogram[-1] += value
+
+class Registry:
+    """Счётчики и гистограммы, запись в которые не берёт общую блокировку.
+
+    У каждого потока свой шард — словарь {(имя, метки): значение}, поэтому инкремент
+    стоит одного обращения к словарю. Блокировка нужна только при регистрации шарда
+    нового потока и при сборе. Шарды завершившихся потоков сливаются при следующем сборе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._dead = []
+        self._retired = {}
+
+    def shard(self):
+        """Шард текущего потока; в него пишут без блокировки"""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            # Финализатор может сработать внутри collect(), поэтому блокировку он не берёт
+            weakref.finalize(threading.current_thread(), self._dead.append, shard)
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        _add(self.shard(), (name, labels), value)
+
+    def observe(self, name, labels, value):
+        _observe(self.shard(), (name, labels), value)
+
+    @staticmethod
+    def _merge(total, shard):
+        for key, value in shard.items():
+            current = total.get(key)
+            if current is None:
+                total[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    current[i] += item
+            else:
+                total[key] = current + value
+
+    def collect(self):
+        """Сумма по всем шардам: {(имя, метки): значение}"""
+        with self._lock:
+            while self._dead:
+                shard = self._dead.pop()
+                self._shards.remove(shard)
+                self._merge(self._retired, shard)
+            total = {}
+            self._merge(total, self._retired)
+            for shard in self._shards:
+                # Копия словаря делается без переключения потоков, поэтому безопасна при записи
+                self._merge(total, dict(shard))
+        return total
+
+    def clear(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+            self._retired = {}
+
+    def reset(self):
+        """Забыть всё после fork(): шарды и блокировка унаследованы от родителя"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._dead = []
+        self._retired = {}
+
+registry = Registry()
+
+def cache_hit(name):
+    registry.inc('cache_requests_total', (name, 'hit'))
+
+def cache_miss(name):
+    registry.inc('cache_requests_total', (name, 'miss'))
+
+def observe_request(trace):
+    """Хук трассировки: учесть завершённый HTTP-запрос"""
+    shard = registry.shard()
+    route = trace.route or 'unmatched'
+    labels = (trace.method, route)
+    # Без start_response запрос завершился исключением
+    _add(shard, ('http_requests_total', (trace.method, route, trace.status or 500)), 1)
+    _observe(shard, ('http_request_duration_seconds', labels), trace.elapsed)
+    _observe(shard, ('http_request_db_seconds', labels), trace.db_ms / 1000)
+    if trace.queries:
+        _add(shard, ('http_request_queries_total', labels), trace.queries)
+
+def _connection_opened(conn):
+    registry.inc('db_connections_opened_total')
+
+# Кеши functools.lru_cache, статистика которых попадает в cache_requests_total
+LRU_CACHES = {'parse_date': parse_date}
+# Статистика lru_cache, унаследованная воркером от мастера: {имя: (hits, misses)}
+_lru_baseline = {}
+
+def snapshot(extra_caches=()):
+    """Счётчики текущего процесса {(имя, метки): значение} вместе со статистикой lru_cache.
+
+    extra_caches — пары (имя, функция-кеш functools.lru_cache).
+    """
+    samples = registry.collect()
+    for name, cached in extra_caches:
+        info = cached.cache_info()
+        hits, misses = _lru_baseline.get(name, (0, 0))
+        samples[('cache_requests_total', (name, 'hit'))] = info.hits - hits
+        samples[('cache_requests_total', (name, 'miss'))] = info.misses - misses
+    return samples
+
+# ----- Сбор со всех воркеров -----
+
+class MetricsStore:
+    """Снимки счётчиков процессов в общем каталоге: файл <pid>.json на воркер.
+
+    Мастер переносит файл завершившегося воркера в retired.json, поэтому счётчики
+    не убывают при замене воркеров. Чтение и перенос разделены блокировкой на файле
+    .lock, чтобы при переносе значения воркера не учитывались дважды или ни разу.
+    """
+
+    RETIRED = 'retired'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.json')
+
+    def _locked(self, operation):
+        lock = open(os.path.join(self.directory, '.lock'), 'a')
+        fcntl.flock(lock, operation)
+        return lock
+
+    def clear(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(self.directory, filename))
+
+    def read(self, name):
+        try:
+            with open(self._path(name), encoding='utf-8') as f:
+                return {(metric, tuple(labels)): value for metric, labels, value in json.load(f)}
+        except FileNotFoundError:
+            return {}
+
+    def write(self, name, samples):
+        """Записать снимок атомарно: читатели видят либо старый файл, либо новый"""
+        path = self._path(name)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump([[metric, list(labels), value] for (metric, labels), value in samples.items()], f)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Сумма снимков всех воркеров, текущих и завершившихся"""
+        total = {}
+        with self._locked(fcntl.LOCK_SH):
+            for filename in os.listdir(self.directory):
+                if filename.endswith('.json'):
+                    Registry._merge(total, self.read(filename[:-len('.json')]))
+        return total
+
+    def retire(self, name):
+        """Добавить последний снимок завершившегося воркера к итогу завершившихся"""
+        with self._locked(fcntl.LOCK_EX):
+            samples = self.read(name)
+            if not samples:
+                return
+            retired = self.read(self.RETIRED)
+            Registry._merge(retired, samples)
+            self.write(self.RETIRED, retired)
+            os.remove(self._path(name))
+
+_store = None
+_flush_interval = 5
+_write_lock = threading.Lock()
+_flusher = None
+
+def enable_multiprocess(directory, interval=5):
+    """Вызывается в мастере до fork(): /metrics любого воркера отдаёт сумму по всем воркерам.
+
+    Воркер записывает свой снимок каждые interval секунд и перед выходом, поэтому
+    значения других воркеров отстают не больше чем на interval. Пустой directory
+    возвращает режим одного процесса.
+    """
+    global _store, _flush_interval
+    _store = None
+    if directory:
+        _store = MetricsStore(directory)
+        _store.clear()
+    _flush_interval = interval
+
+def _write_snapshot():
+    # Под блокировкой последним записывается самый свежий снимок
+    with _write_lock:
+        _store.write(os.getpid(), snapshot(LRU_CACHES.items()))
+
+def _flush_loop(stopped):
+    while not stopped.wait(_flush_interval):
+        try:
+            _write_snapshot()
+        except OSError as e:
+            logger.error(f"Metrics snapshot failed: {e}")
+
+def start_worker_metrics():
+    """В воркере после fork(): начать счёт с нуля и периодически записывать снимок"""
+    global _flusher
+    if _store is None:
+        return
+    registry.reset()
+    _lru_baseline.clear()
+    for name, cached in LRU_CACHES.items():
+        info = cached.cache_info()
+        _lru_baseline[name] = (info.hits, info.misses)
+    stopped = threading.Event()
+    thread = threading.Thread(target=_flush_loop, args=(stopped,), name='metrics-flush', daemon=True)
+    thread.start()
+    _flusher = (thread, stopped)
+
+def stop_worker_metrics():
+    """Перед выходом воркера: остановить запись по таймеру и записать последний снимок"""
+    global _flusher
+    if _store is None:
+        return
+    if _flusher is not None:
+        thread, stopped = _flusher
+        stopped.set()
+        thread.join()
+        _flusher = None
+    _write_snapshot()
+
+def retire_worker_metrics(pid):
+    """В мастере после завершения воркера pid"""
+    if _store is None:
+        return
+    try:
+        _store.retire(pid)
+    except OSError as e:
+        logger.error(f"Metrics of worker {pid} not retired: {e}")
+
+# Метки каждой метрики по порядку значений в ключе
+LABELS = {
+    'http_requests_total': ('method', 'route', 'status'),
+    'http_request_duration_seconds': ('method', 'route'),
+    'http_request_db_seconds': ('method', 'route'),
+    'http_request_queries_total': ('method', 'route'),
+    'cache_requests_total': ('cache', 'result'),
+    'cache_hit_ratio': ('cache',)
+}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+def render_metrics(extra_caches=()):
+    """Текст в формате Prometheus 0.0.4.
+
+    extra_caches — пары (имя, функция-кеш functools.lru_cache), их статистика
+    берётся из cache_info(). После enable_multiprocess() — сумма по всем воркерам.
+    """
+    if _store is None:
+        samples = snapshot(extra_caches)
+    else:
+        _write_snapshot()
+        samples = _store.collect()
+    caches = {}
+    for (name, labels), value in samples.items():
+        if name == 'cache_requests_total':
+            caches.setdefault(labels[0], {'hit': 0, 'miss': 0})[labels[1]] += value
+    for cache, counts in caches.items():
+        requests = counts['hit'] + counts['miss']
+        samples[('cache_hit_ratio', (cache,))] = counts['hit'] / requests if requests else 0.0
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in samples.items() if metric == name)
+        if not series and kind != 'counter':
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        names = LABELS.get(name, ())
+        if not series and not names:
+            lines.append(f'{name} 0')
+        for labels, value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(names, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), value):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{name}_bucket{_labels(names, labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(names, labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(names, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+def init_metrics(app):
+    """Включить сбор метрик, если METRICS задан в конфигурации"""
+    if not app.config['METRICS']:
+        return
+    install_tracing(app)
+    add_trace_hook(observe_request)
+    add_connect_hook(_connection_opened)
+
+def controller_metrics():
+    """Метрики процесса, а под server.py — сумма по всем воркерам"""
+    if not current_app.config['METRICS']:
+        abort(404)
+    body = render_metrics(extra_caches=LRU_CACHES.items())
+    return current_app.response_class(body, mimetype='text/plain; version=0.0.4')
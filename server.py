@@ -0,0 +1,262 @@
+import os
+import sys
+import time
+import signal
+import random
+import socket
+import logging
+import threading
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+from app import app
+from createdb import close_db_pool
+from writer import write_queue
+from logsetup import stop_logging
+from fragments import warm_templates
+from metrics import enable_multiprocess, start_worker_metrics, stop_worker_metrics, retire_worker_metrics
+
+logger = logging.getLogger(__name__)
+
+# ===== МНОГОПРОЦЕССНЫЙ СЕРВЕР =====
+
+LISTEN_BACKLOG = 1024
+# Воркер, упавший быстрее этого времени, перезапускается с паузой, чтобы не крутить цикл падений
+MIN_WORKER_LIFETIME = 1.0
+
+class Worker:
+    """Рабочий процесс: многопоточный WSGI-сервер на общем слушающем сокете.
+
+    После max_requests запросов (0 — без ограничения) воркер перестаёт принимать
+    соединения, дорабатывает начатые запросы и завершается, а мастер запускает новый.
+    Так же он останавливается по SIGTERM, ожидая начатые запросы не дольше graceful_timeout.
+    """
+
+    def __init__(self, wsgi_app, sock, max_requests=0, graceful_timeout=30):
+        self.wsgi_app = wsgi_app
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.requests = 0
+        self.active = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        host, port = sock.getsockname()[:2]
+        self.server = make_server(host, port, self, threaded=True, fd=sock.fileno())
+        # Сокет общий для всех воркеров: кто не успел принять соединение, не должен блокироваться в accept
+        self.server.socket.setblocking(False)
+
+    def __call__(self, environ, start_response):
+        with self._cond:
+            self.active += 1
+            self.requests += 1
+            recycle = self.requests == self.max_requests
+        if recycle:
+            logger.info(f"Worker {os.getpid()} reached {self.max_requests} requests, recycling")
+            self.stop()
+        try:
+            result = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        # Потоковый ответ считается завершённым, когда сервер закроет итератор
+        return ClosingIterator(result, self._done)
+
+    def _done(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def stop(self):
+        """Перестать принимать соединения; начатые запросы дорабатывают"""
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+        # shutdown() ждёт выхода из serve_forever, поэтому вызывается из отдельного потока
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def run(self):
+        self.server.serve_forever()
+        deadline = time.monotonic() + self.graceful_timeout
+        with self._cond:
+            while self.active:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Worker {os.getpid()} stopped with {self.active} requests in flight")
+                    break
+                self._cond.wait(remaining)
+        self.server.server_close()
+
+class PreforkServer:
+    """Мастер-процесс: держит слушающий сокет и заданное число воркеров.
+
+    Воркеры создаются через fork() уже после инициализации БД в мастере.
+    Завершившийся воркер (исчерпал max_requests или упал) заменяется новым.
+    restart() — плавный перезапуск: сначала запускаются новые воркеры, затем
+    старым отправляется SIGTERM. stop() — плавная остановка всех воркеров.
+    """
+
+    def __init__(self, wsgi_app, sock, workers, max_requests=0, max_requests_jitter=0,
+                 graceful_timeout=30):
+        self.wsgi_app = wsgi_app
+        self.sock = sock
+        self.num_workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.workers = {}
+        self.retiring = set()
+        self.spawned = 0
+        self._stopping = False
+        self._restart = False
+        self._wakeup = threading.Event()
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+
+    def restart(self):
+        self._restart = True
+        self._wakeup.set()
+
+    def spawn(self):
+        # Соединения пула и поток группового коммита не переживают fork, в воркере они создаются заново
+        close_db_pool()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self.serve_worker()
+            except BaseException as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                # os._exit() не вызывает atexit, очередь логов дописывается явно
+                stop_logging()
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+        self.spawned += 1
+        logger.info(f"Worker {pid} started")
+        return pid
+
+    def serve_worker(self):
+        random.seed()
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            # Разброс, чтобы воркеры не перезапускались одновременно
+            max_requests += random.randint(0, self.max_requests_jitter)
+        worker = Worker(self.wsgi_app, self.sock, max_requests, self.graceful_timeout)
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+        # Ctrl+C и SIGHUP приходят всей группе процессов, ими управляет мастер
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        if app.config['WRITE_BATCHING']:
+            write_queue.start(app.config['WRITE_BATCH_SIZE'], app.config['WRITE_BATCH_WAIT_MS'])
+        start_worker_metrics()
+        try:
+            worker.run()
+        finally:
+            write_queue.stop()
+            close_db_pool()
+            stop_worker_metrics()
+
+    def reap(self):
+        """Собрать завершившиеся воркеры; True, если какой-то упал слишком быстро"""
+        crashed = False
+        for pid in list(self.workers):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, 0
+            if not done:
+                continue
+            started = self.workers.pop(pid)
+            self.retiring.discard(pid)
+            retire_worker_metrics(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0:
+                logger.info(f"Worker {pid} exited")
+            else:
+                logger.warning(f"Worker {pid} exited with code {code}")
+                crashed = crashed or time.monotonic() - started < MIN_WORKER_LIFETIME
+        return crashed
+
+    def kill_workers(self, sig, pids=None):
+        for pid in list(self.workers if pids is None else pids):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            if self.reap() and not self._stopping:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if self._restart:
+                self._restart = False
+                old = set(self.workers) - self.retiring
+                for _ in range(self.num_workers):
+                    self.spawn()
+                self.retiring |= old
+                self.kill_workers(signal.SIGTERM, old)
+                logger.info("Graceful restart of workers")
+            while len(self.workers) - len(self.retiring) < self.num_workers and not self._stopping:
+                self.spawn()
+            self._wakeup.wait(0.5)
+        self.shutdown()
+
+    def shutdown(self):
+        self.kill_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout + 1
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        if self.workers:
+            logger.warning(f"Killing {len(self.workers)} workers after graceful timeout")
+            self.kill_workers(signal.SIGKILL)
+            while self.workers:
+                self.reap()
+                time.sleep(0.05)
+
+def create_listener(host, port, backlog=LISTEN_BACKLOG):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    return socket.create_server((host, port), family=family, backlog=backlog)
+
+def main():
+    host = app.config['HOST']
+    port = app.config['PORT']
+    app.debug = False
+
+    if not hasattr(os, 'fork'):
+        print("✗ Многопроцессный режим недоступен на этой платформе, запущен один процесс")
+        make_server(host, port, app, threaded=True).serve_forever()
+        return
+
+    # БД уже создана и мигрирована при импорте app — один раз, в мастере
+    write_queue.stop()
+    # Шаблоны компилируются до fork(), воркеры получают их готовыми
+    warm_templates(app)
+    # /metrics любого воркера суммирует снимки всех воркеров из METRICS_DIR
+    if app.config['METRICS']:
+        enable_multiprocess(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_SECONDS'])
+    workers = app.config['SERVER_WORKERS'] or os.cpu_count() or 1
+    sock = create_listener(host, port)
+    server = PreforkServer(app, sock, workers,
+                           max_requests=app.config['SERVER_MAX_REQUESTS'],
+                           max_requests_jitter=app.config['SERVER_MAX_REQUESTS_JITTER'],
+                           graceful_timeout=app.config['SERVER_GRACEFUL_TIMEOUT'])
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: server.stop())
+    signal.signal(signal.SIGHUP, lambda signum, frame: server.restart())
+    signal.signal(signal.SIGCHLD, lambda signum, frame: server._wakeup.set())
+
+    print(f"✓ Сервер запущен на http://{host}:{port}, воркеров: {workers} (PID мастера {os.getpid()})")
+    try:
+        server.run()
+    finally:
+        sock.close()
+    print("✓ Сервер остановлен")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import Counter, deque
+from flask import request, jsonify, abort, current_app
+from werkzeug.wsgi import ClosingIterator
+from createdb import DbConnection, set_connection_class, close_db_pool
+
+logger = logging.getLogger(__name__)
+
+# ===== ТРАССИРОВКА SQL ПО ЗАПРОСАМ =====
+
+DEBUG_PATH = '/debug/sql'
+# Сколько операторов одного запроса сохраняется для отладочной страницы
+MAX_STATEMENTS = 200
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+_local = threading.local()
+_lock = threading.Lock()
+_slow_requests = deque(maxlen=50)
+
+def statement_shape(sql):
+    """Форма оператора: литералы и списки параметров заменены на ?, пробелы схлопнуты"""
+    shape = _NUMBER.sub('?', _STRING.sub('?', sql))
+    return ' '.join(_LIST.sub('?', shape).split())
+
+class RequestTrace:
+    """Операторы, выполненные в потоке за время одного HTTP-запроса.
+
+    Без detailed копится только число операторов и время их execute() — этого
+    хватает метрикам; текст, строки и время выборки собираются при detailed.
+    """
+
+    __slots__ = ('method', 'path', 'detailed', 'route', 'status', 'started', 'elapsed',
+                 'queries', 'db_time', 'statements')
+
+    def __init__(self, method, path, detailed=True):
+        self.method = method
+        self.path = path
+        self.detailed = detailed
+        self.route = None
+        self.status = None
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = []
+
+    def add(self, sql, duration, rows=0):
+        """Учесть выполненный оператор; при detailed вернуть его запись для дальнейшей выборки"""
+        self.queries += 1
+        self.db_time += duration
+        if not self.detailed:
+            return None
+        statement = {'sql': ' '.join(sql.split()), 'duration_ms': duration * 1000, 'rows': rows}
+        self.statements.append(statement)
+        return statement
+
+    @property
+    def db_ms(self):
+        if not self.detailed:
+            return self.db_time * 1000
+        return sum(s['duration_ms'] for s in self.statements)
+
+    def summary(self, repeat_limit):
+        shapes = Counter(statement_shape(s['sql']) for s in self.statements)
+        return {
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'total_ms': round(self.elapsed * 1000, 2),
+            'db_ms': round(self.db_ms, 2),
+            'queries': self.queries,
+            'rows': sum(s['rows'] for s in self.statements),
+            'repeated': [{'sql': shape, 'count': count}
+                         for shape, count in shapes.most_common() if count > repeat_limit]
+        }
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+class TracedCursor(sqlite3.Cursor):
+    """Курсор, который добавляет в трассировку запроса текст, время и число строк оператора.
+
+    Время выборки складывается из execute() и всех fetch*(), строки — из полученных
+    строк SELECT или rowcount для INSERT/UPDATE/DELETE.
+    """
+
+    _statement = None
+
+    def _run(self, method, sql, parameters):
+        trace = getattr(_local, 'trace', None)
+        if trace is None:
+            self._statement = None
+            return method(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return method(sql, parameters)
+        finally:
+            self._statement = trace.add(sql, time.perf_counter() - started, max(self.rowcount, 0))
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self._run(super().executemany, sql, parameters)
+
+    def _fetched(self, started, rows):
+        statement = self._statement
+        if statement is not None:
+            statement['duration_ms'] += (time.perf_counter() - started) * 1000
+            statement['rows'] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0)
+            raise
+        self._fetched(started, 1)
+        return row
+
+class TracedConnection(DbConnection):
+    """Соединение, которое учитывает операторы в трассировке текущего запроса.
+
+    При подробной трассировке execute() идёт через TracedCursor; для метрик
+    достаточно замерить сам execute() без обёрток над выборкой.
+    """
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        trace = getattr(_local, 'trace', None)
+        if trace is None:
+            return super().execute(sql, parameters)
+        if trace.detailed:
+            return self.cursor().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            trace.add(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, parameters):
+        trace = getattr(_local, 'trace', None)
+        if trace is None:
+            return super().executemany(sql, parameters)
+        if trace.detailed:
+            return self.cursor().executemany(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            trace.add(sql, time.perf_counter() - started)
+
+# Функции hook(trace), вызываемые по завершении каждого запроса (например, метрики)
+_trace_hooks = []
+
+def add_trace_hook(hook):
+    if hook not in _trace_hooks:
+        _trace_hooks.append(hook)
+
+def remove_trace_hook(hook):
+    if hook in _trace_hooks:
+        _trace_hooks.remove(hook)
+
+class SqlTraceMiddleware:
+    """WSGI-обёртка: собирает операторы запроса, пишет сводку в лог и запоминает медленные запросы.
+
+    Работает на уровне WSGI, поэтому учитывает и before_request, и потоковую
+    отдачу ответа. Операторы потока-писателя группового коммита сюда не попадают.
+    Сводка и поиск N+1 выполняются при SQL_TRACE, хуки — всегда.
+    """
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == DEBUG_PATH:
+            return self.wsgi_app(environ, start_response)
+        trace = _local.trace = RequestTrace(environ.get('REQUEST_METHOD', 'GET'), path,
+                                            detailed=self.app.config['SQL_TRACE'])
+
+        def traced_start_response(status, headers, exc_info=None):
+            trace.status = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        try:
+            result = self.wsgi_app(environ, traced_start_response)
+        except BaseException:
+            self.finish(trace)
+            raise
+        return ClosingIterator(result, lambda: self.finish(trace))
+
+    def finish(self, trace):
+        trace.elapsed = time.perf_counter() - trace.started
+        if current_trace() is trace:
+            _local.trace = None
+        if trace.detailed:
+            self.report(trace)
+        for hook in _trace_hooks:
+            hook(trace)
+
+    def report(self, trace):
+        config = self.app.config
+        summary = trace.summary(config['SQL_TRACE_REPEAT_LIMIT'])
+        logger.info(f"SQL {summary['method']} {summary['path']} {summary['status']}: "
+                    f"{summary['queries']} queries, {summary['rows']} rows, "
+                    f"{summary['db_ms']:.1f} ms in DB of {summary['total_ms']:.1f} ms")
+        for repeated in summary['repeated']:
+            logger.warning(f"Possible N+1 in {summary['method']} {summary['path']}: "
+                           f"{repeated['count']}x {repeated['sql']}")
+        if summary['total_ms'] >= config['SQL_TRACE_SLOW_MS'] or summary['repeated']:
+            summary['statements'] = trace.statements[:MAX_STATEMENTS]
+            with _lock:
+                _slow_requests.append(summary)
+
+def _remember_route():
+    trace = current_trace()
+    if trace is not None:
+        trace.route = request.url_rule.rule if request.url_rule else None
+
+def install_tracing(app):
+    """Подключить трассирующие соединения и WSGI-обёртку (повторный вызов ничего не меняет)"""
+    if isinstance(app.wsgi_app, SqlTraceMiddleware):
+        return
+    set_connection_class(TracedConnection)
+    # Соединения, открытые до включения, трассировать не умеют
+    close_db_pool()
+    app.wsgi_app = SqlTraceMiddleware(app, app.wsgi_app)
+    app.before_request(_remember_route)
+
+def init_sql_trace(app):
+    """Включить трассировку SQL, если SQL_TRACE задан в конфигурации"""
+    global _slow_requests
+    if not app.config['SQL_TRACE']:
+        return
+    _slow_requests = deque(maxlen=app.config['SQL_TRACE_HISTORY'])
+    install_tracing(app)
+    logger.info("SQL tracing enabled")
+
+def recent_slow_requests():
+    with _lock:
+        return list(reversed(_slow_requests))
+
+def controller_debug_sql():
+    """Последние медленные запросы и запросы с повторяющимися операторами (только в этом процессе)"""
+    if not current_app.config['SQL_TRACE']:
+        abort(404)
+    return jsonify({
+        'slow_ms': current_app.config['SQL_TRACE_SLOW_MS'],
+        'repeat_limit': current_app.config['SQL_TRACE_REPEAT_LIMIT'],
+        'requests': recent_slow_requests()
+    })
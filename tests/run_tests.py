@@ -8,7 +8,25 @@ def run_all_tests():
         'test_flights.TestFlights',
         'test_users.TestUsers', 
         'test_bookings.TestBookings',
-        'test_validators.TestValidators'
+        'test_validators.TestValidators',
+        'test_db.TestDb',
+        'test_migrations.TestMigrations',
+        'test_pagination.TestPagination',
+        'test_dashboard.TestDashboard',
+        'test_search.TestSearch',
+        'test_import.TestImport',
+        'test_export.TestExport',
+        'test_api.TestApi',
+        'test_seats.TestSeats',
+        'test_writer.TestWriter',
+        'test_asgi.TestAsgi',
+        'test_server.TestServer',
+        'test_benchmark.TestBenchmark',
+        'test_generate.TestGenerate',
+        'test_sqltrace.TestSqlTrace',
+        'test_metrics.TestMetrics',
+        'test_logsetup.TestLogSetup',
+        'test_fragments.TestFragments'
     ]
     
     loader = unittest.TestLoader()
@@ -0,0 +1,154 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+from cache import invalidate_bootstrap_user
+
+FLIGHT = {
+    'departure_city': 'Казань',
+    'arrival_city': 'Сочи',
+    'departure_date': '2030-03-01',
+    'arrival_date': '2030-03-01',
+    'company': 'ЮТэйр',
+    'price': 6000
+}
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+
+    def tearDown(self):
+        invalidate_bootstrap_user()
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_flight_crud(self):
+        response = self.client.post('/api/v1/flights', json=FLIGHT)
+        self.assertEqual(response.status_code, 201)
+        flight = response.get_json()
+        self.assertEqual(flight['company'], 'ЮТэйр')
+        self.assertEqual(response.headers['Location'], f"/api/v1/flights/{flight['id']}")
+        
+        response = self.client.put(f"/api/v1/flights/{flight['id']}", json=dict(FLIGHT, price=6500))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['price'], 6500)
+        
+        response = self.client.get(f"/api/v1/flights/{flight['id']}")
+        self.assertEqual(response.get_json()['price'], 6500)
+        
+        response = self.client.delete('/api/v1/flights', json={'ids': [flight['id'], 9999]})
+        self.assertEqual(response.get_json()['results'], {str(flight['id']): 'deleted', '9999': 'missing'})
+        self.assertEqual(self.client.get(f"/api/v1/flights/{flight['id']}").status_code, 404)
+
+    def test_validation_errors(self):
+        response = self.client.post('/api/v1/flights', json=dict(FLIGHT, arrival_city='Казань'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Города вылета и прилета не должны совпадать')
+        
+        for price in ('nan', 'inf', '-inf', '1e400', '1e30'):
+            response = self.client.post('/api/v1/flights', json=dict(FLIGHT, price=price))
+            self.assertEqual(response.status_code, 400, price)
+            self.assertIn('error', response.get_json())
+        
+        response = self.client.post('/api/v1/users', json={'fio': 'Админ', 'email': 'admin@mail.ru',
+                                                           'password': 'password123'})
+        self.assertEqual(response.status_code, 409)
+        
+        response = self.client.post('/api/v1/bookings', json={'passenger_fio': 'Иванов Иван',
+                                                              'user_id': 1, 'flight_id': 9999})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Рейс не найден')
+        
+        self.assertEqual(self.client.post('/api/v1/users', data='not json').status_code, 400)
+        self.assertEqual(self.client.put('/api/v1/users/9999', json={}).status_code, 404)
+        self.assertEqual(self.client.delete('/api/v1/users', json={'ids': []}).status_code, 400)
+
+    def test_users_hide_password(self):
+        response = self.client.post('/api/v1/users', json={'fio': 'Петров Пётр', 'email': 'petrov@test.ru',
+                                                           'password': 'password123'})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.get_json())
+        
+        items = self.client.get('/api/v1/users').get_json()['items']
+        self.assertTrue(all('password' not in user for user in items))
+        
+        user_id = response.get_json()['id']
+        response = self.client.put(f'/api/v1/users/{user_id}', json={'fio': 'Петров Павел',
+                                                                     'email': 'petrov@test.ru'})
+        self.assertEqual(response.get_json()['fio'], 'Петров Павел')
+
+    def test_bookings_keyset_pages(self):
+        conn = get_db_connection()
+        conn.executemany('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (1, 1, ?, ?)
+        ''', [(f'Пассажир {i}', f'2030-01-{i + 1:02d} 10:00:00') for i in range(5)])
+        conn.commit()
+        conn.close()
+        
+        names = []
+        url = '/api/v1/bookings?per_page=2'
+        while url:
+            data = self.client.get(url).get_json()
+            names.extend(booking['passenger_fio'] for booking in data['items'])
+            url = data['next_cursor'] and f"/api/v1/bookings?per_page=2&after={data['next_cursor']}"
+        self.assertEqual(names, [f'Пассажир {i}' for i in reversed(range(5))])
+        self.assertEqual(data['items'][0]['user_email'], 'admin@mail.ru')
+
+    def test_conditional_get(self):
+        response = self.client.get('/api/v1/flights')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+        
+        response = self.client.get('/api/v1/flights', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        
+        response = self.client.get('/api/v1/flights', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        
+        # Другие параметры списка — другой ETag
+        response = self.client.get('/api/v1/flights?per_page=1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        
+        # Изменение данных (в том числе UPDATE) меняет версию
+        conn = get_db_connection()
+        conn.execute('UPDATE flights SET price = price + 1 WHERE id = 1')
+        conn.commit()
+        conn.close()
+        response = self.client.get('/api/v1/flights', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_booking_etag_follows_joined_tables(self):
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (1, 1, 'Иванов Иван', datetime('now'))
+        ''')
+        conn.commit()
+        conn.close()
+        
+        etag = self.client.get('/api/v1/bookings/1').headers['ETag']
+        self.client.put('/api/v1/users/1', json={'fio': 'Админ Новый', 'email': 'admin@mail.ru'})
+        
+        response = self.client.get('/api/v1/bookings/1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['user_fio'], 'Админ Новый')
+
+if __name__ == '__main__':
+    unittest.main()
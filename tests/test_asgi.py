@@ -0,0 +1,113 @@
+import unittest
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, close_db_pool
+from asgi import AsgiApp
+
+async def call(application, method, path, query=b'', body=b'', headers=(), delay=0):
+    """Выполнить запрос к ASGI-приложению; delay — медленный клиент, который долго шлёт тело"""
+    messages = []
+    
+    async def receive():
+        if delay:
+            await asyncio.sleep(delay)
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+             'path': path, 'root_path': '', 'query_string': query,
+             'headers': [(name.encode(), value.encode()) for name, value in headers],
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 50000)}
+    await application(scope, receive, send)
+    
+    start = messages[0]
+    chunks = [message['body'] for message in messages[1:]]
+    return start['status'], dict(start['headers']), chunks
+
+class TestAsgi(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        create_database()
+        self.application = AsgiApp(app.wsgi_app, read_workers=4, write_workers=1)
+
+    def tearDown(self):
+        self.application.read_executor.shutdown()
+        self.application.write_executor.shutdown()
+        app.config['EXPORT_BATCH_SIZE'] = 1000
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def request(self, *args, **kwargs):
+        return asyncio.run(call(self.application, *args, **kwargs))
+
+    def test_read_routes(self):
+        status, headers, chunks = self.request('GET', '/health')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(b''.join(chunks))['status'], 'ok')
+        
+        status, headers, chunks = self.request('GET', '/')
+        self.assertEqual(status, 200)
+        self.assertIn('Управление системой', b''.join(chunks).decode())
+        
+        status, headers, chunks = self.request('GET', '/api/v1/flights', query=b'per_page=2')
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(b''.join(chunks))['items']), 2)
+        
+        status, _, _ = self.request('GET', '/api/v1/flights', query=b'per_page=2',
+                                    headers=[('If-None-Match', headers[b'etag'].decode())])
+        self.assertEqual(status, 304)
+
+    def test_write_with_json_body(self):
+        body = json.dumps({'departure_city': 'Казань', 'arrival_city': 'Сочи', 'departure_date': '2030-03-01',
+                           'arrival_date': '2030-03-01', 'company': 'ЮТэйр', 'price': 6000}).encode()
+        status, headers, chunks = self.request('POST', '/api/v1/flights', body=body,
+                                               headers=[('Content-Type', 'application/json'),
+                                                        ('Content-Length', str(len(body)))])
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(b''.join(chunks))['company'], 'ЮТэйр')
+
+    def test_streaming_response_in_chunks(self):
+        app.config['EXPORT_BATCH_SIZE'] = 1
+        status, headers, chunks = self.request('GET', '/export/flights', query=b'format=ndjson')
+        self.assertEqual(status, 200)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertGreaterEqual(len([chunk for chunk in chunks if chunk]), 3)
+
+    def test_slow_clients_do_not_hold_threads(self):
+        clients = 300
+        threads_before = threading.active_count()
+        
+        async def main():
+            return await asyncio.gather(*[
+                call(self.application, 'GET', '/api/v1/flights', query=f'per_page={i % 5 + 1}'.encode(), delay=0.2)
+                for i in range(clients)
+            ])
+        
+        started = time.perf_counter()
+        responses = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        
+        self.assertEqual([status for status, _, _ in responses], [200] * clients)
+        # Потоков не больше, чем в пуле чтения, а медленные клиенты ждут параллельно
+        self.assertLessEqual(threading.active_count(), threads_before + 4)
+        self.assertLess(elapsed, 0.2 * clients / 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import close_db_pool
+from benchmark import run_benchmark, compare, SCENARIOS
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        close_db_pool()
+        shutil.rmtree(self.data_dir)
+
+    def test_small_run_covers_all_scenarios(self):
+        database_file = app.config['DATABASE_FILE']
+        report = run_benchmark(sizes=[200], data_dir=self.data_dir, requests=3, concurrency=2, workers=1)
+
+        self.assertEqual(app.config['DATABASE_FILE'], database_file)
+        size = report['sizes']['200']
+        self.assertIsNotNone(size['seed_seconds'])
+        self.assertEqual(set(size['scenarios']), {name for name, _ in SCENARIOS})
+        for name, stats in size['scenarios'].items():
+            self.assertEqual(stats['errors'], 0, name)
+            self.assertEqual(stats['requests'], 3, name)
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        # Запросы считаются без служебных операторов FTS5 и шагов триггеров
+        self.assertEqual(size['scenarios']['health']['queries_per_request'], 5)
+        self.assertLessEqual(size['scenarios']['add_user']['queries_per_request'], 4)
+        self.assertIsNone(size['scenarios']['export_flights_filtered']['queries_per_request'])
+        # Один рейс на одно место: продано ровно одно, остальные получили отказ
+        rush = size['scenarios']['add_booking_sold_out']
+        self.assertEqual(rush['bookings'], 1)
+        self.assertFalse(rush['oversold'])
+        self.assertEqual(rush['sold_out_rejection_rate'], 0.667)
+        self.assertGreater(rush['bookings_per_second'], 0)
+        # Заполненная БД сохраняется, рабочая копия удаляется
+        self.assertEqual(os.listdir(self.data_dir), ['bench_200.db'])
+
+    def test_compare_reports_regressions(self):
+        def report(p95, throughput):
+            return {'sizes': {'1000': {'scenarios': {'index': {'p95_ms': p95, 'throughput_rps': throughput}}}}}
+
+        self.assertEqual(compare(report(11, 95), report(10, 100)), [])
+        self.assertEqual(len(compare(report(15, 95), report(10, 100))), 1)
+        self.assertEqual(len(compare(report(15, 50), report(10, 100))), 2)
+
+if __name__ == '__main__':
+    unittest.main()
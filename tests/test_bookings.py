@@ -6,7 +6,7 @@ import hashlib
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
-from createdb import create_database, get_db_connection
+from createdb import create_database, get_db_connection, close_db_pool
 
 class TestBookings(unittest.TestCase):
     def setUp(self):
@@ -37,6 +37,7 @@ class TestBookings(unittest.TestCase):
         conn.close()
 
     def tearDown(self):
+        close_db_pool()
         if os.path.exists(self.test_db):
             os.remove(self.test_db)
 
@@ -150,6 +151,30 @@ class TestBookings(unittest.TestCase):
         
         conn.close()
 
+    def test_bulk_delete_bookings(self):
+        conn = get_db_connection()
+        conn.executemany('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (?, ?, ?, datetime("now"))
+        ''', [(1, 1, f'Passenger {i}') for i in range(5)])
+        conn.commit()
+        booking_ids = [row['id'] for row in conn.execute('SELECT id FROM booking ORDER BY id')]
+        conn.close()
+
+        response = self.client.post('/delete_booking/process', data={
+            'booking_ids': [str(booking_id) for booking_id in booking_ids[:4]] + ['9999']
+        }, follow_redirects=True)
+
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertIn('Успешно удалено бронирований: 4', html)
+        self.assertIn('Не найдены бронирования с ID: 9999', html)
+
+        conn = get_db_connection()
+        remaining = [row['id'] for row in conn.execute('SELECT id FROM booking')]
+        self.assertEqual(remaining, booking_ids[4:])
+        conn.close()
+
     def test_add_booking_invalid_data(self):
         conn = get_db_connection()
         initial_count = conn.execute('SELECT COUNT(*) FROM booking').fetchone()[0]
@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, close_db_pool
+from cache import SnapshotCache, dashboard_cache
+
+class TestDashboard(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+
+    def tearDown(self):
+        dashboard_cache.invalidate()
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_index_refreshed_after_write(self):
+        response = self.client.get('/')
+        self.assertIn('<span class="badge bg-info">0</span>', response.get_data(as_text=True))
+        
+        self.client.post('/add_booking', data={
+            'user_id': 1,
+            'flight_id': 1,
+            'passenger_fio': 'Petrov Petr'
+        })
+        
+        response = self.client.get('/')
+        self.assertIn('<span class="badge bg-info">1</span>', response.get_data(as_text=True))
+
+    def test_snapshot_served_from_cache(self):
+        cache = SnapshotCache()
+        calls = []
+        
+        def build():
+            calls.append(1)
+            return len(calls)
+        
+        self.assertEqual(cache.get(build, 60), 1)
+        self.assertEqual(cache.get(build, 60), 1)
+        cache.invalidate()
+        self.assertEqual(cache.get(build, 60), 2)
+
+    def test_concurrent_rebuilds_coalesced(self):
+        cache = SnapshotCache()
+        calls = []
+        
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'snapshot'
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(build, 60)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results, ['snapshot'] * 8)
+        self.assertEqual(len(calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
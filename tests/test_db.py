@@ -0,0 +1,65 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+
+class TestDb(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        create_database()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_connection_shared_within_request(self):
+        with app.test_request_context('/'):
+            conn = get_db_connection()
+            conn.close()
+            self.assertIs(get_db_connection(), conn)
+            # close() внутри запроса не закрывает соединение
+            self.assertEqual(conn.execute('SELECT 1').fetchone()[0], 1)
+
+    def test_connection_reused_between_requests(self):
+        with app.test_request_context('/'):
+            first = get_db_connection()
+        with app.test_request_context('/'):
+            second = get_db_connection()
+        self.assertIs(first, second)
+
+    def test_connection_uses_configured_file(self):
+        with app.test_request_context('/'):
+            conn = get_db_connection()
+            path = conn.execute('PRAGMA database_list').fetchone()['file']
+        self.assertEqual(os.path.realpath(path), os.path.realpath(self.db_path))
+
+    def test_performance_profile_applied(self):
+        with app.test_request_context('/'):
+            conn = get_db_connection()
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+            self.assertEqual(conn.execute('PRAGMA temp_store').fetchone()[0], 2)
+            self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+
+    def test_uncommitted_changes_rolled_back_on_teardown(self):
+        with app.test_request_context('/'):
+            conn = get_db_connection()
+            conn.execute("INSERT INTO users (fio, email, password) VALUES ('Tmp', 'tmp@test.ru', 'x')")
+        
+        conn = get_db_connection()
+        user = conn.execute("SELECT * FROM users WHERE email = 'tmp@test.ru'").fetchone()
+        conn.close()
+        self.assertIsNone(user)
+
+if __name__ == '__main__':
+    unittest.main()
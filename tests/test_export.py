@@ -0,0 +1,93 @@
+import unittest
+import os
+import io
+import sys
+import csv
+import gzip
+import json
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['EXPORT_BATCH_SIZE'] = 2
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+        
+        conn = get_db_connection()
+        conn.execute('INSERT INTO users (fio, email, password) VALUES (?, ?, ?)',
+                     ('Петров Пётр', 'petrov@test.ru', 'x'))
+        user_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        conn.executemany('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (?, ?, ?, ?)
+        ''', [(1, 1, 'Иванов Иван', '2030-01-10 08:00:00'),
+              (user_id, 2, 'Петров Пётр', '2030-01-11 23:59:59'),
+              (1, 2, 'Сидоров Сидор', '2030-01-12 00:00:00'),
+              (user_id, 1, 'Кузнецов Олег', '2030-01-13 12:00:00'),
+              (1, 1, 'Смирнова Анна', '2030-01-14 09:30:00')])
+        conn.commit()
+        conn.close()
+        self.user_id = user_id
+
+    def tearDown(self):
+        app.config['EXPORT_BATCH_SIZE'] = 1000
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_export_bookings_csv(self):
+        response = self.client.get('/export/bookings')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename=bookings.csv', response.headers['Content-Disposition'])
+        
+        rows = list(csv.DictReader(io.StringIO(response.data.decode('utf-8-sig'))))
+        self.assertEqual([row['passenger_fio'] for row in rows],
+                         ['Иванов Иван', 'Петров Пётр', 'Сидоров Сидор', 'Кузнецов Олег', 'Смирнова Анна'])
+        self.assertEqual(rows[0]['user_email'], 'admin@mail.ru')
+        self.assertNotIn('password', rows[0])
+
+    def test_export_bookings_filtered_ndjson(self):
+        response = self.client.get(f'/export/bookings?format=ndjson&user_id={self.user_id}&date_from=2030-01-11&date_to=2030-01-12')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['passenger_fio'] for row in rows], ['Петров Пётр'])
+
+    def test_export_gzip(self):
+        response = self.client.get('/export/users?format=ndjson&gzip=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/gzip')
+        
+        rows = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+        self.assertEqual(sorted(rows[0]), ['email', 'fio', 'id'])
+        
+        conn = get_db_connection()
+        count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        conn.close()
+        self.assertEqual(len(rows), count)
+
+    def test_export_flights_filtered(self):
+        response = self.client.get('/export/flights?format=ndjson&company=Аэрофлот')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertTrue(rows)
+        self.assertTrue(all(row['company'] == 'Аэрофлот' for row in rows))
+
+    def test_export_invalid(self):
+        self.assertEqual(self.client.get('/export/bookings?format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/export/bookings?date_from=10.01.2030').status_code, 400)
+        self.assertEqual(self.client.get('/export/passwords').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,7 @@ import tempfile
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
-from createdb import get_db_connection, create_database
+from createdb import get_db_connection, create_database, close_db_pool
 
 class TestFlights(unittest.TestCase):
     def setUp(self):
@@ -22,6 +22,7 @@ class TestFlights(unittest.TestCase):
 
     def tearDown(self):
         """Очистка после тестов"""
+        close_db_pool()
         os.close(self.db_fd)
         os.unlink(self.db_path)
 
@@ -194,5 +195,47 @@ class TestFlights(unittest.TestCase):
         
         conn.close()
 
+    def test_add_flight_fractional_price(self):
+        response = self.client.post('/add_flight', data={
+            'departure_city': 'Moscow',
+            'arrival_city': 'Kazan',
+            'departure_date': '2030-01-15',
+            'arrival_date': '2030-01-15',
+            'company': 'Aeroflot',
+            'price': '4500.5'
+        }, follow_redirects=True)
+        
+        self.assertEqual(response.status_code, 200)
+        
+        conn = get_db_connection()
+        flight = conn.execute(
+            "SELECT price FROM flights WHERE departure_city = 'Moscow' AND arrival_city = 'Kazan'"
+        ).fetchone()
+        conn.close()
+        self.assertEqual(flight['price'], 4500)
+
+    def test_edit_flight_fractional_price(self):
+        conn = get_db_connection()
+        flight_id = conn.execute('SELECT MIN(id) FROM flights').fetchone()[0]
+        conn.close()
+        
+        response = self.client.post('/edit_flights/process', data={
+            'flight_id': str(flight_id),
+            'departure_city': 'Moscow',
+            'arrival_city': 'Kazan',
+            'departure_date': '2030-01-16',
+            'arrival_date': '2030-01-16',
+            'company': 'S7 Airlines',
+            'price': '4500.5'
+        }, follow_redirects=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Рейс успешно обновлен', response.get_data(as_text=True))
+        
+        conn = get_db_connection()
+        flight = conn.execute('SELECT price FROM flights WHERE id = ?', (flight_id,)).fetchone()
+        conn.close()
+        self.assertEqual(flight['price'], 4500)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
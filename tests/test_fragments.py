@@ -0,0 +1,106 @@
+import unittest
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import FileSystemBytecodeCache
+from app import app
+from createdb import create_database, close_db_pool, get_db_connection
+from cache import dashboard_cache
+from fragments import FragmentCache, fragment_cache
+
+class TestFragments(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+
+        create_database()
+        close_db_pool()
+        fragment_cache.clear()
+        dashboard_cache.invalidate()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        fragment_cache.max_entries = app.config['FRAGMENT_CACHE_SIZE']
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def execute(self, sql, params=()):
+        with app.app_context():
+            conn = get_db_connection()
+            conn.execute(sql, params)
+            conn.commit()
+
+    def test_rows_are_cached_until_table_changes(self):
+        first = self.client.get('/edit_flights').get_data(as_text=True)
+        cached = len(fragment_cache)
+        # Страница целиком и каждая строка
+        self.assertEqual(cached, 1 + first.count('<form'))
+        self.assertEqual(self.client.get('/edit_flights').get_data(as_text=True), first)
+        self.assertEqual(len(fragment_cache), cached)
+
+        self.execute('UPDATE flights SET price = 4321 WHERE id = (SELECT MIN(id) FROM flights)')
+        updated = self.client.get('/edit_flights').get_data(as_text=True)
+        self.assertIn('value="4321"', updated)
+        self.assertNotIn('value="4321"', first)
+
+        # Страница удаления зависит от той же версии таблицы
+        delete_page = self.client.get('/delete_flight').get_data(as_text=True)
+        self.assertIn('4321', delete_page)
+
+    def test_booking_rerenders_only_its_row(self):
+        first = self.client.get('/edit_flights').get_data(as_text=True)
+        rows = first.count('<form')
+        flight_id = int(re.search(r'name="flight_id" value="(\d+)"', first).group(1))
+        # Триггер мест меняет flights.seats_sold и версию всей таблицы
+        self.execute("INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date) "
+                     "VALUES (1, ?, 'Пассажир', datetime('now'))", (flight_id,))
+
+        cached = len(fragment_cache)
+        updated = self.client.get('/edit_flights').get_data(as_text=True)
+        self.assertNotEqual(updated, first)
+        # Новые записи только для страницы и строки забронированного рейса
+        self.assertEqual(len(fragment_cache), cached + 2)
+        self.assertEqual(updated.count('<form'), rows)
+
+    def test_flash_messages_are_not_cached(self):
+        self.client.get('/edit_flights')
+        with self.client.session_transaction() as session:
+            session['_flashes'] = [('success', 'Рейс обновлён')]
+        self.assertIn('Рейс обновлён', self.client.get('/edit_flights').get_data(as_text=True))
+        self.assertNotIn('Рейс обновлён', self.client.get('/edit_flights').get_data(as_text=True))
+
+    def test_admin_panel_follows_counts(self):
+        first = self.client.get('/').get_data(as_text=True)
+        self.execute("INSERT INTO users (fio, email, password) VALUES ('Новый Пользователь', 'new@mail.ru', 'x')")
+        dashboard_cache.invalidate()
+        second = self.client.get('/').get_data(as_text=True)
+        self.assertNotEqual(first, second)
+
+    def test_disabled(self):
+        fragment_cache.max_entries = 0
+        self.assertEqual(self.client.get('/edit_flights').status_code, 200)
+        self.assertEqual(len(fragment_cache), 0)
+
+    def test_lru_eviction(self):
+        cache = FragmentCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_bytecode_cache_on_disk(self):
+        bytecode_cache = app.jinja_env.bytecode_cache
+        self.assertIsInstance(bytecode_cache, FileSystemBytecodeCache)
+        self.client.get('/edit_flights')
+        self.assertTrue(any(name.startswith('__jinja2_') for name in os.listdir(bytecode_cache.directory)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, close_db_pool, open_db_connection, get_row_counts, generate_data
+
+class TestGenerate(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+
+        self.paths = []
+        self.conn = self.open_database()
+
+    def tearDown(self):
+        self.conn.close()
+        close_db_pool()
+        for path in self.paths:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.unlink(path + suffix)
+
+    def open_database(self):
+        db_fd, db_path = tempfile.mkstemp()
+        os.close(db_fd)
+        self.paths.append(db_path)
+        app.config['DATABASE_FILE'] = db_path
+        create_database()
+        close_db_pool()
+        return open_db_connection()
+
+    def schema(self, conn):
+        return conn.execute("SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') ORDER BY name").fetchall()
+
+    def test_counters_seats_and_fts_are_consistent(self):
+        schema = [tuple(row) for row in self.schema(self.conn)]
+        generate_data(self.conn, users=50, flights=10, bookings=800)
+
+        counts = get_row_counts(self.conn)
+        for table in ('users', 'flights', 'booking'):
+            self.assertEqual(counts[table], self.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0])
+        self.assertEqual(counts['booking'], 800)
+
+        mismatched = self.conn.execute('''
+            SELECT COUNT(*) FROM flights f
+            WHERE seats_sold != (SELECT COUNT(*) FROM booking WHERE flight_id = f.id) OR seats_sold > capacity
+        ''').fetchone()[0]
+        self.assertEqual(mismatched, 0)
+
+        fio = self.conn.execute('SELECT passenger_fio FROM booking LIMIT 1').fetchone()[0]
+        found = self.conn.execute('SELECT COUNT(*) FROM booking_fts WHERE booking_fts MATCH ?',
+                                  (f'"{fio.split()[0]}"',)).fetchone()[0]
+        self.assertGreater(found, 0)
+        self.assertRegex(fio, r'^[А-ЯЁ][а-яё]+ [А-ЯЁ][а-яё]+ [А-ЯЁ][а-яё]+$')
+
+        # Триггеры и индексы восстановлены, журнал снова WAL
+        self.assertEqual([tuple(row) for row in self.schema(self.conn)], schema)
+        self.assertEqual(self.conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.conn.execute("INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date) "
+                          "VALUES (2, 4, 'Тест', datetime('now'))")
+        self.assertEqual(get_row_counts(self.conn)['booking'], 801)
+
+    def test_same_seed_gives_same_data(self):
+        generate_data(self.conn, users=30, flights=5, bookings=300, seed=7)
+        other = self.open_database()
+        generate_data(other, users=30, flights=5, bookings=300, seed=7)
+
+        for query in ('SELECT * FROM users', 'SELECT * FROM flights', 'SELECT * FROM booking'):
+            self.assertEqual([tuple(row) for row in self.conn.execute(query)],
+                             [tuple(row) for row in other.execute(query)])
+        other.close()
+
+    def test_popular_routes_and_capacity_limit(self):
+        generate_data(self.conn, users=100, flights=200, bookings=5000)
+        top = self.conn.execute('''
+            SELECT departure_city, COUNT(*) FROM flights GROUP BY departure_city ORDER BY 2 DESC LIMIT 1
+        ''').fetchone()
+        self.assertEqual(top[0], 'Москва')
+
+        with self.assertRaises(ValueError):
+            generate_data(self.conn, users=10, flights=1, bookings=10000)
+        self.assertEqual(get_row_counts(self.conn)['booking'], 5000)
+
+if __name__ == '__main__':
+    unittest.main()
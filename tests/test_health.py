@@ -6,7 +6,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
-from createdb import create_database
+from createdb import create_database, close_db_pool
 
 class TestHealth(unittest.TestCase):
     def setUp(self):
@@ -24,6 +24,7 @@ class TestHealth(unittest.TestCase):
 
     def tearDown(self):
         """Очистка после тестов"""
+        close_db_pool()
         if os.path.exists(self.test_db):
             os.remove(self.test_db)
 
@@ -34,5 +35,10 @@ class TestHealth(unittest.TestCase):
         response_data = response.get_json()
         self.assertEqual(response_data['status'], 'ok')
 
+    def test_health_does_not_auto_login(self):
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Set-Cookie', response.headers)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
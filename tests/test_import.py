@@ -0,0 +1,102 @@
+import unittest
+import os
+import io
+import sys
+import json
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+from importer import import_flights
+
+HEADER = 'departure_city,arrival_city,departure_date,arrival_date,company,price\n'
+
+class TestImport(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+        
+        conn = get_db_connection()
+        self.initial_count = conn.execute('SELECT COUNT(*) FROM flights').fetchone()[0]
+        conn.close()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def count_flights(self):
+        conn = get_db_connection()
+        count = conn.execute('SELECT COUNT(*) FROM flights').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_import_csv_in_chunks(self):
+        rows = ''.join(f'Москва,Казань,2030-05-{day:02d},2030-05-{day:02d},Аэрофлот,{1000 + day}\n'
+                       for day in range(1, 26))
+        result = import_flights(io.BytesIO((HEADER + rows).encode()), 'csv', chunk_size=10)
+        
+        self.assertEqual(result, {'inserted': 25, 'failed': 0, 'errors': []})
+        self.assertEqual(self.count_flights(), self.initial_count + 25)
+
+    def test_import_reports_row_errors(self):
+        data = (HEADER +
+                'Москва,Казань,2030-05-01,2030-05-01,Аэрофлот,5000\n'
+                'Москва,Москва,2030-05-01,2030-05-01,Аэрофлот,5000\n'
+                'Москва,Казань,2030-05-03,2030-05-01,Аэрофлот,5000\n'
+                'Москва,Казань,2030-05-01,2030-05-01,Аэрофлот,-1\n')
+        result = import_flights(io.BytesIO(data.encode()), 'csv')
+        
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(result['failed'], 3)
+        self.assertEqual([line for line, message in result['errors']], [3, 4, 5])
+        self.assertEqual(self.count_flights(), self.initial_count + 1)
+
+    def test_import_non_finite_price(self):
+        rows = ''.join(f'Москва,Казань,2030-05-{day:02d},2030-05-{day:02d},Аэрофлот,{1000 + day}\n'
+                       for day in range(1, 4))
+        data = (HEADER + rows +
+                'Москва,Казань,2030-05-04,2030-05-04,Аэрофлот,inf\n'
+                'Москва,Казань,2030-05-05,2030-05-05,Аэрофлот,nan\n'
+                'Москва,Казань,2030-05-06,2030-05-06,Аэрофлот,1e400\n'
+                'Москва,Казань,2030-05-07,2030-05-07,Аэрофлот,4500.5\n')
+        result = import_flights(io.BytesIO(data.encode()), 'csv', chunk_size=2)
+        
+        self.assertEqual(result['inserted'], 4)
+        self.assertEqual([line for line, message in result['errors']], [5, 6, 7])
+        self.assertEqual(self.count_flights(), self.initial_count + 4)
+
+    def test_import_jsonl(self):
+        flight = {'departure_city': 'Сочи', 'arrival_city': 'Омск', 'departure_date': '2030-06-01',
+                  'arrival_date': '2030-06-02', 'company': 'S7', 'price': 7000}
+        data = json.dumps(flight, ensure_ascii=False) + '\n\n{broken\n[1, 2]\n'
+        result = import_flights(io.BytesIO(data.encode()), 'jsonl')
+        
+        self.assertEqual(result['inserted'], 1)
+        self.assertEqual(result['errors'], [(3, 'Неверный JSON'), (4, 'Ожидается объект JSON')])
+
+    def test_import_upload(self):
+        data = HEADER + 'Москва,Казань,2030-05-01,2030-05-01,Аэрофлот,5000\n'
+        response = self.client.post('/import_flights', data={
+            'file': (io.BytesIO(data.encode()), 'flights.csv')
+        }, content_type='multipart/form-data')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Импортировано рейсов: 1', response.get_data(as_text=True))
+        self.assertEqual(self.count_flights(), self.initial_count + 1)
+        
+        response = self.client.post('/import_flights', data={
+            'file': (io.BytesIO(b'x'), 'flights.xlsx')
+        }, content_type='multipart/form-data')
+        self.assertIn('Поддерживаются файлы', response.get_data(as_text=True))
+
+if __name__ == '__main__':
+    unittest.main()
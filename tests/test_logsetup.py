@@ -0,0 +1,124 @@
+import unittest
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logsetup import setup_logging, RateLimitFilter, JsonFormatter
+
+class TestLogSetup(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.config = {
+            'LOG_LEVEL': 'DEBUG',
+            'LOG_FILE': os.path.join(self.log_dir, 'logs', 'app.log'),
+            'LOG_ENCODING': 'utf-8',
+            'LOG_FORMAT': 'json',
+            'LOG_QUEUE': True,
+            'LOG_ROTATION': 'size',
+            'LOG_MAX_BYTES': 10485760,
+            'LOG_BACKUP_COUNT': 2,
+            'LOG_ROTATE_WHEN': 'midnight',
+            'LOG_DEBUG_PER_SECOND': 10
+        }
+        self.logger = logging.getLogger(f'test_logsetup.{self.id()}')
+        self.logger.propagate = False
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        shutil.rmtree(self.log_dir)
+
+    def setup(self, **overrides):
+        self.config.update(overrides)
+        pipeline = setup_logging(self.config, self.logger)
+        for handler in self.logger.handlers if pipeline is None else pipeline.handlers:
+            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+                handler.setLevel(logging.CRITICAL)
+        return pipeline
+
+    def read_lines(self):
+        with open(self.config['LOG_FILE'], encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_queue_writes_json_lines(self):
+        pipeline = self.setup()
+        self.logger.info('Бронирование %s создано', 42)
+        try:
+            raise ValueError('нет мест')
+        except ValueError:
+            self.logger.exception('Booking failed')
+        pipeline.stop()
+
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]['message'], 'Бронирование 42 создано')
+        self.assertEqual(lines[0]['level'], 'INFO')
+        self.assertEqual(lines[0]['logger'], self.logger.name)
+        self.assertEqual(lines[1]['message'], 'Booking failed')
+        self.assertIn('ValueError: нет мест', lines[1]['exception'])
+
+    def test_logging_call_does_not_wait_for_disk(self):
+        pipeline = self.setup()
+        file_handler = pipeline.handlers[0]
+        emit = file_handler.emit
+
+        def slow_emit(record):
+            time.sleep(0.05)
+            emit(record)
+
+        file_handler.emit = slow_emit
+        started = time.perf_counter()
+        for i in range(20):
+            self.logger.info('event %d', i)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        pipeline.stop()
+        self.assertEqual(len(self.read_lines()), 20)
+
+    def test_size_rotation(self):
+        pipeline = self.setup(LOG_MAX_BYTES=2000)
+        for i in range(100):
+            self.logger.info('rotation line %d', i)
+        pipeline.stop()
+        self.assertTrue(os.path.exists(self.config['LOG_FILE'] + '.1'))
+        self.assertFalse(os.path.exists(self.config['LOG_FILE'] + '.3'))
+
+    def test_synchronous_text_mode(self):
+        pipeline = self.setup(LOG_QUEUE=False, LOG_FORMAT='text', LOG_ROTATION='none')
+        self.assertIsNone(pipeline)
+        self.logger.warning('plain')
+        for handler in self.logger.handlers:
+            handler.close()
+        with open(self.config['LOG_FILE'], encoding='utf-8') as f:
+            self.assertIn(' - WARNING - plain', f.read())
+
+    def test_unknown_rotation(self):
+        with self.assertRaises(ValueError):
+            self.setup(LOG_ROTATION='weekly')
+
+    def test_debug_rate_limit(self):
+        limit = RateLimitFilter(10)
+
+        def record(created, level=logging.DEBUG, lineno=1):
+            item = logging.LogRecord('app', level, 'app.py', lineno, 'Auto login', None, None)
+            item.created = created
+            return item
+
+        passed = [limit.filter(record(1000.1)) for _ in range(25)]
+        self.assertEqual(passed.count(True), 10)
+        # Другие места вызова и уровни выше DEBUG не ограничиваются
+        self.assertTrue(limit.filter(record(1000.2, lineno=2)))
+        self.assertTrue(all(limit.filter(record(1000.3, level=logging.INFO)) for _ in range(20)))
+
+        following = record(1001.0)
+        self.assertTrue(limit.filter(following))
+        self.assertEqual(following.suppressed, 15)
+        self.assertEqual(json.loads(JsonFormatter().format(following))['suppressed'], 15)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import os
+import re
+import sys
+import gc
+import shutil
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, close_db_pool
+from cache import dashboard_cache
+from metrics import Registry, MetricsStore, registry, init_metrics, _labels
+
+def parse(text):
+    """Образцы метрик {'имя{метки}': значение}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['METRICS'] = True
+
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+
+        create_database()
+        close_db_pool()
+        init_metrics(app)
+        dashboard_cache.invalidate()
+        registry.clear()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        return response.get_data(as_text=True)
+
+    def test_requests_latency_and_db_time(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/health', buffered=True).status_code, 200)
+        self.assertEqual(self.client.get('/no_such_page', buffered=True).status_code, 404)
+
+        text = self.scrape()
+        samples = parse(text)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertEqual(samples['http_requests_total{method="GET",route="/health",status="200"}'], 3)
+        self.assertEqual(samples['http_requests_total{method="GET",route="unmatched",status="404"}'], 1)
+        self.assertEqual(samples['http_request_duration_seconds_count{method="GET",route="/health"}'], 3)
+        self.assertEqual(samples['http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}'], 3)
+        self.assertEqual(samples['http_request_db_seconds_count{method="GET",route="/health"}'], 3)
+        self.assertGreater(samples['http_request_db_seconds_sum{method="GET",route="/health"}'], 0)
+        self.assertGreaterEqual(samples['http_request_queries_total{method="GET",route="/health"}'], 3 * 5)
+        self.assertGreaterEqual(samples['db_connections_opened_total'], 1)
+
+        # Корзины гистограммы накопительные
+        buckets = [value for name, value in samples.items()
+                   if name.startswith('http_request_duration_seconds_bucket{method="GET",route="/health"')]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_cache_hit_rates(self):
+        self.client.get('/', buffered=True)
+        self.client.get('/', buffered=True)
+
+        samples = parse(self.scrape())
+        self.assertEqual(samples['cache_requests_total{cache="dashboard",result="miss"}'], 1)
+        self.assertEqual(samples['cache_requests_total{cache="dashboard",result="hit"}'], 1)
+        self.assertEqual(samples['cache_hit_ratio{cache="dashboard"}'], 0.5)
+        self.assertIn('cache_hit_ratio{cache="bootstrap_user"}', samples)
+        self.assertIn('cache_hit_ratio{cache="parse_date"}', samples)
+
+    def test_registry_counts_across_threads(self):
+        local = Registry()
+
+        def work():
+            for i in range(1000):
+                local.inc('events_total', ('x',))
+                local.observe('latency_seconds', ('x',), i / 1000)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del threads, thread
+        gc.collect()
+
+        total = local.collect()
+        self.assertEqual(total[('events_total', ('x',))], 8000)
+        histogram = total[('latency_seconds', ('x',))]
+        self.assertEqual(sum(histogram[:-1]), 8000)
+        # Шарды завершившихся потоков слиты в общий итог
+        self.assertEqual(local._shards, [])
+        self.assertEqual(local.collect()[('events_total', ('x',))], 8000)
+
+    def test_store_keeps_retired_workers(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = MetricsStore(directory)
+        store.clear()
+        key = ('http_requests_total', ('GET', '/health', 200))
+        store.write(101, {key: 3, ('http_request_duration_seconds', ('GET', '/health')): [1, 2, 0.5]})
+        store.write(102, {key: 4})
+        self.assertEqual(store.collect()[key], 7)
+
+        store.retire(101)
+        store.retire(101)
+        store.write(103, {key: 1})
+        total = store.collect()
+        self.assertEqual(total[key], 8)
+        self.assertEqual(total[('http_request_duration_seconds', ('GET', '/health'))], [1, 2, 0.5])
+        self.assertEqual(sorted(os.listdir(directory)), ['.lock', '102.json', '103.json', 'retired.json'])
+
+    def test_route_label_is_url_rule(self):
+        self.client.get('/api/v1/flights?per_page=1', buffered=True)
+        self.client.get('/api/v1/users?per_page=1', buffered=True)
+        text = self.scrape()
+        self.assertRegex(text, re.compile(r'^http_requests_total\{method="GET",route="/api/v1/<any\(flights, users, bookings\):entity>",status="200"\} 2$', re.M))
+        self.assertEqual(_labels(('cache',), ('a"b\\\n',)), '{cache="a\\"b\\\\\\n"}')
+
+    def test_disabled(self):
+        app.config['METRICS'] = False
+        try:
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+        finally:
+            app.config['METRICS'] = True
+
+if __name__ == '__main__':
+    unittest.main()
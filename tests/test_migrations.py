@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+import sqlite3
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import MIGRATIONS, migrate, get_db_connection, get_row_counts, close_db_pool
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        # База в формате до миграций: без индексов и с дублирующимися email
+        conn = sqlite3.connect(self.db_path)
+        for statement in MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.executemany(
+            'INSERT INTO users (fio, email, password) VALUES (?, ?, ?)',
+            [('Ivanov Ivan', 'ivanov@test.ru', 'x'),
+             ('Ivanov Ivan', 'ivanov@test.ru', 'x'),
+             ('Petrov Petr', 'petrov@test.ru', 'x')]
+        )
+        conn.execute('''
+            INSERT INTO flights (departure_city, arrival_city, departure_date, arrival_date, company, price)
+            VALUES ('Moscow', 'Kazan', '2030-01-15', '2030-01-15', 'Aeroflot', 5000)
+        ''')
+        conn.execute('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (2, 1, 'Ivanov Ivan', datetime('now'))
+        ''')
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_upgrade_in_place(self):
+        conn = get_db_connection()
+        with self.assertLogs('createdb', 'WARNING') as logs:
+            self.assertEqual(migrate(conn), len(MIGRATIONS))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('ivanov@test.ru: keeping id 1, dropping ids 2', logs.output[0])
+        
+        emails = [row['email'] for row in conn.execute('SELECT email FROM users ORDER BY id')]
+        self.assertEqual(emails, ['ivanov@test.ru', 'petrov@test.ru'])
+        
+        booking = conn.execute('SELECT user_id FROM booking').fetchone()
+        self.assertEqual(booking['user_id'], 1)
+        
+        flight = conn.execute('SELECT capacity, seats_sold FROM flights').fetchone()
+        self.assertEqual((flight['capacity'], flight['seats_sold']), (180, 1))
+        
+        with self.assertRaises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO users (fio, email, password) VALUES ('Dup', 'petrov@test.ru', 'x')")
+        conn.close()
+
+    def test_migrate_is_idempotent(self):
+        conn = get_db_connection()
+        migrate(conn)
+        self.assertEqual(migrate(conn), len(MIGRATIONS))
+        conn.close()
+
+    def test_hot_queries_use_indexes(self):
+        conn = get_db_connection()
+        migrate(conn)
+        
+        queries = [
+            ('SELECT COUNT(*) FROM booking WHERE flight_id = ?', (1,), 'idx_booking_flight'),
+            ('SELECT COUNT(*) FROM booking WHERE user_id = ?', (1,), 'idx_booking_user'),
+            ('SELECT * FROM flights ORDER BY departure_date, departure_city LIMIT 10', (), 'idx_flights_departure'),
+            ('SELECT * FROM users ORDER BY fio LIMIT 10', (), 'idx_users_fio'),
+            ('SELECT id FROM users WHERE email = ?', ('ivanov@test.ru',), 'idx_users_email'),
+            ('SELECT b.id FROM booking b CROSS JOIN flights f ON b.flight_id = f.id '
+             'ORDER BY b.booking_date DESC LIMIT 5', (), 'idx_booking_date')
+        ]
+        for query, params, index in queries:
+            plan = ' '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params))
+            self.assertIn(index, plan, query)
+            self.assertNotIn('TEMP B-TREE', plan, query)
+        conn.close()
+
+    def test_row_counts_follow_writes(self):
+        conn = get_db_connection()
+        migrate(conn)
+        self.assertEqual(get_row_counts(conn), {'users': 2, 'flights': 1, 'booking': 1})
+        
+        conn.execute("INSERT INTO users (fio, email, password) VALUES ('Sidorov', 'sidorov@test.ru', 'x')")
+        conn.execute('DELETE FROM booking')
+        conn.commit()
+        
+        counts = get_row_counts(conn)
+        for table in ('users', 'flights', 'booking'):
+            self.assertEqual(counts[table], conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0])
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
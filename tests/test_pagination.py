@@ -0,0 +1,102 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+from controllers import get_flights_page, get_bookings_page, decode_cursor, encode_cursor
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+        
+        conn = get_db_connection()
+        # Одинаковые даты и города, чтобы порядок решал id
+        conn.executemany('''
+            INSERT INTO flights (departure_city, arrival_city, departure_date, arrival_date, company, price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [('Moscow', 'Kazan', f'2030-01-{i % 5 + 1:02d}', '2030-02-01', 'Aeroflot', 1000 + i)
+              for i in range(22)])
+        conn.executemany('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (1, 1, ?, ?)
+        ''', [(f'Passenger {i}', f'2026-05-{i % 3 + 1:02d} 10:00:00') for i in range(23)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def walk(self, get_page):
+        pages = []
+        with app.test_request_context('/'):
+            rows, total_pages, next_cursor, prev_cursor = get_page()
+            self.assertIsNone(prev_cursor)
+            pages.append([row['id'] for row in rows])
+            while next_cursor:
+                rows, _, next_cursor, prev_cursor = get_page(after=next_cursor)
+                self.assertIsNotNone(prev_cursor)
+                pages.append([row['id'] for row in rows])
+            self.assertEqual(len(pages), total_pages)
+            
+            # Обратный проход по курсорам before
+            back = [pages[-1]]
+            while prev_cursor:
+                rows, _, _, prev_cursor = get_page(before=prev_cursor)
+                back.append([row['id'] for row in rows])
+        self.assertEqual(back, pages[::-1])
+        return [row_id for page in pages for row_id in page]
+
+    def test_flights_keyset_order(self):
+        conn = get_db_connection()
+        expected = [row['id'] for row in conn.execute(
+            'SELECT id FROM flights ORDER BY departure_date, departure_city, id')]
+        conn.close()
+        self.assertEqual(self.walk(get_flights_page), expected)
+
+    def test_bookings_keyset_order(self):
+        conn = get_db_connection()
+        expected = [row['id'] for row in conn.execute(
+            'SELECT id FROM booking ORDER BY booking_date DESC, id DESC')]
+        conn.close()
+        self.assertEqual(self.walk(get_bookings_page), expected)
+
+    def test_offset_fallback_and_bad_cursor(self):
+        with app.test_request_context('/'):
+            first, _, _, _ = get_flights_page(0)
+            second, _, _, prev_cursor = get_flights_page(1)
+            broken, _, _, _ = get_flights_page(0, after='not-a-cursor')
+        self.assertEqual(len(second), 10)
+        self.assertNotEqual(first[0]['id'], second[0]['id'])
+        self.assertIsNotNone(decode_cursor(prev_cursor, 3))
+        self.assertEqual([row['id'] for row in broken], [row['id'] for row in first])
+
+    def test_cursor_with_non_scalar_values(self):
+        for values in ([['2030-01-01'], 'Moscow', 1], ['2030-01-01', {'a': 1}, 1],
+                       ['2030-01-01', 'Moscow', True], ['2030-01-01', 'Moscow', 2 ** 70]):
+            cursor = encode_cursor(values)
+            self.assertIsNone(decode_cursor(cursor, 3), values)
+            self.assertEqual(self.client.get(f'/edit_flights?after={cursor}').status_code, 200)
+            self.assertEqual(self.client.get(f'/api/v1/flights?after={cursor}').status_code, 200)
+
+    def test_listing_pages_render_cursors(self):
+        for url in ['/edit_flights', '/delete_flight', '/view_bookings',
+                    '/edit_bookings', '/delete_booking']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('after=', response.get_data(as_text=True), url)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+from controllers import is_full_scan, _search_plans
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+        
+        conn = get_db_connection()
+        conn.executemany('INSERT INTO users (fio, email, password) VALUES (?, ?, ?)', [
+            ('Иванов Иван', 'ivanov@test.ru', 'x'),
+            ('Иванова Мария', 'maria@test.ru', 'x'),
+            ('Петров Пётр', 'petrov@test.ru', 'x')
+        ] + [(f'Сидоров {i}', f'sidorov{i}@test.ru', 'x') for i in range(30)])
+        conn.executemany('''
+            INSERT INTO flights (departure_city, arrival_city, departure_date, arrival_date, company, price)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            ('Казань', 'Сочи', '2030-03-01', '2030-03-01', 'ЮТэйр', 6000),
+            ('Москва', 'Самара', '2030-04-10', '2030-04-10', 'Победа', 3000)
+        ])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def labels(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [item['label'] for item in response.get_json()]
+
+    def test_search_users_by_fio_and_email(self):
+        self.assertEqual(self.labels('/api/users/search?q=иванов'),
+                         ['Иванов Иван (ivanov@test.ru)', 'Иванова Мария (maria@test.ru)'])
+        self.assertEqual(self.labels('/api/users/search?q=petrov'), ['Петров Пётр (petrov@test.ru)'])
+        self.assertEqual(self.labels('/api/users/search?q='), [])
+
+    def test_search_users_bounded(self):
+        self.assertEqual(len(self.labels('/api/users/search?q=Сидоров')), 20)
+        self.assertEqual(len(self.labels('/api/users/search?q=Сидоров&limit=5')), 5)
+
+    def test_search_flights(self):
+        self.assertEqual(self.labels('/api/flights/search?q=Москва → Сам'),
+                         ['Москва → Самара (2030-04-10 - Победа)'])
+        self.assertEqual(self.labels('/api/flights/search?q=2030-03'),
+                         ['Казань → Сочи (2030-03-01 - ЮТэйр)'])
+        self.assertIn('Казань → Сочи (2030-03-01 - ЮТэйр)', self.labels('/api/flights/search?q=соч'))
+        self.assertIn('Москва → Самара (2030-04-10 - Победа)', self.labels('/api/flights/search?q=Побе'))
+
+    def test_filter_flights(self):
+        response = self.client.get('/api/flights/filter?departure_city=Москва&arrival_city=Самара'
+                                   '&date_from=2030-04-01&date_to=2030-04-30&price_max=5000')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([flight['company'] for flight in data['flights']], ['Победа'])
+        self.assertTrue(data['plan'])
+        self.assertFalse(is_full_scan(data['plan']), data['plan'])
+
+    def test_filter_plan_explained_once_per_shape(self):
+        self.assertTrue(is_full_scan(['SCAN flights USING INDEX idx_flights_departure']))
+        self.assertFalse(is_full_scan(['SEARCH flights USING INDEX idx_flights_price (price<?)']))
+        
+        with self.assertLogs('controllers', 'WARNING'):
+            self.client.get('/api/flights/filter?price_max=5000&sort=date')
+        with self.assertNoLogs('controllers', 'WARNING'):
+            response = self.client.get('/api/flights/filter?price_max=7000&sort=date')
+        self.assertEqual(response.status_code, 200)
+        shapes = [sql for path, sql in _search_plans if path == self.db_path]
+        self.assertEqual(len(shapes), 1)
+
+    def test_filter_flights_sorted_by_price(self):
+        data = self.client.get('/api/flights/filter?sort=price_desc').get_json()
+        prices = [flight['price'] for flight in data['flights']]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+    def test_filter_flights_invalid(self):
+        response = self.client.get('/api/flights/filter?date_from=15.01.2030')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/flights/filter?sort=random')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_flights_page(self):
+        response = self.client.get('/search_flights?company=ЮТэйр')
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertIn('Казань → Сочи', html)
+        self.assertNotIn('Москва → Самара', html)
+
+    def test_full_text_search(self):
+        conn = get_db_connection()
+        conn.executemany('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (2, 1, ?, datetime('now'))
+        ''', [('Смирнова Анна Петровна',), ('Анна Смирнова',), ('Кузнецов Олег',)])
+        conn.commit()
+        conn.close()
+
+        data = self.client.get('/api/search?q=смирн анна').get_json()
+        self.assertEqual(sorted(b['passenger_fio'] for b in data['bookings']),
+                         ['Анна Смирнова', 'Смирнова Анна Петровна'])
+        self.assertEqual(data['bookings'][0]['user_fio'], 'Иванов Иван')
+
+        data = self.client.get('/api/search?q=maria').get_json()
+        self.assertEqual([user['fio'] for user in data['users']], ['Иванова Мария'])
+
+        self.assertEqual(self.client.get('/api/search?q=*"').get_json(), {'bookings': [], 'users': []})
+
+    def test_full_text_index_follows_writes(self):
+        conn = get_db_connection()
+        conn.execute("UPDATE users SET fio = 'Петрова Пелагея' WHERE email = 'petrov@test.ru'")
+        conn.execute("DELETE FROM users WHERE email = 'maria@test.ru'")
+        conn.commit()
+        conn.close()
+
+        data = self.client.get('/api/search?q=пелагея').get_json()
+        self.assertEqual([user['email'] for user in data['users']], ['petrov@test.ru'])
+        data = self.client.get('/api/search?q=иванова').get_json()
+        self.assertEqual(data['users'], [])
+
+    def test_booking_forms_do_not_embed_tables(self):
+        html = self.client.get('/add_booking').get_data(as_text=True)
+        self.assertNotIn('Сидоров', html)
+        self.assertIn('/api/users/search', html)
+
+if __name__ == '__main__':
+    unittest.main()
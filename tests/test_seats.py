@@ -0,0 +1,133 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+from controllers import create_booking, SOLD_OUT_MESSAGE
+
+class TestSeats(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+        
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO flights (departure_city, arrival_city, departure_date, arrival_date, company, price, capacity)
+            VALUES ('Москва', 'Сочи', '2030-07-01', '2030-07-01', 'Аэрофлот', 9000, 2)
+        ''')
+        conn.commit()
+        self.flight_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        conn.close()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def seats(self, flight_id):
+        conn = get_db_connection()
+        flight = conn.execute('SELECT capacity, seats_sold FROM flights WHERE id = ?', (flight_id,)).fetchone()
+        sold = conn.execute('SELECT COUNT(*) FROM booking WHERE flight_id = ?', (flight_id,)).fetchone()[0]
+        conn.close()
+        self.assertEqual(flight['seats_sold'], sold)
+        return flight['capacity'], flight['seats_sold']
+
+    def test_sold_out_flight_rejected(self):
+        for i in range(2):
+            booking_id, error = create_booking(1, self.flight_id, f'Пассажир {i}')
+            self.assertIsNone(error)
+        
+        self.assertEqual(create_booking(1, self.flight_id, 'Лишний'), (None, SOLD_OUT_MESSAGE))
+        self.assertEqual(self.seats(self.flight_id), (2, 2))
+        
+        response = self.client.post('/add_booking', data={
+            'user_id': 1, 'flight_id': self.flight_id, 'passenger_fio': 'Лишний'
+        })
+        self.assertIn(SOLD_OUT_MESSAGE, response.get_data(as_text=True))
+        
+        response = self.client.post('/api/v1/bookings', json={
+            'user_id': 1, 'flight_id': self.flight_id, 'passenger_fio': 'Лишний'
+        })
+        self.assertEqual(response.status_code, 409)
+
+    def test_seat_released_on_delete_and_move(self):
+        first, _ = create_booking(1, self.flight_id, 'Пассажир 1')
+        create_booking(1, self.flight_id, 'Пассажир 2')
+        other, _ = create_booking(1, 1, 'Пассажир 3')
+        
+        # Перенос на распроданный рейс запрещён
+        response = self.client.put(f'/api/v1/bookings/{other}', json={
+            'user_id': 1, 'flight_id': self.flight_id, 'passenger_fio': 'Пассажир 3'
+        })
+        self.assertEqual(response.status_code, 409)
+        
+        self.client.post('/delete_booking/process', data={'booking_ids': [first]})
+        self.assertEqual(self.seats(self.flight_id), (2, 1))
+        
+        response = self.client.put(f'/api/v1/bookings/{other}', json={
+            'user_id': 1, 'flight_id': self.flight_id, 'passenger_fio': 'Пассажир 3'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.seats(self.flight_id), (2, 2))
+        self.assertEqual(self.seats(1)[1], 0)
+
+    def test_capacity_not_below_sold(self):
+        create_booking(1, self.flight_id, 'Пассажир 1')
+        create_booking(1, self.flight_id, 'Пассажир 2')
+        
+        response = self.client.put(f'/api/v1/flights/{self.flight_id}', json={
+            'departure_city': 'Москва', 'arrival_city': 'Сочи', 'departure_date': '2030-07-01',
+            'arrival_date': '2030-07-01', 'company': 'Аэрофлот', 'price': 9000, 'capacity': 1
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.seats(self.flight_id), (2, 2))
+
+    def test_concurrent_bookings_never_oversell(self):
+        capacity = 200
+        threads_count = 8
+        attempts = 50
+        conn = get_db_connection()
+        conn.execute('UPDATE flights SET capacity = ? WHERE id = ?', (capacity, self.flight_id))
+        conn.commit()
+        conn.close()
+        
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(threads_count)
+        
+        def worker(number):
+            with app.app_context():
+                outcome = []
+                start.wait()
+                for i in range(attempts):
+                    outcome.append(create_booking(1, self.flight_id, f'Пассажир {number}-{i}'))
+            with lock:
+                results.extend(outcome)
+        
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(results), threads_count * attempts)
+        booked = [booking_id for booking_id, error in results if error is None]
+        rejected = [error for booking_id, error in results if error is not None]
+        self.assertEqual(len(booked), capacity)
+        self.assertEqual(len(set(booked)), capacity)
+        self.assertEqual(set(rejected), {SOLD_OUT_MESSAGE})
+        self.assertEqual(self.seats(self.flight_id), (capacity, capacity))
+
+if __name__ == '__main__':
+    unittest.main()
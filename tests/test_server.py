@@ -0,0 +1,133 @@
+import unittest
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, close_db_pool
+from server import PreforkServer, Worker, create_listener
+from metrics import enable_multiprocess
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Условие не выполнилось за отведённое время')
+        time.sleep(0.05)
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+
+        create_database()
+        close_db_pool()
+        self.sock = create_listener('127.0.0.1', 0)
+        self.url = 'http://127.0.0.1:%d' % self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=10) as response:
+            return response.status, response.read()
+
+    def start_master(self, **kwargs):
+        server = PreforkServer(app, self.sock, **kwargs)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 15)
+        self.addCleanup(server.stop)
+        return server, thread
+
+    def test_workers_serve_and_recycle(self):
+        server, thread = self.start_master(workers=2, max_requests=3, graceful_timeout=5)
+
+        for _ in range(20):
+            status, body = self.get('/health')
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body)['status'], 'ok')
+
+        # Каждый воркер обслуживает не больше нескольких запросов и заменяется новым
+        self.assertGreater(server.spawned, 2)
+        wait_for(lambda: len(server.workers) == 2)
+
+        server.stop()
+        thread.join(15)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(server.workers, {})
+
+    def test_graceful_restart_replaces_workers(self):
+        server, thread = self.start_master(workers=2, graceful_timeout=5)
+        wait_for(lambda: len(server.workers) == 2)
+        old = set(server.workers)
+
+        server.restart()
+        wait_for(lambda: len(server.workers) == 2 and not set(server.workers) & old)
+
+        status, _ = self.get('/api/v1/flights?per_page=2')
+        self.assertEqual(status, 200)
+
+    def test_metrics_summed_across_workers(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        enable_multiprocess(metrics_dir, interval=0.05)
+        self.addCleanup(enable_multiprocess, None)
+        server, thread = self.start_master(workers=2, max_requests=3, graceful_timeout=5)
+
+        for _ in range(20):
+            self.assertEqual(self.get('/health')[0], 200)
+
+        series = 'http_requests_total{method="GET",route="/health",status="200"} '
+        seen = []
+
+        def health_total():
+            _, body = self.get('/metrics')
+            lines = [line for line in body.decode().splitlines() if line.startswith(series)]
+            seen.append(float(lines[0][len(series):]) if lines else 0)
+            return seen[-1] == 20
+
+        # Воркеры менялись, но счётчик собран со всех и не убывает между опросами
+        wait_for(health_total)
+        self.assertGreater(server.spawned, 2)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_worker_finishes_request_in_flight(self):
+        started = threading.Event()
+
+        def slow_app(environ, start_response):
+            started.set()
+            time.sleep(0.5)
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'done']
+
+        worker = Worker(slow_app, self.sock, graceful_timeout=5)
+        thread = threading.Thread(target=worker.run, daemon=True)
+        thread.start()
+
+        result = {}
+        client = threading.Thread(target=lambda: result.update(response=self.get('/')))
+        client.start()
+        started.wait(5)
+        worker.stop()
+
+        client.join(10)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(result['response'], (200, b'done'))
+        self.assertEqual(worker.active, 0)
+
+if __name__ == '__main__':
+    unittest.main()
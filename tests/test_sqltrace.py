@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.test import Client
+from app import app
+import sqltrace
+from createdb import create_database, close_db_pool, open_db_connection
+from sqltrace import SqlTraceMiddleware, install_tracing, statement_shape
+
+class TestSqlTrace(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQL_TRACE'] = True
+        app.config['SQL_TRACE_SLOW_MS'] = 0
+        app.config['SQL_TRACE_REPEAT_LIMIT'] = 5
+
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+
+        create_database()
+        close_db_pool()
+        install_tracing(app)
+        sqltrace._slow_requests.clear()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app.config['SQL_TRACE'] = False
+        sqltrace._slow_requests.clear()
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_statements_are_recorded_per_request(self):
+        with self.assertLogs('sqltrace', 'INFO') as logs:
+            response = self.client.get('/edit_users', buffered=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('SQL GET /edit_users 200' in line for line in logs.output))
+
+        debug = self.client.get('/debug/sql').get_json()
+        self.assertEqual(len(debug['requests']), 1)
+        request = debug['requests'][0]
+        self.assertEqual((request['method'], request['path'], request['status']), ('GET', '/edit_users', 200))
+        self.assertEqual(request['queries'], len(request['statements']))
+        self.assertGreater(request['rows'], 0)
+        users = [s for s in request['statements'] if 'FROM users' in s['sql']]
+        self.assertTrue(users)
+        self.assertTrue(all(s['duration_ms'] >= 0 for s in request['statements']))
+
+    def test_repeated_statement_is_flagged(self):
+        def lookup_app(environ, start_response):
+            conn = open_db_connection()
+            for user_id in range(1, 9):
+                conn.execute('SELECT id FROM users WHERE id = ?', (user_id,)).fetchone()
+            conn.execute('SELECT COUNT(*) FROM flights').fetchone()
+            conn.close()
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        app.config['SQL_TRACE_SLOW_MS'] = 10000
+        client = Client(SqlTraceMiddleware(app, lookup_app))
+        with self.assertLogs('sqltrace', 'WARNING') as logs:
+            client.get('/lookup', buffered=True)
+        self.assertIn('Possible N+1 in GET /lookup: 8x SELECT id FROM users WHERE id = ?', logs.output[0])
+
+        request = sqltrace.recent_slow_requests()[0]
+        # Новое соединение вне пула видно по PRAGMA профиля
+        sql = [s['sql'] for s in request['statements']]
+        self.assertEqual(len([text for text in sql if text.startswith('PRAGMA')]), 6)
+        self.assertEqual(len([text for text in sql if text.startswith('SELECT')]), 9)
+        conn = open_db_connection()
+        existing = conn.execute('SELECT COUNT(*) FROM users WHERE id <= 8').fetchone()[0]
+        conn.close()
+        self.assertEqual(request['rows'], existing + 1)
+        self.assertEqual(request['repeated'], [{'sql': 'SELECT id FROM users WHERE id = ?', 'count': 8}])
+
+        # Вне запроса операторы не записываются
+        conn = open_db_connection()
+        conn.execute('SELECT 1').fetchone()
+        conn.close()
+        self.assertEqual(len(sqltrace.recent_slow_requests()), 1)
+
+    def test_statement_shape(self):
+        self.assertEqual(statement_shape("DELETE FROM users WHERE id IN (1, 2, 3) AND fio = 'O''Brien'"),
+                         'DELETE FROM users WHERE id IN (?) AND fio = ?')
+        self.assertEqual(statement_shape('SELECT *\n  FROM booking WHERE id IN (?, ?,?)'),
+                         'SELECT * FROM booking WHERE id IN (?)')
+
+    def test_debug_endpoint_disabled(self):
+        app.config['SQL_TRACE'] = False
+        self.assertEqual(self.client.get('/debug/sql').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
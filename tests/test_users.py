@@ -6,7 +6,8 @@ import hashlib
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
-from createdb import create_database, get_db_connection
+from createdb import create_database, get_db_connection, close_db_pool
+from cache import get_bootstrap_user, invalidate_bootstrap_user
 
 class TestUsers(unittest.TestCase):
     def setUp(self):
@@ -21,6 +22,8 @@ class TestUsers(unittest.TestCase):
         create_database()
 
     def tearDown(self):
+        invalidate_bootstrap_user()
+        close_db_pool()
         if os.path.exists(self.test_db):
             os.remove(self.test_db)
 
@@ -144,6 +147,61 @@ class TestUsers(unittest.TestCase):
         
         conn.close()
 
+    def test_edit_admin_refreshes_auto_login(self):
+        self.assertEqual(get_bootstrap_user()['fio'], 'Админ Админов')
+        
+        response = self.client.post('/edit_users/process', data={
+            'user_id': 1,
+            'fio': 'Admin Renamed',
+            'email': 'admin@mail.ru',
+            'password': ''
+        }, follow_redirects=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_bootstrap_user(), {'id': 1, 'fio': 'Admin Renamed'})
+
+    def test_auto_login_expires_without_invalidation(self):
+        self.assertEqual(get_bootstrap_user(ttl=60)['fio'], 'Админ Админов')
+        # Изменение из другого процесса: сброса кеша в этом процессе нет
+        conn = get_db_connection()
+        conn.execute("UPDATE users SET fio = 'Changed Elsewhere' WHERE email = 'admin@mail.ru'")
+        conn.commit()
+        conn.close()
+        
+        self.assertEqual(get_bootstrap_user(ttl=60)['fio'], 'Админ Админов')
+        self.assertEqual(get_bootstrap_user(ttl=0)['fio'], 'Changed Elsewhere')
+        self.assertEqual(get_bootstrap_user(ttl=0)['fio'], 'Changed Elsewhere')
+
+    def test_bulk_delete_users(self):
+        conn = get_db_connection()
+        hashed_password = hashlib.sha256('password123'.encode()).hexdigest()
+        free_ids = []
+        for i in range(3):
+            conn.execute('INSERT INTO users (fio, email, password) VALUES (?, ?, ?)',
+                         (f'User {i}', f'user{i}@test.ru', hashed_password))
+            free_ids.append(conn.execute('SELECT last_insert_rowid()').fetchone()[0])
+        conn.execute('''
+            INSERT INTO booking (user_id, flight_id, passenger_fio, booking_date)
+            VALUES (1, 1, 'Admin Passenger', datetime('now'))
+        ''')
+        conn.commit()
+        conn.close()
+
+        response = self.client.post('/delete_user/process', data={
+            'user_ids': [str(user_id) for user_id in free_ids] + ['1', '9999', 'abc', '²', '٣']
+        }, follow_redirects=True)
+
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertIn('Успешно удалено пользователей: 3', html)
+        self.assertIn('Не найдены пользователи с ID: 9999, abc, ², ٣', html)
+        self.assertIn('Невозможно удалить пользователей с ID: 1', html)
+
+        conn = get_db_connection()
+        remaining = [row['id'] for row in conn.execute('SELECT id FROM users')]
+        self.assertEqual(remaining, [1])
+        conn.close()
+
     def test_add_user_invalid_data(self):
         response = self.client.post('/add_user', data={
             'fio': 'Test User',
@@ -162,6 +220,20 @@ class TestUsers(unittest.TestCase):
         
         conn.close()
 
+    def test_add_user_duplicate_email(self):
+        response = self.client.post('/add_user', data={
+            'fio': 'Admin Copy',
+            'email': 'admin@mail.ru',
+            'password': 'password123'
+        }, follow_redirects=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Пользователь с таким email уже существует', response.get_data(as_text=True))
+        
+        conn = get_db_connection()
+        count = conn.execute('SELECT COUNT(*) FROM users WHERE email = ?', ('admin@mail.ru',)).fetchone()[0]
+        self.assertEqual(count, 1)
+        conn.close()
 
     def test_view_users_pages(self):
         response = self.client.get('/edit_users')
@@ -1,12 +1,24 @@
 import unittest
 import sys
 import os
+import tempfile
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
 from validate import *
 
 class TestValidators(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        create_database()
+
+    def tearDown(self):
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
     
     def test_regCheck_valid(self):
         result, message = regCheck(
@@ -120,4 +132,31 @@ class TestValidators(unittest.TestCase):
             "1"
         )
         self.assertFalse(result)
-        self.assertIn("ФИО пассажира должно содержать минимум 2 символа", message)
\ No newline at end of file
+        self.assertIn("ФИО пассажира должно содержать минимум 2 символа", message)
+    
+    def test_validate_booking_data_missing_refs(self):
+        result, message = validate_booking_data("Ivanov Ivan", "999", "1")
+        self.assertFalse(result)
+        self.assertEqual(message, "Пользователь не найден")
+        
+        result, message = validate_booking_data("Ivanov Ivan", "1", "999")
+        self.assertFalse(result)
+        self.assertEqual(message, "Рейс не найден")
+        
+        result, message = validate_booking_data("Ivanov Ivan", "1", "1", "999")
+        self.assertFalse(result)
+        self.assertEqual(message, "Бронирование не существует")
+    
+    def test_validate_booking_data_single_query(self):
+        statements = []
+        with app.test_request_context('/'):
+            conn = get_db_connection()
+            conn.set_trace_callback(statements.append)
+            result, _ = validate_booking_data("Ivanov Ivan", "1", "1", "1")
+            conn.set_trace_callback(None)
+        self.assertFalse(result)
+        self.assertEqual(len(statements), 1)
+    
+    def test_existing_ids(self):
+        found = existing_ids(users=[1, 2], flights=[1, 3, 4], booking=[])
+        self.assertEqual(found, {'users': {1}, 'flights': {1, 3}, 'booking': set()})
@@ -0,0 +1,116 @@
+import unittest
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from createdb import create_database, get_db_connection, close_db_pool
+from controllers import create_booking, insert_booking, SOLD_OUT_MESSAGE
+from writer import write_queue, run_write, WriterStopped
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        app.config['DATABASE_FILE'] = self.db_path
+        
+        self.client = app.test_client()
+        
+        create_database()
+        # Большое окно ожидания, чтобы задания из теста попадали в одну группу
+        write_queue.start(batch_size=64, wait_ms=50)
+
+    def tearDown(self):
+        write_queue.stop()
+        close_db_pool()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def count_bookings(self):
+        conn = sqlite3.connect(self.db_path)
+        count = conn.execute('SELECT COUNT(*) FROM booking').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_failed_write_does_not_affect_group(self):
+        def failing(conn):
+            insert_booking(conn, 1, 1, 'Откатится')
+            raise ValueError('ошибка задания')
+        
+        futures = [write_queue.submit(lambda conn: insert_booking(conn, 1, 1, 'Первый')),
+                   write_queue.submit(failing),
+                   write_queue.submit(lambda conn: insert_booking(conn, 1, 2, 'Второй'))]
+        
+        self.assertIsNotNone(futures[0].result())
+        with self.assertRaises(ValueError):
+            futures[1].result()
+        self.assertIsNotNone(futures[2].result())
+        
+        # Результат возвращается только после COMMIT: запись видна другим соединениям
+        conn = sqlite3.connect(self.db_path)
+        names = [row[0] for row in conn.execute('SELECT passenger_fio FROM booking ORDER BY id')]
+        conn.close()
+        self.assertEqual(names, ['Первый', 'Второй'])
+
+    def test_stop_drains_queue(self):
+        futures = [write_queue.submit(lambda conn: insert_booking(conn, 1, 1, f'Пассажир {i}'))
+                   for i in range(10)]
+        write_queue.stop()
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(self.count_bookings(), 10)
+
+    def test_submit_after_stop_rejected(self):
+        write_queue.stop()
+        with self.assertRaises(WriterStopped):
+            write_queue.submit(lambda conn: insert_booking(conn, 1, 1, 'Опоздавший'))
+        # run_write после остановки пишет сам
+        with app.app_context():
+            self.assertIsNotNone(run_write(lambda conn: insert_booking(conn, 1, 1, 'Напрямую')))
+        self.assertEqual(self.count_bookings(), 1)
+
+    def test_concurrent_bookings_through_queue(self):
+        conn = get_db_connection()
+        conn.execute('UPDATE flights SET capacity = 30 WHERE id = 1')
+        conn.commit()
+        conn.close()
+        
+        results = []
+        lock = threading.Lock()
+        
+        def worker(number):
+            with app.app_context():
+                outcome = [create_booking(1, 1, f'Пассажир {number}-{i}') for i in range(10)]
+            with lock:
+                results.extend(outcome)
+        
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sum(1 for booking_id, error in results if error is None), 30)
+        self.assertEqual({error for booking_id, error in results if error is not None}, {SOLD_OUT_MESSAGE})
+        self.assertEqual(self.count_bookings(), 30)
+
+    def test_forms_use_queue(self):
+        response = self.client.post('/add_booking', data={
+            'user_id': 1, 'flight_id': 1, 'passenger_fio': 'Иванов Иван'
+        })
+        self.assertEqual(response.status_code, 302)
+        
+        response = self.client.post('/api/v1/flights', json={
+            'departure_city': 'Казань', 'arrival_city': 'Сочи', 'departure_date': '2030-03-01',
+            'arrival_date': '2030-03-01', 'company': 'ЮТэйр', 'price': 6000
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['capacity'], 180)
+        self.assertEqual(self.count_bookings(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
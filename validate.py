@@ -1,6 +1,16 @@
+import json
+import math
+from functools import lru_cache
 from datetime import datetime, date
 from createdb import get_db_connection
 
+REFERENCE_TABLES = ('users', 'flights', 'booking')
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Разбор даты YYYY-MM-DD; при импорте расписаний даты повторяются, поэтому результат кэшируется"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
 def regCheck(fio, email, password, confirm_password):
     if not fio or not email or not password or not confirm_password:
         return False, 'Заполните все обязательные поля'
@@ -20,6 +30,28 @@ def regCheck(fio, email, password, confirm_password):
     
     return True, 'Успешно'
 
+def checkUserUpdate(fio, email, password):
+    """Проверка при изменении пользователя: пароль необязателен, пустой оставляет прежний"""
+    if not fio or not email:
+        return False, 'ФИО и email обязательны для заполнения'
+
+    fio = fio.strip()
+    if len(fio) < 2:
+        return False, 'ФИО должно содержать минимум 2 символа'
+
+    email = email.strip()
+    if '@' not in email or '.' not in email:
+        return False, 'Неверный формат email'
+
+    if password and len(password) < 6:
+        return False, 'Пароль должен быть не менее 6 символов'
+
+    return True, 'Успешно'
+
+def parse_price(price):
+    """Цена рейса целым числом; checkFlight допускает дробную цену, дробная часть отбрасывается"""
+    return int(float(price))
+
 def checkFlight(departure_city, arrival_city, departure_date, arrival_date, company, price):
     if not all([departure_city, arrival_city, departure_date, arrival_date, company, price]):
         return False, 'Заполните все обязательные поля'
@@ -36,8 +68,8 @@ def checkFlight(departure_city, arrival_city, departure_date, arrival_date, comp
         return False, 'Города вылета и прилета не должны совпадать'
     
     try:
-        dep_date = datetime.strptime(departure_date, '%Y-%m-%d').date()
-        arr_date = datetime.strptime(arrival_date, '%Y-%m-%d').date()
+        dep_date = parse_date(departure_date)
+        arr_date = parse_date(arrival_date)
         today = date.today()
         
         if dep_date < today:
@@ -55,13 +87,26 @@ def checkFlight(departure_city, arrival_city, departure_date, arrival_date, comp
     
     try:
         price_float = float(price)
+        # nan, inf и 1e400 разбираются float(), но не приводятся к int
+        if not math.isfinite(price_float):
+            return False, "Цена должна быть числом"
         if price_float <= 0:
             return False, "Цена должна быть положительным числом"
+        if price_float >= 2 ** 63:
+            return False, "Цена слишком большая"
     except ValueError:
         return False, "Цена должна быть числом"
     
     return True, "Данные корректны"
 
+def checkCapacity(capacity):
+    capacity = str(capacity).strip()
+    if not capacity.isdigit() or int(capacity) <= 0:
+        return False, 'Вместимость должна быть целым положительным числом'
+    if int(capacity) > 1000:
+        return False, 'Вместимость не может превышать 1000 мест'
+    return True, 'Данные корректны'
+
 def checkBooking(passenger_fio, user_id, flight_id):
     """Валидация данных бронирования"""
     if not passenger_fio or not user_id or not flight_id:
@@ -79,7 +124,36 @@ def checkBooking(passenger_fio, user_id, flight_id):
     
     return True, 'Данные корректны'
 
-def validate_booking_data(passenger_fio, user_id, flight_id):
+def existing_ids(**ids):
+    """Какие из переданных id существуют, одним запросом на соединении запроса.
+
+    existing_ids(users=[1, 2], flights=[5]) -> {'users': {1}, 'flights': {5}}
+    """
+    found = {table: set() for table in ids}
+    parts = []
+    params = []
+    for table, values in ids.items():
+        if table not in REFERENCE_TABLES:
+            raise ValueError(f'Неизвестная таблица: {table}')
+        values = [int(value) for value in values]
+        if not values:
+            continue
+        parts.append(
+            f"SELECT '{table}' AS table_name, id FROM {table} "
+            f"WHERE id IN (SELECT value FROM json_each(?))"
+        )
+        params.append(json.dumps(values))
+    
+    if not parts:
+        return found
+    
+    conn = get_db_connection()
+    for row in conn.execute(' UNION ALL '.join(parts), params):
+        found[row['table_name']].add(row['id'])
+    conn.close()
+    return found
+
+def validate_booking_data(passenger_fio, user_id, flight_id, booking_id=None):
     if not passenger_fio or not user_id or not flight_id:
         return False, "Все поля обязательны для заполнения"
     
@@ -93,22 +167,22 @@ def validate_booking_data(passenger_fio, user_id, flight_id):
     if not str(flight_id).isdigit():
         return False, "Неверный ID рейса"
     
-    conn = get_db_connection()
-    
-    user_exists = conn.execute(
-        "SELECT 1 FROM users WHERE id = ?", (int(user_id),)
-    ).fetchone()
+    if booking_id is not None and not str(booking_id).isdigit():
+        return False, "Бронирование не существует"
     
-    flight_exists = conn.execute(
-        "SELECT 1 FROM flights WHERE id = ?", (int(flight_id),)
-    ).fetchone()
+    # Пользователь, рейс и (при редактировании) бронирование проверяются одним запросом
+    ids = {'users': [user_id], 'flights': [flight_id]}
+    if booking_id is not None:
+        ids['booking'] = [booking_id]
+    found = existing_ids(**ids)
     
-    conn.close()
+    if booking_id is not None and not found['booking']:
+        return False, "Бронирование не существует"
     
-    if not user_exists:
+    if not found['users']:
         return False, "Пользователь не найден"
     
-    if not flight_exists:
+    if not found['flights']:
         return False, "Рейс не найден"
     
     return True, "Данные корректны"
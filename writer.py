@@ -0,0 +1,136 @@
+import queue
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from createdb import get_db_connection, open_db_connection
+
+logger = logging.getLogger(__name__)
+
+# ===== ГРУППОВОЙ КОММИТ =====
+
+class WriterStopped(RuntimeError):
+    """Очередь группового коммита остановлена и новые задания не принимает"""
+
+class GroupCommitWriter:
+    """Единственный поток-писатель: задания записи собираются в группы
+    (до batch_size штук или wait_ms миллисекунд) и фиксируются одной транзакцией.
+
+    Задание — функция job(conn), её результат возвращается вызывающему потоку
+    только после COMMIT. Каждое задание выполняется в своей точке сохранения,
+    поэтому ошибка одного не откатывает остальные задания группы.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, batch_size=64, wait_ms=2):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(
+                target=self._run, args=(open_db_connection(), self._queue, batch_size, wait_ms / 1000),
+                name='group-commit-writer', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Дописать уже принятые задания и остановить поток"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def submit(self, job):
+        """Поставить задание в очередь; после stop() задание за маркером остановки никто бы не выполнил"""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                raise WriterStopped('Group commit writer is not running')
+            self._queue.put((job, future))
+        return future
+
+    def execute(self, job):
+        return self.submit(job).result()
+
+    def _run(self, conn, jobs, batch_size, wait):
+        stopping = False
+        while not stopping:
+            first = jobs.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + wait
+            while len(batch) < batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = jobs.get(timeout=timeout) if timeout > 0 else jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for job, future in batch:
+                conn.execute('SAVEPOINT job')
+                try:
+                    outcomes.append((future, job(conn), None))
+                    conn.execute('RELEASE job')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+            for job, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+write_queue = GroupCommitWriter()
+
+def run_write(job):
+    """Выполнить запись job(conn): через очередь группового коммита, если она запущена,
+    иначе сразу в собственной транзакции BEGIN IMMEDIATE на соединении запроса"""
+    if write_queue.running:
+        try:
+            return write_queue.execute(job)
+        except WriterStopped:
+            # Очередь остановили между проверкой и постановкой задания
+            pass
+
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        result = job(conn)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()